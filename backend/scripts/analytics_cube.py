@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Aggregati precalcolati per le dashboard analytics (tornei e stagioni).
+
+Scatta una fotografia colonnare delle catture (un file Parquet per torneo)
+e ne ricava gli stessi risultati dei metodi di AnalyticsService:
+  - tornei:  getCatchesTimeSeries (orario e giornaliero),
+             getWeightDistribution, getSpeciesDistribution, getActivityHeatmap
+  - stagioni (associazione x anno di inizio torneo): getSeasonStats
+
+Struttura della cartella (ANALYTICS_CUBE_DIR, default backend/analytics-cube):
+    state.json                        impronte dell'ultimo aggiornamento
+    catches/<tournamentId>.parquet    catture del torneo
+    tournaments/<tournamentId>.json   aggregati del torneo
+    seasons/<tenantId>/<anno>.json    statistiche della stagione
+
+Aggiornamento incrementale: un solo GROUP BY sulle catture da' numero e
+ultimo updatedAt per torneo; si rigenerano solo i tornei la cui impronta e'
+cambiata (nuove catture, modifiche, cancellazioni) e le stagioni che li
+contengono. Le stagioni si ricalcolano leggendo dai Parquet solo le colonne
+necessarie. --full ricostruisce tutto (es. dopo una modifica ai nomi delle
+specie, che non cambia le impronte).
+
+Ore e giorni seguono il fuso del processo, come il backend Node: lanciare
+lo script con lo stesso TZ. L'API legge questi file quando
+ANALYTICS_CUBE_DIR e' impostato e state.json e' piu' recente di
+ANALYTICS_CUBE_MAX_AGE minuti, altrimenti interroga il database. Solo i
+tornei COMPLETED/CANCELLED e le stagioni passate vengono letti dal cubo: i
+tornei in corso e la stagione corrente sono sempre calcolati dal vivo.
+
+Pianificazione: lo script non parte da solo. ecosystem.config.js lo esegue
+con PM2 ogni 10 minuti (app tm-analytics-cube, cron_restart); in alternativa
+un job cron / Utilita' di pianificazione con lo stesso comando. L'intervallo
+deve restare sotto ANALYTICS_CUBE_MAX_AGE.
+
+Uso:
+    python backend/scripts/analytics_cube.py [--full] [--output-dir DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from database import BACKEND_DIR, connect
+
+CUBE_DIR = os.environ.get("ANALYTICS_CUBE_DIR") or os.path.join(BACKEND_DIR, "analytics-cube")
+
+STATE_VERSION = 1
+
+HOUR_MS = 3_600_000
+DAY_MS = 24 * HOUR_MS
+
+# Come AnalyticsService.getWeightDistribution
+WEIGHT_EDGES = (5, 10, 20, 50, 100)
+WEIGHT_BUCKETS = ("0-5kg", "5-10kg", "10-20kg", "20-50kg", "50-100kg", "100kg+")
+WEIGHT_COLORS = ("#94a3b8", "#60a5fa", "#34d399", "#fbbf24", "#f97316", "#ef4444")
+SPECIES_COLORS = ("#3b82f6", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#ec4899", "#06b6d4", "#84cc16")
+DAY_NAMES = ("Dom", "Lun", "Mar", "Mer", "Gio", "Ven", "Sab")
+
+CATCH_COLUMNS = ("id", "userId", "speciesId", "status", "weight", "points", "createdAt", "updatedAt")
+
+
+def load_arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("pyarrow non installato: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+def js_round(value, digits=0):
+    """Math.round(value * 10^digits) / 10^digits di JavaScript"""
+    scale = 10 ** digits
+    return math.floor(value * scale + 0.5) / scale if digits else int(math.floor(value + 0.5))
+
+def epoch_ms(values):
+    """Date del database (datetime UTC senza fuso o stringhe ISO) in millisecondi"""
+    values = [v.replace(tzinfo=None) if isinstance(v, datetime) and v.tzinfo else v for v in values]
+    return np.array(values, dtype="datetime64[ms]").astype(np.int64)
+
+def local_ms(utc_ms):
+    """Millisecondi nell'ora locale del processo (scostamento calcolato per ora UTC)"""
+    hours, inverse = np.unique(utc_ms // HOUR_MS, return_inverse=True)
+    offsets = np.array([
+        datetime.fromtimestamp(int(hour) * 3600, timezone.utc).astimezone().utcoffset().total_seconds() * 1000
+        for hour in hours
+    ], dtype=np.int64)
+    return utc_ms + offsets[inverse] if len(utc_ms) else utc_ms
+
+def write_json(path, data):
+    """Scrittura atomica: chi legge vede il file vecchio o quello nuovo"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp, path)
+
+def remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class Cube:
+    """Cartella dei file Parquet e JSON"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def partition(self, tournament_id):
+        return os.path.join(self.root, "catches", f"{tournament_id}.parquet")
+
+    def tournament(self, tournament_id):
+        return os.path.join(self.root, "tournaments", f"{tournament_id}.json")
+
+    def season(self, tenant_id, year):
+        return os.path.join(self.root, "seasons", tenant_id, f"{year}.json")
+
+    def clear(self):
+        """Rimuove file e aggregati (solo le sottocartelle del cubo)"""
+        for folder in ("catches", "tournaments", "seasons"):
+            shutil.rmtree(os.path.join(self.root, folder), ignore_errors=True)
+        remove(os.path.join(self.root, "state.json"))
+
+    def load_state(self):
+        try:
+            with open(os.path.join(self.root, "state.json"), encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("version") == STATE_VERSION else None
+
+    def save_state(self, state):
+        write_json(os.path.join(self.root, "state.json"), state)
+
+
+def load_tournaments(db):
+    """Tornei con associazione, anno (locale) di inizio e disciplina"""
+    rows = db.query("SELECT id, tenantId, startDate, discipline FROM tournaments ORDER BY startDate, id")
+    starts = local_ms(epoch_ms([row["startDate"] for row in rows]))
+    years = starts.astype("datetime64[ms]").astype("datetime64[Y]").astype(int) + 1970
+    for row, year in zip(rows, years):
+        row["year"] = int(year)
+    return rows
+
+def catch_fingerprints(db):
+    """Numero di catture e ultimo updatedAt per torneo"""
+    return {
+        row["tournamentId"]: f"{row['count']}|{row['updated']}"
+        for row in db.query(
+            "SELECT tournamentId, COUNT(*) AS count, MAX(updatedAt) AS updated "
+            "FROM catches GROUP BY tournamentId"
+        )
+    }
+
+def registration_counts(db):
+    return {
+        row["tournamentId"]: row["count"]
+        for row in db.query(
+            "SELECT tournamentId, COUNT(*) AS count FROM tournament_registrations GROUP BY tournamentId"
+        )
+    }
+
+def load_species_names(db):
+    return {row["id"]: row["commonNameIt"] for row in db.query("SELECT id, commonNameIt FROM species")}
+
+def snapshot(db, pa, pq, tournament_id, path):
+    """Catture del torneo nel file Parquet `path`; restituisce le colonne NumPy"""
+    rows = db.query(
+        f"SELECT {', '.join(CATCH_COLUMNS)} FROM catches WHERE tournamentId = %s",
+        (tournament_id,),
+    )
+    columns = {
+        "id": np.array([r["id"] for r in rows], dtype=object),
+        "userId": np.array([r["userId"] for r in rows], dtype=object),
+        "speciesId": np.array([r["speciesId"] for r in rows], dtype=object),
+        "status": np.array([r["status"] for r in rows], dtype=object),
+        "weight": np.array([np.nan if r["weight"] is None else float(r["weight"]) for r in rows]),
+        "points": np.array([np.nan if r["points"] is None else float(r["points"]) for r in rows]),
+        "createdAt": epoch_ms([r["createdAt"] for r in rows]),
+        "updatedAt": epoch_ms([r["updatedAt"] for r in rows]),
+    }
+    timestamp = pa.timestamp("ms", tz="UTC")
+    table = pa.table({
+        "id": pa.array(columns["id"], pa.string()),
+        "userId": pa.array(columns["userId"], pa.string()),
+        "speciesId": pa.array(columns["speciesId"], pa.string()),
+        "status": pa.array(columns["status"], pa.string()).dictionary_encode(),
+        "weight": pa.array(columns["weight"], pa.float64(), from_pandas=True),
+        "points": pa.array(columns["points"], pa.float64(), from_pandas=True),
+        "createdAt": pa.array(columns["createdAt"], pa.int64()).cast(timestamp),
+        "updatedAt": pa.array(columns["updatedAt"], pa.int64()).cast(timestamp),
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, f"{path}.tmp", compression="zstd")
+    os.replace(f"{path}.tmp", path)
+    return columns
+
+def read_partition(pq, path, columns):
+    """Colonne NumPy di un file Parquet (solo quelle richieste)"""
+    if not os.path.exists(path):
+        return None
+    table = pq.read_table(path, columns=list(columns))
+    result = {}
+    for name in columns:
+        column = table.column(name)
+        if str(column.type).startswith("dictionary"):
+            column = column.cast("string")
+        values = column.to_numpy()
+        if name in ("createdAt", "updatedAt"):
+            values = values.astype("datetime64[ms]").astype(np.int64)
+        result[name] = values
+    return result
+
+def time_series(created, weight, hourly):
+    """getCatchesTimeSeries: chiavi nell'ordine di prima comparsa per createdAt"""
+    order = np.argsort(created, kind="stable")
+    created, weight = created[order], weight[order]
+    day = created // DAY_MS  # data UTC (toISOString)
+    keys = day * 24 + (local_ms(created) // HOUR_MS) % 24 if hourly else day
+    unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique))
+    weights = np.bincount(inverse, weights=weight, minlength=len(unique))
+    points = []
+    for i in np.argsort(first):
+        date = str(np.datetime64(int(unique[i] // 24 if hourly else unique[i]), "D"))
+        if hourly:
+            date = f"{date} {int(unique[i] % 24):02d}:00"
+        points.append({"date": date, "value": int(counts[i]),
+                       "label": f"{counts[i]} catture ({weights[i]:.1f}kg)"})
+    return points
+
+def weight_distribution(weight):
+    counts = np.bincount(np.searchsorted(WEIGHT_EDGES, weight, side="right"), minlength=len(WEIGHT_BUCKETS))
+    return [
+        {"name": name, "value": int(count), "percentage": js_round(count / len(weight) * 100), "color": color}
+        for name, count, color in zip(WEIGHT_BUCKETS, counts, WEIGHT_COLORS) if count
+    ]
+
+def species_distribution(species_ids, species_names):
+    names = np.array([species_names.get(s) or "Non specificato" for s in species_ids], dtype=object)
+    unique, counts = np.unique(names.astype(str), return_counts=True)
+    order = np.lexsort((unique, -counts))
+    return [
+        {"name": str(unique[i]), "value": int(counts[i]),
+         "percentage": js_round(counts[i] / len(names) * 100), "color": SPECIES_COLORS[rank % len(SPECIES_COLORS)]}
+        for rank, i in enumerate(order)
+    ]
+
+def activity_heatmap(created):
+    """getActivityHeatmap: tutte le catture, giorno della settimana x ora locale"""
+    local = local_ms(created)
+    # 1970-01-01 era un giovedi' (getDay() = 4)
+    slots = ((local // DAY_MS + 4) % 7) * 24 + (local // HOUR_MS) % 24
+    counts = np.bincount(slots, minlength=7 * 24)
+    return [{"hour": hour, "day": DAY_NAMES[day], "value": int(counts[day * 24 + hour])}
+            for day in range(7) for hour in range(24)]
+
+def tournament_aggregates(columns, species_names):
+    approved = columns["status"] == "APPROVED"
+    created = columns["createdAt"][approved]
+    weight = np.nan_to_num(columns["weight"][approved])
+    if not approved.any():
+        aggregates = {"timeSeries": {"hourly": [], "daily": []},
+                      "weightDistribution": [], "speciesDistribution": []}
+    else:
+        aggregates = {
+            "timeSeries": {"hourly": time_series(created, weight, True),
+                           "daily": time_series(created, weight, False)},
+            "weightDistribution": weight_distribution(weight),
+            "speciesDistribution": species_distribution(columns["speciesId"][approved], species_names),
+        }
+    aggregates["activityHeatmap"] = activity_heatmap(columns["createdAt"])
+    return aggregates
+
+def season_aggregates(db, pq, cube, year, tournaments, registrations):
+    """getSeasonStats dai Parquet dei tornei della stagione"""
+    users, points, total_catches, total_weight = [], [], 0, 0.0
+    for tournament in tournaments:
+        columns = read_partition(pq, cube.partition(tournament["id"]), ("userId", "status", "weight", "points"))
+        if columns is None:
+            continue
+        approved = columns["status"] == "APPROVED"
+        total_catches += int(approved.sum())
+        total_weight += float(np.nan_to_num(columns["weight"][approved]).sum())
+        users.append(columns["userId"][approved])
+        points.append(np.nan_to_num(columns["points"][approved]))
+
+    top_participant = None
+    if users:
+        ids, inverse = np.unique(np.concatenate(users).astype(str), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(points), minlength=len(ids))
+        if len(ids) and totals.max() > 0:
+            best = int(np.argmax(totals))
+            user = db.query("SELECT firstName, lastName FROM users WHERE id = %s", (str(ids[best]),))
+            if user:
+                top_participant = {"name": f"{user[0]['firstName']} {user[0]['lastName']}",
+                                   "points": js_round(float(totals[best]))}
+
+    disciplines = {}
+    for tournament in tournaments:
+        disciplines[tournament["discipline"]] = disciplines.get(tournament["discipline"], 0) + 1
+    return {
+        "year": year,
+        "totalTournaments": len(tournaments),
+        "totalParticipants": sum(registrations.get(t["id"], 0) for t in tournaments),
+        "totalCatches": total_catches,
+        "totalWeight": js_round(total_weight, 2),
+        "topParticipant": top_participant,
+        "mostPopularDiscipline": max(disciplines, key=disciplines.get) if disciplines else None,
+    }
+
+def season_fingerprint(tournaments, catches, registrations):
+    digest = hashlib.sha1()
+    for t in sorted(tournaments, key=lambda t: t["id"]):
+        digest.update(f"{t['id']}|{t['discipline']}|{registrations.get(t['id'], 0)}|"
+                      f"{catches.get(t['id'], '')}\n".encode())
+    return digest.hexdigest()
+
+def update(db, cube, full=False, log=sys.stdout):
+    """Rigenera i tornei e le stagioni cambiati dall'ultimo aggiornamento"""
+    pa, pq = load_arrow()
+    state = None if full else cube.load_state()
+    if state is None:
+        state = {"version": STATE_VERSION, "tournaments": {}, "seasons": {}}
+        cube.clear()
+
+    tournaments = load_tournaments(db)
+    catches = catch_fingerprints(db)
+    registrations = registration_counts(db)
+    species_names = load_species_names(db)
+    generated_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    changed = [t for t in tournaments if state["tournaments"].get(t["id"]) != catches.get(t["id"], "")]
+    for tournament in changed:
+        columns = snapshot(db, pa, pq, tournament["id"], cube.partition(tournament["id"]))
+        write_json(cube.tournament(tournament["id"]), tournament_aggregates(columns, species_names))
+        state["tournaments"][tournament["id"]] = catches.get(tournament["id"], "")
+
+    current = {t["id"] for t in tournaments}
+    for tournament_id in [t for t in state["tournaments"] if t not in current]:
+        remove(cube.partition(tournament_id))
+        remove(cube.tournament(tournament_id))
+        del state["tournaments"][tournament_id]
+
+    seasons = {}
+    for tournament in tournaments:
+        seasons.setdefault(f"{tournament['tenantId']}/{tournament['year']}", []).append(tournament)
+    updated_seasons = 0
+    for key, members in seasons.items():
+        fingerprint = season_fingerprint(members, catches, registrations)
+        if state["seasons"].get(key) == fingerprint:
+            continue
+        tenant_id, year = key.split("/")
+        write_json(cube.season(tenant_id, year),
+                   season_aggregates(db, pq, cube, int(year), members, registrations))
+        state["seasons"][key] = fingerprint
+        updated_seasons += 1
+    for key in [k for k in state["seasons"] if k not in seasons]:
+        remove(cube.season(*key.split("/")))
+        del state["seasons"][key]
+
+    state["generatedAt"] = generated_at
+    cube.save_state(state)
+    print(f"Tornei: {len(tournaments)} ({len(changed)} rigenerati), "
+          f"stagioni: {len(seasons)} ({updated_seasons} rigenerate)", file=log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregati precalcolati per le dashboard analytics")
+    parser.add_argument("--output-dir", default=CUBE_DIR,
+                        help="cartella degli aggregati (default: %(default)s)")
+    parser.add_argument("--full", action="store_true",
+                        help="ricostruisce tutto invece dell'aggiornamento incrementale")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+
+    db = connect(args.database_url)
+    print("="*60)
+    print("Aggregati Analytics")
+    print("="*60)
+    started = time.perf_counter()
+    try:
+        update(db, Cube(args.output_dir), args.full)
+    finally:
+        db.close()
+    print(f"Tempo: {time.perf_counter() - started:.2f}s")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Export FIPSAS di un'intera stagione, per tutte le associazioni.
+
+Stessi fogli di ImportExportService.exportFIPSAS (Info Torneo, Partecipanti,
+Catture, Classifica), con una riga per torneo nel primo foglio e le colonne
+Associazione/Torneo in testa agli altri. Le righe non vengono mai tenute
+tutte in memoria:
+  - per ogni torneo catture e iscrizioni si leggono a pagine di --page-size
+    righe con paginazione keyset su (tournamentId, id), che segue l'indice
+    @@index([tournamentId]) senza OFFSET, ciascuna con un cursore lato server
+  - ogni pagina viene scritta subito: CSV (un file per foglio) o XLSX
+    (fogli XML scritti in streaming nello ZIP, senza librerie esterne)
+
+Durante l'export stampa righe scritte e velocita'; alla fine il riepilogo
+con righe per foglio, tempo e picco di memoria.
+
+Uso:
+    python backend/scripts/export_fipsas_season.py --season 2025 [--tenant ID ...]
+                                                  [--format xlsx|csv] [--output FILE]
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import resource
+import sys
+import time
+import zipfile
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+
+from database import connect
+
+PAGE_SIZE = 5000
+
+# Caratteri non ammessi in XML 1.0
+XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+SHEETS = {
+    "Info Torneo": ["Associazione", "Torneo", "Data Inizio", "Data Fine", "Disciplina", "Localita",
+                    "N. Partecipanti", "N. Catture Validate"],
+    "Partecipanti": ["Associazione", "Torneo", "#", "Cognome", "Nome", "Tessera FIPSAS", "Team", "Barca"],
+    "Catture": ["Associazione", "Torneo", "#", "Cognome", "Nome", "Specie", "Peso (kg)", "Lunghezza (cm)",
+                "Moltiplicatore", "Punti", "Data/Ora"],
+    "Classifica": ["Associazione", "Torneo", "Posizione", "Cognome", "Nome", "Tessera FIPSAS", "Punti",
+                   "N. Catture"],
+}
+
+
+class CsvOutput:
+    """Un file CSV per foglio: <base>_<foglio>.csv"""
+
+    def __init__(self, base):
+        self.base = base
+        self.files = []
+
+    @contextmanager
+    def sheet(self, name):
+        path = f"{self.base}_{name.lower().replace(' ', '_').replace('.', '')}.csv"
+        self.files.append(path)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            yield csv.writer(f)
+
+    def close(self):
+        pass
+
+
+class XlsxSheet:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def writerow(self, values):
+        cells = []
+        for value in values:
+            if value is None or value == "":
+                cells.append("<c/>")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f"<c><v>{value}</v></c>")
+            else:
+                text = escape(XML_ILLEGAL.sub("", str(value)))
+                cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        self.stream.write(f"<row>{''.join(cells)}</row>")
+
+
+class XlsxOutput:
+    """
+    Cartella di lavoro XLSX minima scritta in streaming: ogni foglio e' un
+    membro dello ZIP compresso man mano, con stringhe inline
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = [path]
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.sheets = []
+
+    @contextmanager
+    def sheet(self, name):
+        self.sheets.append(name)
+        member = self.zip.open(f"xl/worksheets/sheet{len(self.sheets)}.xml", "w", force_zip64=True)
+        with io.TextIOWrapper(member, encoding="utf-8") as stream:
+            stream.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>')
+            yield XlsxSheet(stream)
+            stream.write("</sheetData></worksheet>")
+
+    def close(self):
+        sheets = range(1, len(self.sheets) + 1)
+        self.zip.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in sheets)
+            + "</Types>"))
+        self.zip.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'))
+        self.zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                      for i, name in zip(sheets, self.sheets))
+            + "</sheets></workbook>"))
+        self.zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Target="worksheets/sheet{i}.xml" '
+                      'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                      for i in sheets)
+            + "</Relationships>"))
+        self.zip.close()
+
+
+class Progress:
+    """Righe scritte e velocita', stampate al massimo ogni `interval` secondi"""
+
+    def __init__(self, interval=2.0, log=sys.stderr):
+        self.started = time.perf_counter()
+        self.interval = interval
+        self.log = log
+        self.last = self.started
+        self.rows = {}
+
+    def add(self, sheet, count=1):
+        self.rows[sheet] = self.rows.get(sheet, 0) + count
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            total = sum(self.rows.values())
+            print(f"  {sheet}: {self.rows[sheet]} righe, totale {total} "
+                  f"({total / (now - self.started):.0f} righe/s)", file=self.log)
+
+
+def date_text(value, length=19):
+    """Date come toISOString().replace("T", " ").slice(0, length)"""
+    if value is None:
+        return ""
+    return str(value).replace("T", " ")[:length]
+
+def number(value):
+    return "" if value is None else float(value)
+
+def keyset(db, sql, params, page_size=PAGE_SIZE):
+    """
+    Righe di `sql` (che deve filtrare per torneo e terminare con la condizione
+    su c.id > %s, ordinata per id) a pagine di `page_size` righe
+    """
+    last_id = ""
+    while True:
+        count = 0
+        for row in db.stream(f"{sql} LIMIT {int(page_size)}", (*params, last_id)):
+            count += 1
+            last_id = row["id"]
+            yield row
+        if count < page_size:
+            return
+
+def load_tournaments(db, season, tenants=None):
+    """Tornei iniziati nella stagione, con il nome dell'associazione"""
+    sql = """
+        SELECT t.id, t.name, t.startDate, t.endDate, t.discipline, t.location, n.name AS tenantName
+        FROM tournaments t JOIN tenants n ON n.id = t.tenantId
+        WHERE t.startDate >= %s AND t.startDate < %s
+    """
+    params = [f"{season}-01-01", f"{season + 1}-01-01"]
+    if tenants:
+        sql += f" AND t.tenantId IN ({db.placeholders(len(tenants))})"
+        params.extend(tenants)
+    return db.query(sql + " ORDER BY n.name, t.startDate, t.id", params)
+
+def grouped_counts(db, sql, tournament_ids):
+    """tournamentId -> COUNT(*) di `sql` (con IN a blocchi)"""
+    counts = {}
+    for start in range(0, len(tournament_ids), 1000):
+        chunk = tournament_ids[start:start + 1000]
+        for row in db.query(sql.format(ids=db.placeholders(len(chunk))), chunk):
+            counts[row["tournamentId"]] = row["count"]
+    return counts
+
+def write_info(db, sheet, tournaments, progress):
+    ids = [t["id"] for t in tournaments]
+    registrations = grouped_counts(
+        db, "SELECT tournamentId, COUNT(*) AS count FROM tournament_registrations "
+            "WHERE tournamentId IN ({ids}) GROUP BY tournamentId", ids)
+    catches = grouped_counts(
+        db, "SELECT tournamentId, COUNT(*) AS count FROM catches "
+            "WHERE tournamentId IN ({ids}) AND status = 'APPROVED' GROUP BY tournamentId", ids)
+    for t in tournaments:
+        sheet.writerow([t["tenantName"], t["name"], date_text(t["startDate"], 10), date_text(t["endDate"], 10),
+                        t["discipline"], t["location"] or "", registrations.get(t["id"], 0),
+                        catches.get(t["id"], 0)])
+        progress.add("Info Torneo")
+
+def write_participants(db, sheet, tournaments, page_size, progress):
+    sql = """
+        SELECT r.id, r.teamName, r.boatName, u.firstName, u.lastName, u.fipsasNumber
+        FROM tournament_registrations r JOIN users u ON u.id = r.userId
+        WHERE r.tournamentId = %s AND r.id > %s ORDER BY r.id
+    """
+    for t in tournaments:
+        for i, r in enumerate(keyset(db, sql, (t["id"],), page_size), start=1):
+            sheet.writerow([t["tenantName"], t["name"], i, r["lastName"], r["firstName"],
+                            r["fipsasNumber"] or "", r["teamName"] or "", r["boatName"] or ""])
+            progress.add("Partecipanti")
+
+def write_catches(db, sheet, tournaments, page_size, progress):
+    sql = """
+        SELECT c.id, c.weight, c.length, c.points, c.caughtAt, u.firstName, u.lastName,
+               s.commonNameIt, s.pointsMultiplier
+        FROM catches c JOIN users u ON u.id = c.userId LEFT JOIN species s ON s.id = c.speciesId
+        WHERE c.tournamentId = %s AND c.status = 'APPROVED' AND c.id > %s ORDER BY c.id
+    """
+    for t in tournaments:
+        for i, c in enumerate(keyset(db, sql, (t["id"],), page_size), start=1):
+            sheet.writerow([t["tenantName"], t["name"], i, c["lastName"], c["firstName"],
+                            c["commonNameIt"] or "N/D", number(c["weight"]), number(c["length"]),
+                            float(c["pointsMultiplier"]) if c["pointsMultiplier"] else 1,
+                            float(c["points"]) if c["points"] else 0, date_text(c["caughtAt"])])
+            progress.add("Catture")
+
+def write_ranking(db, sheet, tournaments, progress):
+    # Un partecipante per riga: il GROUP BY del database resta piccolo quanto le iscrizioni
+    sql = """
+        SELECT u.firstName, u.lastName, u.fipsasNumber, g.totalPoints, g.catchCount
+        FROM (SELECT userId, COALESCE(SUM(points), 0) AS totalPoints, COUNT(*) AS catchCount
+              FROM catches WHERE tournamentId = %s AND status = 'APPROVED' GROUP BY userId) g
+        JOIN users u ON u.id = g.userId
+        ORDER BY g.totalPoints DESC, u.lastName, u.firstName
+    """
+    for t in tournaments:
+        for i, r in enumerate(db.stream(sql, (t["id"],)), start=1):
+            sheet.writerow([t["tenantName"], t["name"], i, r["lastName"], r["firstName"],
+                            r["fipsasNumber"] or "", float(r["totalPoints"]), r["catchCount"]])
+            progress.add("Classifica")
+
+def export_season(db, output, tournaments, page_size=PAGE_SIZE, progress=None):
+    """Scrive i quattro fogli in `output` (CsvOutput o XlsxOutput)"""
+    progress = progress or Progress()
+    for name, header in SHEETS.items():
+        with output.sheet(name) as sheet:
+            sheet.writerow(header)
+            if name == "Info Torneo":
+                write_info(db, sheet, tournaments, progress)
+            elif name == "Partecipanti":
+                write_participants(db, sheet, tournaments, page_size, progress)
+            elif name == "Catture":
+                write_catches(db, sheet, tournaments, page_size, progress)
+            else:
+                write_ranking(db, sheet, tournaments, progress)
+    output.close()
+    return progress
+
+def peak_rss_mb():
+    # ru_maxrss e' in KB su Linux, in byte su macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export FIPSAS di un'intera stagione")
+    parser.add_argument("--season", type=int, required=True, help="anno di inizio dei tornei")
+    parser.add_argument("--tenant", action="append", default=None,
+                        help="id associazione (ripetibile, default: tutte)")
+    parser.add_argument("--format", choices=("xlsx", "csv"), default="xlsx",
+                        help="formato di uscita (default: %(default)s)")
+    parser.add_argument("--output", default=None,
+                        help="file XLSX o prefisso dei CSV (default: FIPSAS_<stagione>)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help="righe per pagina keyset (default: %(default)s)")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+
+    base = args.output or f"FIPSAS_{args.season}"
+    if args.format == "xlsx":
+        output = XlsxOutput(base if base.endswith(".xlsx") else f"{base}.xlsx")
+    else:
+        output = CsvOutput(base[:-4] if base.endswith(".csv") else base)
+
+    db = connect(args.database_url)
+    print("="*60)
+    print(f"Export FIPSAS Stagione {args.season}")
+    print("="*60)
+    try:
+        tournaments = load_tournaments(db, args.season, args.tenant)
+        print(f"Tornei: {len(tournaments)}")
+        progress = export_season(db, output, tournaments, args.page_size)
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - progress.started
+    total = sum(progress.rows.values())
+    for name in SHEETS:
+        print(f"  {name}: {progress.rows.get(name, 0)} righe")
+    print(f"Totale: {total} righe in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} righe/s), "
+          f"picco memoria {peak_rss_mb():.0f} MB")
+    for path in output.files:
+        print(f"File: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+Import partecipanti di un torneo da file CSV/XLSX, in streaming.
+
+Stesse regole di ImportExportService.importParticipants (colonne email,
+firstName, lastName, phone, fipsasNumber, teamName, boatName, oppure le
+intestazioni dell'export partecipanti: Email, Nome, Cognome, ...), ma per
+file di dimensione federale:
+  - le righe si leggono una alla volta (CSV con il modulo csv, XLSX
+    direttamente dall'XML del foglio senza librerie esterne)
+  - si validano a blocchi di --chunk righe: utenti esistenti cercati per
+    email con una query per blocco (e tenuti in cache), iscritti, numero
+    iscrizioni rispetto a maxParticipants e squadre del torneo letti una
+    volta all'avvio
+  - errori e avvisi riga per riga vengono scritti man mano nel report CSV
+    (--report) e riassunti a ogni blocco
+  - le righe valide di un blocco si caricano con un INSERT multi-riga per
+    gli utenti nuovi e uno per le iscrizioni, in una transazione per
+    blocco: un blocco fallito non annulla quelli gia' caricati
+
+Con --dry-run il file viene solo validato (pre-validazione), senza scrivere.
+Alla fine stampa righe valide/errate e velocita' di validazione e carico.
+
+Uso:
+    python backend/scripts/import_participants.py --tournament ID FILE.xlsx [--dry-run]
+                                                  [--chunk 1000] [--report errori.csv]
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from xml.etree.ElementTree import iterparse
+
+from database import connect
+
+CHUNK_SIZE = 1000
+
+FIELDS = ("email", "firstName", "lastName", "phone", "fipsasNumber", "teamName", "boatName")
+
+# Intestazioni di ImportExportService.exportParticipants
+HEADER_ALIASES = {
+    "email": "email",
+    "nome": "firstName",
+    "cognome": "lastName",
+    "telefono": "phone",
+    "tessera fipsas": "fipsasNumber",
+    "team": "teamName",
+    "barca": "boatName",
+}
+
+# Lunghezze delle colonne VarChar dello schema Prisma
+MAX_LENGTH = {
+    "email": 255,
+    "firstName": 100,
+    "lastName": 100,
+    "phone": 20,
+    "fipsasNumber": 50,
+    "teamName": 255,
+    "boatName": 255,
+}
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def header_fields(headers):
+    """Indice di colonna -> campo dell'import (colonne sconosciute ignorate)"""
+    mapping = {}
+    lookup = {field.lower(): field for field in FIELDS}
+    lookup.update(HEADER_ALIASES)
+    for index, header in enumerate(headers):
+        field = lookup.get(str(header or "").strip().lower())
+        if field and field not in mapping.values():
+            mapping[index] = field
+    return mapping
+
+
+def to_record(mapping, values):
+    """Valori di una riga come dict dei campi, None se la riga e' vuota"""
+    record = {}
+    for index, field in mapping.items():
+        value = values[index] if index < len(values) else None
+        record[field] = str(value).strip() if value is not None else ""
+    return record if any(record.values()) else None
+
+
+def read_csv(path):
+    """(numero riga, record) da un CSV con separatore , o ;"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.readline()
+        f.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        reader = csv.reader(f, delimiter=delimiter)
+        mapping = header_fields(next(reader, []))
+        for number, values in enumerate(reader, start=2):
+            record = to_record(mapping, values)
+            if record:
+                yield number, record
+
+
+def column_index(ref):
+    """'C12' -> 2"""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def cell_number(text):
+    """Numeri interi senza '.0' (telefoni e tessere salvati come numero)"""
+    try:
+        value = float(text)
+    except ValueError:
+        return text
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else text
+
+
+def first_sheet(archive):
+    """Percorso nello ZIP del primo foglio della cartella di lavoro"""
+    with archive.open("xl/workbook.xml") as f:
+        sheet = next(el for _, el in iterparse(f) if el.tag == f"{XLSX_NS}sheet")
+    rel_id = sheet.get(f"{REL_NS}id")
+    with archive.open("xl/_rels/workbook.xml.rels") as f:
+        for _, el in iterparse(f):
+            if el.tag == f"{PKG_REL_NS}Relationship" and el.get("Id") == rel_id:
+                target = el.get("Target")
+                return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    raise ValueError("Foglio non trovato nel file XLSX")
+
+
+def shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, el in iterparse(f):
+            if el.tag == f"{XLSX_NS}si":
+                strings.append("".join(t.text or "" for t in el.iter(f"{XLSX_NS}t")))
+                el.clear()
+    return strings
+
+
+def read_xlsx(path):
+    """
+    (numero riga, record) dal primo foglio di un XLSX, leggendo l'XML del
+    foglio in streaming: in memoria restano solo la riga corrente e le
+    stringhe condivise
+    """
+    with zipfile.ZipFile(path) as archive:
+        strings = shared_strings(archive)
+        mapping = None
+        number = 0
+        with archive.open(first_sheet(archive)) as f:
+            sheet_data = None
+            for event, el in iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if el.tag == f"{XLSX_NS}sheetData":
+                        sheet_data = el
+                    continue
+                if el.tag != f"{XLSX_NS}row":
+                    continue
+
+                values = []
+                for cell in el.iter(f"{XLSX_NS}c"):
+                    ref = cell.get("r")
+                    index = column_index(ref) if ref else len(values)
+                    kind = cell.get("t")
+                    if kind == "inlineStr":
+                        value = "".join(t.text or "" for t in cell.iter(f"{XLSX_NS}t"))
+                    else:
+                        raw = cell.findtext(f"{XLSX_NS}v")
+                        if raw is None:
+                            value = None
+                        elif kind == "s":
+                            value = strings[int(raw)]
+                        elif kind in ("str", "e"):
+                            value = raw
+                        elif kind == "b":
+                            value = "TRUE" if raw == "1" else "FALSE"
+                        else:
+                            value = cell_number(raw)
+                    values.extend([None] * (index + 1 - len(values)))
+                    values[index] = value
+
+                # "r" è facoltativo: senza, la riga segue la precedente
+                number = int(el.get("r") or number + 1)
+                if mapping is None:
+                    mapping = header_fields(values)
+                else:
+                    record = to_record(mapping, values)
+                    if record:
+                        yield number, record
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+
+def read_rows(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return read_xlsx(path)
+    if extension in (".csv", ".txt"):
+        return read_csv(path)
+    raise SystemExit(f"Formato non supportato: {extension} (CSV o XLSX)")
+
+
+def chunks(rows, size):
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+class Lookups:
+    """
+    Dati del torneo letti una volta all'avvio (iscritti, capienza, squadre)
+    e utenti per email letti un blocco alla volta; aggiornati man mano che
+    le righe vengono accettate
+    """
+
+    def __init__(self, db, tournament_id):
+        self.db = db
+        rows = db.query("SELECT id, name, tenantId, maxParticipants FROM tournaments WHERE id = %s",
+                        (tournament_id,))
+        if not rows:
+            raise SystemExit(f"Torneo non trovato: {tournament_id}")
+        self.tournament = rows[0]
+        self.registered = {
+            row["userId"]
+            for row in db.query("SELECT userId FROM tournament_registrations WHERE tournamentId = %s",
+                                (tournament_id,))
+        }
+        # Stessa capienza di TournamentRegistrationService (_count.registrations)
+        maximum = self.tournament["maxParticipants"]
+        self.remaining = None if not maximum else maximum - len(self.registered)
+
+        # Nome squadra (minuscolo) -> (nome, barca) da iscrizioni e team del torneo
+        self.teams = {}
+        for row in db.query("SELECT name AS teamName, boatName FROM teams WHERE tournamentId = %s "
+                            "UNION ALL SELECT teamName, boatName FROM tournament_registrations "
+                            "WHERE tournamentId = %s AND teamName IS NOT NULL",
+                            (tournament_id, tournament_id)):
+            self.teams.setdefault(row["teamName"].strip().lower(),
+                                  (row["teamName"].strip(), (row["boatName"] or "").strip()))
+        self.users = {}
+
+    def resolve(self, emails):
+        """Carica in cache gli utenti esistenti (id per email) del blocco"""
+        missing = sorted({email for email in emails if email not in self.users})
+        for start in range(0, len(missing), 1000):
+            block = missing[start:start + 1000]
+            found = {
+                row["email"].lower(): row["id"]
+                for row in self.db.query(
+                    f"SELECT id, email FROM users WHERE email IN ({self.db.placeholders(len(block))})",
+                    block)
+            }
+            for email in block:
+                self.users[email] = found.get(email)
+
+
+class Report:
+    """Errori e avvisi riga per riga, scritti nel CSV man mano"""
+
+    def __init__(self, path=None):
+        self.errors = 0
+        self.warnings = 0
+        self.file = open(path, "w", newline="", encoding="utf-8") if path else None
+        self.writer = csv.writer(self.file) if self.file else None
+        if self.writer:
+            self.writer.writerow(["Riga", "Livello", "Campo", "Valore", "Messaggio"])
+
+    def error(self, row, field, value, message):
+        self.errors += 1
+        if self.writer:
+            self.writer.writerow([row, "ERRORE", field, value, message])
+
+    def warning(self, row, field, value, message):
+        self.warnings += 1
+        if self.writer:
+            self.writer.writerow([row, "AVVISO", field, value, message])
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def check_fields(record):
+    """(campo, valore, messaggio) del primo errore di formato, altrimenti None"""
+    email = record.get("email", "")
+    if not email:
+        return "email", "", "Email obbligatoria"
+    if not EMAIL_RE.match(email):
+        return "email", email, "Email non valida"
+    if not record.get("firstName") or not record.get("lastName"):
+        return "name", f"{record.get('firstName', '')} {record.get('lastName', '')}".strip(), \
+            "Nome e cognome obbligatori"
+    for field, length in MAX_LENGTH.items():
+        if len(record.get(field, "")) > length:
+            return field, record[field], f"Lunghezza massima {length} caratteri"
+    return None
+
+
+def validate_chunk(lookups, block, seen, report):
+    """
+    Righe valide del blocco come dict pronti per il carico. Le righe
+    accettate riservano subito posto, email e squadra, cosi' che le righe
+    successive (anche dello stesso blocco) le vedano
+    """
+    lookups.resolve(record["email"].lower() for _, record in block if record.get("email"))
+    valid = []
+    for number, record in block:
+        problem = check_fields(record)
+        if problem:
+            report.error(number, *problem)
+            continue
+
+        email = record["email"].lower()
+        if email in seen:
+            report.error(number, "email", email, f"Email duplicata nel file (riga {seen[email]})")
+            continue
+        seen[email] = number
+
+        user_id = lookups.users.get(email)
+        if user_id in lookups.registered:
+            report.warning(number, "email", email, "Gia registrato, saltato")
+            continue
+
+        team_name = record.get("teamName") or None
+        boat_name = record.get("boatName") or None
+        if team_name:
+            known = lookups.teams.get(team_name.lower())
+            if known:
+                if boat_name and known[1] and boat_name.lower() != known[1].lower():
+                    report.error(number, "boatName", boat_name,
+                                 f"Squadra {known[0]} gia associata alla barca {known[1]}")
+                    continue
+                team_name, boat_name = known[0], boat_name or known[1] or None
+
+        if lookups.remaining is not None and lookups.remaining <= 0:
+            report.error(number, "tournamentId", lookups.tournament["id"], "Torneo al completo")
+            continue
+
+        if user_id is None:
+            report.warning(number, "email", email, "Nuovo utente creato")
+        if lookups.remaining is not None:
+            lookups.remaining -= 1
+        if team_name:
+            lookups.teams.setdefault(team_name.lower(), (team_name, boat_name or ""))
+        valid.append({
+            "row": number,
+            "email": email,
+            "userId": user_id,
+            "firstName": record["firstName"],
+            "lastName": record["lastName"],
+            "phone": record.get("phone") or None,
+            "fipsasNumber": record.get("fipsasNumber") or None,
+            "teamName": team_name,
+            "boatName": boat_name,
+        })
+    return valid
+
+
+def insert_rows(db, table, columns, rows):
+    """Un solo INSERT ... VALUES (...), (...) per tutte le righe"""
+    if not rows:
+        return 0
+    values = ", ".join([f"({db.placeholders(len(columns))})"] * len(rows))
+    return db.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values}",
+                      [value for row in rows for value in row])
+
+
+def load_chunk(db, lookups, valid):
+    """Utenti nuovi e iscrizioni CONFIRMED del blocco, in una transazione"""
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    tournament = lookups.tournament
+    new_users = {}
+    for row in valid:
+        if row["userId"] is None:
+            row["userId"] = new_users.setdefault(row["email"], str(uuid.uuid4()))
+    try:
+        with db.transaction():
+            insert_rows(
+                db, "users",
+                ("id", "email", "passwordHash", "firstName", "lastName", "phone", "fipsasNumber",
+                 "tenantId", "role", "createdAt", "updatedAt"),
+                [(new_users[row["email"]], row["email"], "$placeholder$", row["firstName"],
+                  row["lastName"], row["phone"], row["fipsasNumber"], tournament["tenantId"],
+                  "PARTICIPANT", now, now)
+                 for row in valid if new_users.get(row["email"]) == row["userId"]],
+            )
+            insert_rows(
+                db, "tournament_registrations",
+                ("id", "tournamentId", "userId", "teamName", "boatName", "status", "createdAt",
+                 "updatedAt"),
+                [(str(uuid.uuid4()), tournament["id"], row["userId"], row["teamName"],
+                  row["boatName"], "CONFIRMED", now, now) for row in valid],
+            )
+    except Exception:
+        # Le righe tornano disponibili per chi le ritenta
+        for row in valid:
+            if new_users.get(row["email"]) == row["userId"]:
+                row["userId"] = None
+        raise
+    lookups.users.update(new_users)
+    lookups.registered.update(row["userId"] for row in valid)
+    return len(valid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import partecipanti da CSV/XLSX in streaming")
+    parser.add_argument("file", help="file CSV o XLSX (prima riga: intestazioni)")
+    parser.add_argument("--tournament", required=True, help="id torneo")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE,
+                        help="righe per blocco di validazione e INSERT (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="valida soltanto, senza scrivere")
+    parser.add_argument("--report", default=None,
+                        help="CSV con errori e avvisi riga per riga")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+
+    db = connect(args.database_url)
+    report = Report(args.report)
+    started = time.perf_counter()
+    validating = loading = 0.0
+    rows = valid_rows = imported = 0
+
+    print("="*60)
+    print(f"Import Partecipanti{' (dry run)' if args.dry_run else ''}")
+    print("="*60)
+    try:
+        lookups = Lookups(db, args.tournament)
+        print(f"Torneo: {lookups.tournament['name']}")
+        print(f"Gia iscritti: {len(lookups.registered)}"
+              + (f", posti liberi: {lookups.remaining}" if lookups.remaining is not None else ""))
+
+        seen = {}
+        for block in chunks(read_rows(args.file), args.chunk):
+            errors_before = report.errors
+            tick = time.perf_counter()
+            valid = validate_chunk(lookups, block, seen, report)
+            validating += time.perf_counter() - tick
+            rows += len(block)
+            valid_rows += len(valid)
+
+            if valid and not args.dry_run:
+                tick = time.perf_counter()
+                try:
+                    imported += load_chunk(db, lookups, valid)
+                except Exception as e:
+                    for row in valid:
+                        report.error(row["row"], "row", row["email"], f"Carico fallito: {e}")
+                    if lookups.remaining is not None:
+                        lookups.remaining += len(valid)
+                loading += time.perf_counter() - tick
+            report.flush()
+
+            elapsed = time.perf_counter() - started
+            print(f"  righe {block[0][0]}-{block[-1][0]}: {len(valid)} valide, "
+                  f"{report.errors - errors_before} errori "
+                  f"(totale {rows} righe, {rows / max(elapsed, 1e-9):.0f} righe/s)")
+    finally:
+        report.close()
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Righe lette: {rows}")
+    print(f"Valide: {valid_rows}, errori: {report.errors}, avvisi: {report.warnings}")
+    print(f"Validazione: {rows / max(validating, 1e-9):.0f} righe/s")
+    if not args.dry_run:
+        print(f"Importati: {imported} ({imported / max(loading, 1e-9):.0f} righe/s di carico)")
+    print(f"Tempo: {elapsed:.1f}s")
+    if args.report:
+        print(f"Report: {args.report}")
+    print("="*60)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
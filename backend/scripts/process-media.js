@@ -0,0 +1,425 @@
+/**
+ * Orchestratore media: probe, conversione MP4 e thumbnail dei video in parallelo
+ * Usage: node scripts/process-media.js [--dir PATH] [--convert] [--jobs N]
+ *                                      [--manifest FILE] [--force] [--remove-originals]
+ *
+ * Sostituisce l'elaborazione seriale di generate-all-thumbnails.js,
+ * convert-incompatible-videos.js e ThumbnailService.generateThumbnailsForDirectory:
+ * - manifest JSON (backend/media-manifest.json) con chiave hash del file +
+ *   profilo (probe, thumb-480, mp4-h264): un lavoro gia' fatto sullo stesso
+ *   contenuto non viene ripetuto, finche' il file di uscita esiste
+ * - l'hash (SHA-256) di ogni file e' ricordato per percorso, dimensione e
+ *   data di modifica: i file invariati non vengono riletti
+ * - ffprobe/ffmpeg girano come processi figli in un pool limitato
+ *   (default: un processo per core; le conversioni usano core/pool thread)
+ * - per ogni lavoro vengono stampati i tempi, alla fine il riepilogo per profilo
+ *
+ * Senza --dir elabora i video attivi di bannerImage e aggiorna thumbnailPath,
+ * durata e dimensioni (con --convert anche filename/path dopo la conversione).
+ * Con --dir elabora i video di una cartella, senza database.
+ *
+ * FFmpeg/FFprobe: PATH di sistema o FFMPEG_PATH / FFPROBE_PATH (come fluent-ffmpeg).
+ */
+
+const { execFile } = require('child_process');
+const crypto = require('crypto');
+const path = require('path');
+const fs = require('fs');
+const os = require('os');
+
+// Directory
+const THUMBNAILS_DIR = path.join(__dirname, '../../frontend/public/thumbnails');
+const BANNERS_DIR = path.join(__dirname, '../../frontend/public/images/banners');
+const DEFAULT_MANIFEST = path.join(__dirname, '../media-manifest.json');
+
+const FFMPEG = process.env.FFMPEG_PATH || 'ffmpeg';
+const FFPROBE = process.env.FFPROBE_PATH || 'ffprobe';
+
+// Estensioni video
+const VIDEO_EXTENSIONS = ['.mp4', '.mov', '.webm', '.avi', '.mkv', '.mpg', '.mpeg'];
+// Estensioni compatibili con i browser
+const BROWSER_COMPATIBLE = ['.mp4', '.webm'];
+
+// Profili: cambiare le opzioni di un profilo richiede un nuovo nome
+const PROFILES = {
+  probe: 'probe',
+  thumbnail: 'thumb-480',
+  mp4: 'mp4-h264',
+};
+
+function isVideo(filename) {
+  return VIDEO_EXTENSIONS.includes(path.extname(filename).toLowerCase());
+}
+
+function needsConversion(filename) {
+  return isVideo(filename) && !BROWSER_COMPATIBLE.includes(path.extname(filename).toLowerCase());
+}
+
+function parseArgs(argv) {
+  const cores = typeof os.availableParallelism === 'function'
+    ? os.availableParallelism()
+    : os.cpus().length;
+  const args = {
+    dir: null,
+    convert: false,
+    force: false,
+    removeOriginals: false,
+    jobs: cores,
+    cores,
+    manifest: DEFAULT_MANIFEST,
+  };
+  for (let i = 0; i < argv.length; i++) {
+    switch (argv[i]) {
+      case '--dir': args.dir = path.resolve(argv[++i]); break;
+      case '--convert': args.convert = true; break;
+      case '--force': args.force = true; break;
+      case '--remove-originals': args.removeOriginals = true; break;
+      case '--jobs': args.jobs = Math.max(1, parseInt(argv[++i], 10) || 1); break;
+      case '--manifest': args.manifest = path.resolve(argv[++i]); break;
+      default:
+        console.error(`Opzione sconosciuta: ${argv[i]}`);
+        process.exit(1);
+    }
+  }
+  return args;
+}
+
+/**
+ * Pool di processi: al massimo `size` lavori attivi insieme
+ */
+class Pool {
+  constructor(size) {
+    this.size = size;
+    this.active = 0;
+    this.waiting = [];
+  }
+
+  async run(task) {
+    if (this.active >= this.size) {
+      // Il posto viene ceduto direttamente da chi termina (active resta invariato)
+      await new Promise((resolve) => this.waiting.push(resolve));
+    } else {
+      this.active++;
+    }
+    try {
+      return await task();
+    } finally {
+      const next = this.waiting.shift();
+      if (next) next();
+      else this.active--;
+    }
+  }
+}
+
+/**
+ * Manifest dei lavori fatti: jobs["<sha256>:<profilo>"] e cache degli hash
+ */
+class Manifest {
+  constructor(file) {
+    this.file = file;
+    this.data = { version: 1, files: {}, jobs: {} };
+    if (fs.existsSync(file)) {
+      try {
+        this.data = JSON.parse(fs.readFileSync(file, 'utf8'));
+      } catch (err) {
+        console.warn(`Manifest illeggibile, ricreato: ${err.message}`);
+      }
+    }
+  }
+
+  job(hash, profile) {
+    return this.data.jobs[`${hash}:${profile}`] || null;
+  }
+
+  setJob(hash, profile, result) {
+    this.data.jobs[`${hash}:${profile}`] = { ...result, at: new Date().toISOString() };
+    // Salvataggio al massimo ogni 2s: un'interruzione non perde i lavori fatti
+    if (Date.now() - (this.savedAt || 0) > 2000) this.save();
+  }
+
+  async hash(filePath) {
+    const stats = fs.statSync(filePath);
+    const cached = this.data.files[filePath];
+    if (cached && cached.size === stats.size && cached.mtimeMs === stats.mtimeMs) {
+      return cached.hash;
+    }
+    const hash = await new Promise((resolve, reject) => {
+      const digest = crypto.createHash('sha256');
+      fs.createReadStream(filePath)
+        .on('data', (chunk) => digest.update(chunk))
+        .on('end', () => resolve(digest.digest('hex')))
+        .on('error', reject);
+    });
+    this.data.files[filePath] = { size: stats.size, mtimeMs: stats.mtimeMs, hash };
+    return hash;
+  }
+
+  save() {
+    const tmp = `${this.file}.tmp`;
+    fs.writeFileSync(tmp, JSON.stringify(this.data, null, 2));
+    fs.renameSync(tmp, this.file);
+    this.savedAt = Date.now();
+  }
+}
+
+function run(command, args) {
+  return new Promise((resolve, reject) => {
+    execFile(command, args, { maxBuffer: 16 * 1024 * 1024 }, (err, stdout, stderr) => {
+      if (err) {
+        const detail = stderr ? stderr.trim().split('\n').pop() : err.message;
+        reject(new Error(`${path.basename(command)}: ${detail}`));
+        return;
+      }
+      resolve(stdout);
+    });
+  });
+}
+
+async function probe(videoPath) {
+  const output = await run(FFPROBE, [
+    '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', videoPath,
+  ]);
+  const metadata = JSON.parse(output);
+  const videoStream = (metadata.streams || []).find((s) => s.codec_type === 'video');
+  return {
+    duration: Math.round(Number(metadata.format?.duration) || 0),
+    width: videoStream?.width || null,
+    height: videoStream?.height || null,
+    codec: videoStream?.codec_name || 'unknown',
+  };
+}
+
+async function thumbnail(videoPath, outputName) {
+  const thumbnailPath = path.join(THUMBNAILS_DIR, `${outputName}.jpg`);
+  // Stesso fotogramma di ThumbnailService (1s, 480px); video piu' corti: primo fotogramma
+  let error = new Error('Thumbnail non creato');
+  for (const timestamp of ['1', '0']) {
+    fs.rmSync(thumbnailPath, { force: true });
+    try {
+      await run(FFMPEG, [
+        '-v', 'error', '-y', '-ss', timestamp, '-i', videoPath,
+        '-frames:v', '1', '-vf', 'scale=480:-2', thumbnailPath,
+      ]);
+    } catch (err) {
+      error = err;
+    }
+    if (fs.existsSync(thumbnailPath)) {
+      return { output: thumbnailPath, url: `/thumbnails/${outputName}.jpg` };
+    }
+  }
+  throw error;
+}
+
+async function convertToMp4(inputPath, outputPath, threads) {
+  // Stesse opzioni di convert-incompatible-videos.js, su file temporaneo
+  const tmp = `${outputPath}.part`;
+  try {
+    await run(FFMPEG, [
+      '-v', 'error', '-y', '-i', inputPath,
+      '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
+      '-c:a', 'aac', '-b:a', '128k', '-movflags', '+faststart',
+      '-threads', String(threads), '-f', 'mp4', tmp,
+    ]);
+  } catch (err) {
+    fs.rmSync(tmp, { force: true });
+    throw err;
+  }
+  fs.renameSync(tmp, outputPath);
+  return { output: outputPath };
+}
+
+/**
+ * Esegue un lavoro nel pool, oppure lo salta se il manifest lo ha gia'
+ * per lo stesso contenuto e il file di uscita esiste ancora
+ */
+async function job(ctx, media, hash, profile, work) {
+  const done = ctx.manifest.job(hash, profile);
+  if (done && !ctx.args.force && (!done.output || fs.existsSync(done.output))) {
+    ctx.record(media, profile, 'skip', 0);
+    return done;
+  }
+
+  // Tempo del solo lavoro, senza l'attesa di un posto nel pool
+  let started = 0n;
+  const elapsed = () => Number(process.hrtime.bigint() - started) / 1e6;
+  try {
+    const result = await ctx.pool.run(() => {
+      started = process.hrtime.bigint();
+      return work();
+    });
+    const ms = elapsed();
+    ctx.manifest.setJob(hash, profile, { ...result, ms: Math.round(ms) });
+    ctx.record(media, profile, 'ok', ms);
+    return result;
+  } catch (err) {
+    ctx.record(media, profile, 'error', started ? elapsed() : 0, err.message);
+    return null;
+  }
+}
+
+/**
+ * Pipeline di un video: [conversione] -> probe -> thumbnail -> database
+ */
+async function processMedia(ctx, media) {
+  let videoPath = media.path;
+  if (!fs.existsSync(videoPath)) {
+    ctx.record(media, 'file', 'error', 0, 'File non trovato su disco');
+    return;
+  }
+
+  let hash = await ctx.pool.run(() => ctx.manifest.hash(videoPath));
+  let filename = media.filename;
+
+  if (ctx.args.convert && needsConversion(filename)) {
+    const baseName = path.parse(filename).name;
+    const target = path.join(path.dirname(videoPath), `${baseName}.mp4`);
+    const converted = await job(ctx, media, hash, PROFILES.mp4, () =>
+      convertToMp4(videoPath, target, ctx.threads)
+    );
+    if (!converted) return;
+    if (ctx.args.removeOriginals && fs.existsSync(videoPath)) {
+      fs.unlinkSync(videoPath);
+    }
+    videoPath = converted.output;
+    filename = path.basename(videoPath);
+    hash = await ctx.pool.run(() => ctx.manifest.hash(videoPath));
+  }
+
+  const outputName = path.parse(filename).name;
+  const [metadata, thumb] = await Promise.all([
+    job(ctx, media, hash, PROFILES.probe, () => probe(videoPath)),
+    job(ctx, media, hash, PROFILES.thumbnail, () => thumbnail(videoPath, outputName)),
+  ]);
+
+  if (ctx.prisma && media.id) {
+    const data = {};
+    if (filename !== media.filename) {
+      data.filename = filename;
+      data.path = `/images/banners/${filename}`;
+    }
+    if (thumb && media.thumbnailPath !== thumb.url) data.thumbnailPath = thumb.url;
+    if (metadata) {
+      if (metadata.duration && media.duration !== metadata.duration) data.duration = metadata.duration;
+      if (metadata.width && media.width !== metadata.width) data.width = metadata.width;
+      if (metadata.height && media.height !== metadata.height) data.height = metadata.height;
+    }
+    if (Object.keys(data).length > 0) {
+      await ctx.prisma.bannerImage.update({ where: { id: media.id }, data });
+      ctx.updated++;
+    }
+  }
+}
+
+async function loadMedia(args) {
+  if (args.dir) {
+    return {
+      prisma: null,
+      media: fs.readdirSync(args.dir)
+        .filter(isVideo)
+        .map((filename) => ({ filename, path: path.join(args.dir, filename) })),
+    };
+  }
+
+  const { PrismaClient } = require('@prisma/client');
+  const prisma = new PrismaClient();
+  const allMedia = await prisma.bannerImage.findMany({
+    where: { isActive: true },
+    select: {
+      id: true,
+      filename: true,
+      thumbnailPath: true,
+      duration: true,
+      width: true,
+      height: true,
+    },
+  });
+  return {
+    prisma,
+    media: allMedia
+      .filter((m) => isVideo(m.filename))
+      .map((m) => ({ ...m, path: path.join(BANNERS_DIR, m.filename) })),
+  };
+}
+
+function formatMs(ms) {
+  return ms >= 1000 ? `${(ms / 1000).toFixed(1)}s` : `${Math.round(ms)}ms`;
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+
+  console.log('='.repeat(60));
+  console.log('Elaborazione Media (probe, conversione, thumbnail)');
+  console.log('='.repeat(60));
+
+  if (!fs.existsSync(THUMBNAILS_DIR)) {
+    fs.mkdirSync(THUMBNAILS_DIR, { recursive: true });
+  }
+
+  const { prisma, media } = await loadMedia(args);
+  const timings = [];
+  const ctx = {
+    args,
+    prisma,
+    pool: new Pool(args.jobs),
+    threads: Math.max(1, Math.floor(args.cores / args.jobs)),
+    manifest: new Manifest(args.manifest),
+    updated: 0,
+    record(item, profile, status, ms, error) {
+      timings.push({ profile, status, ms });
+      if (status === 'skip') return;
+      const line = `  [${profile}] ${item.filename} ${status === 'ok' ? 'OK' : 'ERRORE'} ${formatMs(ms)}`;
+      console.log(error ? `${line}: ${error}` : line);
+    },
+  };
+
+  console.log(`Video: ${media.length}`);
+  console.log(`Pool: ${args.jobs} processi, ${ctx.threads} thread per conversione`);
+  console.log(`Manifest: ${args.manifest}`);
+  console.log('-'.repeat(60));
+
+  const started = process.hrtime.bigint();
+  try {
+    // Un errore imprevisto (hash, database) ferma solo il suo video: il
+    // manifest e la connessione si chiudono dopo che tutti i lavori sono finiti
+    await Promise.all(media.map((item) =>
+      processMedia(ctx, item).catch((err) => ctx.record(item, 'media', 'error', 0, err.message))
+    ));
+  } finally {
+    ctx.manifest.save();
+    if (prisma) await prisma.$disconnect();
+  }
+  const wall = Number(process.hrtime.bigint() - started) / 1e6;
+
+  console.log('');
+  console.log('='.repeat(60));
+  console.log('RIEPILOGO');
+  console.log('='.repeat(60));
+  let busy = 0;
+  for (const profile of Object.values(PROFILES)) {
+    const done = timings.filter((t) => t.profile === profile && t.status === 'ok');
+    const skipped = timings.filter((t) => t.profile === profile && t.status === 'skip').length;
+    const failed = timings.filter((t) => t.profile === profile && t.status === 'error').length;
+    if (done.length + skipped + failed === 0) continue;
+    const total = done.reduce((sum, t) => sum + t.ms, 0);
+    const max = done.reduce((m, t) => Math.max(m, t.ms), 0);
+    busy += total;
+    console.log(`${profile.padEnd(10)} eseguiti ${done.length}, gia fatti ${skipped}, falliti ${failed}` +
+      (done.length ? ` - media ${formatMs(total / done.length)}, max ${formatMs(max)}` : ''));
+  }
+  const missing = timings.filter((t) => t.profile === 'file').length;
+  if (missing) console.log(`File mancanti: ${missing}`);
+  const unexpected = timings.filter((t) => t.profile === 'media').length;
+  if (unexpected) console.log(`Video interrotti da errori imprevisti: ${unexpected}`);
+  if (prisma) console.log(`DB aggiornati: ${ctx.updated}`);
+  console.log(`Tempo totale: ${formatMs(wall)} (tempo lavori ${formatMs(busy)}, ` +
+    `parallelismo ${(busy / Math.max(wall, 1)).toFixed(1)}x)`);
+  console.log('='.repeat(60));
+
+  if (timings.some((t) => t.status === 'error')) process.exitCode = 1;
+}
+
+main().catch((err) => {
+  console.error(err);
+  process.exit(1);
+});
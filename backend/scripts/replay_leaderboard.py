@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Ricostruzione della classifica di un torneo a un istante qualsiasi.
+
+Catture approvate e penalita' diventano un registro di eventi ordinato:
+  - cattura: al momento dell'approvazione (reviewedAt, altrimenti caughtAt)
+  - penalita': emissione (issuedAt), sospensione durante l'appello
+    (appealedAt, come getTeamPenaltyPoints che conta solo ACTIVE/UPHELD),
+    conferma (appealDecidedAt se UPHELD), scadenza (updatedAt se EXPIRED)
+Il registro si ricava dallo stato attuale: la classifica "alle 14:00" e'
+quella che risulta oggi, con appelli e rifiuti gia' decisi. Un appello
+accolto azzera i punti della penalita' (decideAppeal), quindi prima
+dell'appello conta 0.
+
+Durante la ricostruzione si salvano istantanee della classifica ogni
+--snapshot-interval minuti (tempo degli eventi), in
+backend/leaderboard-snapshots/<tournamentId>/. Ogni istantanea ha
+un'impronta della storia fino al suo istante (numero e ultimo updatedAt
+delle catture, elenco degli eventi penalita'): per rispondere si parte
+dall'istantanea valida piu' recente prima dell'istante richiesto e si
+rielaborano solo gli eventi successivi. Le istantanee la cui storia e'
+cambiata (appello deciso, cattura rifiutata dopo) vengono scartate.
+
+Il totale e' punti catture + punti penalita' (negativi); gli squalificati
+restano in fondo senza posizione. Con --apply (solo senza --at) i totali
+e i rank ricalcolati vengono scritti in leaderboard_entries.
+
+Uso:
+    python backend/scripts/replay_leaderboard.py --tournament ID [--at "2026-06-01 14:00"]
+                                                 [--top 20] [--json FILE] [--apply]
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from database import BACKEND_DIR, connect
+from rerank_leaderboards import write_ranks
+
+SNAPSHOT_DIR = os.environ.get("LEADERBOARD_SNAPSHOT_DIR") or os.path.join(BACKEND_DIR, "leaderboard-snapshots")
+SNAPSHOT_VERSION = 1
+SNAPSHOT_INTERVAL = 60
+
+# Eventi a pari istante: prima le catture, poi le penalita', poi per id
+Event = namedtuple("Event", "at order id user team points weight disqualification")
+CATCH, PENALTY = 0, 1
+
+
+def stamp(value):
+    """Data del database (UTC) come 'YYYY-MM-DD HH:MM:SS.fff', confrontabile come stringa"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:23]
+
+def parse_at(text):
+    """Istante richiesto: ora locale se senza fuso, restituito come stamp UTC"""
+    if not text:
+        return stamp(datetime.now(timezone.utc))
+    value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return stamp(value.astimezone(timezone.utc) if value.tzinfo else value.astimezone())
+
+def catch_events(db, tournament_id, after, until):
+    """Catture approvate con istante di approvazione in (after, until]"""
+    rows = db.query(
+        "SELECT id, userId, points, weight, COALESCE(reviewedAt, caughtAt) AS at FROM catches "
+        "WHERE tournamentId = %s AND status = 'APPROVED' "
+        "AND COALESCE(reviewedAt, caughtAt) > %s AND COALESCE(reviewedAt, caughtAt) <= %s",
+        (tournament_id, after, until),
+    )
+    return sorted(
+        Event(stamp(r["at"]), CATCH, r["id"], r["userId"], None, float(r["points"] or 0),
+              float(r["weight"] or 0), 0)
+        for r in rows
+    )
+
+def penalty_events(db, tournament_id):
+    """Tutti gli eventi penalita' del torneo (pochi: si tengono in memoria)"""
+    events = []
+    for p in db.query(
+        "SELECT id, type, status, points, userId, teamId, issuedAt, appealedAt, appealDecidedAt, updatedAt "
+        "FROM penalties WHERE tournamentId = %s", (tournament_id,)
+    ):
+        disqualification = 1 if p["type"] == "DISQUALIFICATION" else 0
+
+        def event(at, sign):
+            events.append(Event(stamp(at), PENALTY, p["id"], p["userId"], p["teamId"],
+                                sign * p["points"], 0.0, sign * disqualification))
+
+        event(p["issuedAt"], 1)
+        if p["appealedAt"]:
+            event(p["appealedAt"], -1)
+            if p["status"] == "UPHELD" and p["appealDecidedAt"]:
+                event(p["appealDecidedAt"], 1)
+        elif p["status"] == "EXPIRED":
+            event(p["updatedAt"], -1)
+    return sorted(events)
+
+def fingerprint(db, tournament_id, at, penalties):
+    """Impronta della storia fino ad `at`: cambia se cambia qualcosa prima di `at`"""
+    row = db.query(
+        "SELECT COUNT(*) AS count, MAX(updatedAt) AS updated FROM catches "
+        "WHERE tournamentId = %s AND COALESCE(reviewedAt, caughtAt) <= %s",
+        (tournament_id, at),
+    )[0]
+    digest = hashlib.sha1(f"{row['count']}|{stamp(row['updated'])}".encode())
+    for event in penalties:
+        if event.at > at:
+            break
+        digest.update(repr(tuple(event)).encode())
+    return digest.hexdigest()
+
+
+class Leaderboard:
+    """Totali per partecipante e penalita' per team dopo una sequenza di eventi"""
+
+    def __init__(self, users=None, teams=None):
+        # userId -> [punti catture, peso, catture, cattura maggiore, punti penalita', squalifiche]
+        self.users = users or {}
+        # teamId -> [punti penalita', squalifiche]
+        self.teams = teams or {}
+
+    def apply(self, event):
+        if event.order == CATCH:
+            entry = self.users.setdefault(event.user, [0.0, 0.0, 0, None, 0, 0])
+            entry[0] += event.points
+            entry[1] += event.weight
+            entry[2] += 1
+            entry[3] = event.weight if entry[3] is None else max(entry[3], event.weight)
+        elif event.user:
+            entry = self.users.setdefault(event.user, [0.0, 0.0, 0, None, 0, 0])
+            entry[4] += event.points
+            entry[5] += event.disqualification
+        elif event.team:
+            entry = self.teams.setdefault(event.team, [0, 0])
+            entry[0] += event.points
+            entry[1] += event.disqualification
+
+    def to_json(self):
+        return {"users": self.users, "teams": self.teams}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["users"], data["teams"])
+
+    def ranking(self):
+        """Righe ordinate come recalculateRanks (rank denso), squalificati in fondo"""
+        rows = [
+            {"userId": user, "catchPoints": round(e[0], 2), "penaltyPoints": e[4],
+             "totalPoints": round(e[0] + e[4], 2), "totalWeight": round(e[1], 3), "catchCount": e[2],
+             "biggestCatch": e[3], "disqualified": e[5] > 0}
+            for user, e in self.users.items()
+        ]
+        rows.sort(key=lambda r: (r["disqualified"], -r["totalPoints"],
+                                 -(r["biggestCatch"] if r["biggestCatch"] is not None else -1),
+                                 -r["catchCount"], r["userId"]))
+        rank, previous = 0, None
+        for row in rows:
+            key = (row["totalPoints"], row["biggestCatch"], row["catchCount"])
+            if key != previous:
+                rank += 1
+                previous = key
+            row["rank"] = None if row["disqualified"] else rank
+        return rows
+
+
+class SnapshotStore:
+    """Istantanee JSON di un torneo, una per file: <istante>.json"""
+
+    def __init__(self, root, tournament_id):
+        self.dir = os.path.join(root, tournament_id)
+
+    def _path(self, at):
+        return os.path.join(self.dir, at.replace("-", "").replace(":", "").replace(" ", "T") + ".json")
+
+    def candidates(self, at):
+        """Istantanee fino ad `at`, dalla piu' recente"""
+        if not os.path.isdir(self.dir):
+            return
+        for name in sorted(os.listdir(self.dir), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.dir, name), encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get("version") == SNAPSHOT_VERSION and snapshot["at"] <= at:
+                yield snapshot
+
+    def save(self, at, fingerprint, board):
+        os.makedirs(self.dir, exist_ok=True)
+        path = self._path(at)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "at": at, "fingerprint": fingerprint,
+                       "state": board.to_json()}, f, separators=(",", ":"))
+        os.replace(f"{path}.tmp", path)
+
+    def discard(self, at):
+        path = self._path(at)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def checkpoint_before(at, minutes):
+    """Ultimo istante della griglia di `minutes` minuti non successivo ad `at`"""
+    value = datetime.strptime(at, "%Y-%m-%d %H:%M:%S.%f")
+    step = timedelta(minutes=minutes)
+    return stamp(datetime.min + (value - datetime.min) // step * step)
+
+def replay(db, tournament_id, at, store, interval=SNAPSHOT_INTERVAL):
+    """Classifica ad `at` dall'istantanea valida piu' recente; restituisce (classifica, statistiche)"""
+    penalties = penalty_events(db, tournament_id)
+    stats = {"snapshot": None, "discarded": 0, "events": 0, "saved": 0}
+
+    board, start = Leaderboard(), ""
+    for snapshot in store.candidates(at):
+        if snapshot["fingerprint"] == fingerprint(db, tournament_id, snapshot["at"], penalties):
+            board, start = Leaderboard.from_json(snapshot["state"]), snapshot["at"]
+            stats["snapshot"] = start
+            break
+        store.discard(snapshot["at"])
+        stats["discarded"] += 1
+
+    tail = [e for e in penalties if start < e.at <= at]
+    pending, last_at = 0, start
+    for event in heapq.merge(catch_events(db, tournament_id, start, at), tail):
+        # Istantanea sull'ultimo punto della griglia prima di questo evento, solo
+        # se la classifica non contiene ancora eventi successivi a quel punto
+        if interval and pending:
+            boundary = checkpoint_before(event.at, interval)
+            if start < boundary < event.at and last_at <= boundary:
+                store.save(boundary, fingerprint(db, tournament_id, boundary, penalties), board)
+                stats["saved"] += 1
+                start, pending = boundary, 0
+        board.apply(event)
+        stats["events"] += 1
+        pending += 1
+        last_at = event.at
+    return board, stats
+
+def load_names(db, user_ids):
+    names = {}
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), 1000):
+        chunk = user_ids[start:start + 1000]
+        for row in db.query(f"SELECT id, firstName, lastName FROM users WHERE id IN ({db.placeholders(len(chunk))})",
+                            chunk):
+            names[row["id"]] = f"{row['firstName']} {row['lastName']}"
+    return names
+
+def apply_to_entries(db, tournament_id, ranking):
+    """Scrive totali e rank ricostruiti in leaderboard_entries (solo voci esistenti)"""
+    rows = {row["userId"]: row for row in ranking}
+    entries = db.query("SELECT id, userId, `rank` FROM leaderboard_entries WHERE tournamentId = %s",
+                       (tournament_id,))
+    empty = {"totalPoints": 0, "totalWeight": 0, "catchCount": 0, "biggestCatch": None, "rank": None}
+    totals, ranks = [], []
+    for entry in entries:
+        row = rows.get(entry["userId"], empty)
+        totals.append((row["totalPoints"], row["totalWeight"], row["catchCount"], row["biggestCatch"],
+                       entry["id"]))
+        # Squalificati e voci senza eventi dopo l'ultimo in classifica
+        rank = row["rank"] if row["rank"] is not None else len(ranking) + 1
+        if entry["rank"] != rank:
+            ranks.append((entry["id"], rank))
+    with db.transaction():
+        db.executemany(
+            "UPDATE leaderboard_entries SET totalPoints = %s, totalWeight = %s, catchCount = %s, "
+            "biggestCatch = %s, lastUpdated = CURRENT_TIMESTAMP, updatedAt = CURRENT_TIMESTAMP WHERE id = %s",
+            totals,
+        )
+        write_ranks(db, ranks)
+    return len(entries), len(set(rows) - {e["userId"] for e in entries})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricostruzione della classifica a un istante")
+    parser.add_argument("--tournament", required=True, help="id torneo")
+    parser.add_argument("--at", default=None,
+                        help="istante (ISO, ora locale se senza fuso; default: adesso)")
+    parser.add_argument("--snapshot-interval", type=int, default=SNAPSHOT_INTERVAL,
+                        help="minuti tra le istantanee salvate, 0 = nessuna (default: %(default)s)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR,
+                        help="cartella delle istantanee (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=20,
+                        help="posizioni mostrate (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", default=None,
+                        help="classifica completa in JSON ('-' = stdout)")
+    parser.add_argument("--apply", action="store_true",
+                        help="scrive totali e rank in leaderboard_entries (solo senza --at)")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+    if args.apply and args.at:
+        parser.error("--apply ricostruisce la classifica attuale: non usare --at")
+
+    db = connect(args.database_url)
+    log = sys.stderr if args.json == "-" else sys.stdout
+    at = parse_at(args.at)
+
+    started = time.perf_counter()
+    try:
+        board, stats = replay(db, args.tournament, at, SnapshotStore(args.snapshot_dir, args.tournament),
+                              args.snapshot_interval)
+        ranking = board.ranking()
+        names = load_names(db, [row["userId"] for row in ranking[:args.top]])
+        applied = apply_to_entries(db, args.tournament, ranking) if args.apply else None
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        data = {"tournamentId": args.tournament, "at": at, "leaderboard": ranking,
+                "teamPenalties": {team: {"points": p[0], "disqualified": p[1] > 0}
+                                  for team, p in board.teams.items()}}
+        if args.json == "-":
+            json.dump(data, sys.stdout, ensure_ascii=False)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+    print("="*60, file=log)
+    print(f"Classifica {args.tournament} al {at} UTC", file=log)
+    print("="*60, file=log)
+    source = f"istantanea {stats['snapshot']}" if stats["snapshot"] else "inizio torneo"
+    print(f"Partenza: {source}, eventi rielaborati: {stats['events']}, "
+          f"istantanee salvate: {stats['saved']}, scartate: {stats['discarded']} ({elapsed:.2f}s)", file=log)
+    for row in ranking[:args.top]:
+        position = row["rank"] if row["rank"] is not None else "SQ"
+        print(f"{position:>4}  {names.get(row['userId'], row['userId'])[:30]:<30} "
+              f"{row['totalPoints']:>10.2f} (pen. {row['penaltyPoints']:+d})  "
+              f"{row['catchCount']:>4} catture", file=log)
+    if applied:
+        print(f"leaderboard_entries aggiornate: {applied[0]}, partecipanti senza voce: {applied[1]}", file=log)
+    print("="*60, file=log)
+
+if __name__ == "__main__":
+    main()
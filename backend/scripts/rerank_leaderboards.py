@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Ricalcolo in blocco dei rank delle classifiche (leaderboard_entries).
+
+Stesse regole di LeaderboardService.recalculateRanks:
+  - ordine per totalPoints, biggestCatch, catchCount (decrescenti,
+    biggestCatch nullo in fondo)
+  - rank denso: a parita' su tutti e tre i valori il rank e' lo stesso
+  - vengono scritti solo i rank cambiati, con un UPDATE ... CASE id per
+    blocco di --chunk righe invece di un UPDATE per partecipante
+
+Con --recompute-totals ricalcola prima punti, peso, numero catture e cattura
+piu' grande dalle catture APPROVED (un solo GROUP BY per torneo), come
+LeaderboardService.updateEntry.
+
+Uso:
+    python backend/scripts/rerank_leaderboards.py --tournament ID [--tournament ID ...]
+    python backend/scripts/rerank_leaderboards.py --all-completed [--tenant ID] [--dry-run]
+"""
+
+import argparse
+import sys
+import time
+from itertools import groupby
+
+from database import connect
+
+# Righe aggiornate da un singolo UPDATE ... CASE
+CHUNK_SIZE = 1000
+
+
+class _DryRun(Exception):
+    """Annulla la transazione del dry run (compresi i totali ricalcolati)"""
+
+
+def select_tournaments(db, tournaments=None, tenant=None, all_completed=False):
+    """Id dei tornei da ricalcolare"""
+    if tournaments:
+        return list(tournaments)
+    sql = "SELECT id FROM tournaments WHERE status = 'COMPLETED'"
+    params = []
+    if tenant:
+        sql += " AND tenantId = %s"
+        params.append(tenant)
+    return [row["id"] for row in db.query(sql + " ORDER BY id", params)]
+
+
+def dense_ranks(entries):
+    """
+    (id, rank) per le voci di un torneo gia' ordinate come la classifica,
+    solo dove il rank salvato e' diverso
+    """
+    changes = []
+    rank = 0
+    previous = None
+    for entry in entries:
+        key = (float(entry["totalPoints"]),
+               float(entry["biggestCatch"]) if entry["biggestCatch"] is not None else None,
+               entry["catchCount"])
+        if key != previous:
+            rank += 1
+            previous = key
+        if entry["rank"] != rank:
+            changes.append((entry["id"], rank))
+    return changes
+
+
+def write_ranks(db, changes, chunk=CHUNK_SIZE):
+    """UPDATE ... SET rank = CASE id WHEN ... END a blocchi di `chunk` righe"""
+    updated = 0
+    for start in range(0, len(changes), chunk):
+        block = changes[start:start + chunk]
+        cases = " ".join(["WHEN %s THEN %s"] * len(block))
+        params = [value for change in block for value in change]
+        params.extend(entry_id for entry_id, _ in block)
+        updated += db.execute(
+            f"UPDATE leaderboard_entries SET `rank` = CASE id {cases} END, "
+            f"updatedAt = CURRENT_TIMESTAMP WHERE id IN ({db.placeholders(len(block))})",
+            params,
+        )
+    return updated
+
+
+def recompute_totals(db, tournament_ids):
+    """Totali delle voci ricalcolati dalle catture APPROVED"""
+    rows = []
+    for tournament_id in tournament_ids:
+        totals = {
+            row["userId"]: row
+            for row in db.query(
+                "SELECT userId, COALESCE(SUM(points), 0) AS totalPoints, "
+                "COALESCE(SUM(weight), 0) AS totalWeight, COUNT(*) AS catchCount, "
+                "MAX(weight) AS biggestCatch FROM catches "
+                "WHERE tournamentId = %s AND status = 'APPROVED' GROUP BY userId",
+                (tournament_id,),
+            )
+        }
+        for entry in db.query("SELECT userId FROM leaderboard_entries WHERE tournamentId = %s",
+                              (tournament_id,)):
+            total = totals.get(entry["userId"])
+            if total is None:
+                rows.append((0, 0, 0, None, tournament_id, entry["userId"]))
+            else:
+                rows.append((total["totalPoints"], total["totalWeight"], total["catchCount"],
+                             total["biggestCatch"], tournament_id, entry["userId"]))
+    if rows:
+        db.executemany(
+            "UPDATE leaderboard_entries SET totalPoints = %s, totalWeight = %s, catchCount = %s, "
+            "biggestCatch = %s, updatedAt = CURRENT_TIMESTAMP "
+            "WHERE tournamentId = %s AND userId = %s",
+            rows,
+        )
+    return len(rows)
+
+
+def rank_changes(db, tournament_ids):
+    """Rank cambiati per torneo, leggendo le voci in streaming"""
+    if not tournament_ids:
+        return {}
+    entries = db.stream(
+        "SELECT id, tournamentId, `rank`, totalPoints, biggestCatch, catchCount "
+        f"FROM leaderboard_entries WHERE tournamentId IN ({db.placeholders(len(tournament_ids))}) "
+        "ORDER BY tournamentId, totalPoints DESC, biggestCatch DESC, catchCount DESC",
+        tournament_ids,
+    )
+    return {
+        tournament_id: dense_ranks(group)
+        for tournament_id, group in groupby(entries, key=lambda entry: entry["tournamentId"])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricalcolo in blocco dei rank delle classifiche")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--tournament", action="append", default=None,
+                        help="id torneo (ripetibile)")
+    target.add_argument("--all-completed", action="store_true",
+                        help="tutti i tornei COMPLETED (backfill)")
+    parser.add_argument("--tenant", default=None,
+                        help="con --all-completed: solo i tornei di questa associazione")
+    parser.add_argument("--recompute-totals", action="store_true",
+                        help="ricalcola prima i totali dalle catture approvate")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE,
+                        help="righe per UPDATE (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="mostra i rank da cambiare senza scrivere")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+
+    db = connect(args.database_url)
+    started = time.perf_counter()
+    tournament_ids = select_tournaments(db, args.tournament, args.tenant, args.all_completed)
+
+    print("="*60)
+    print("Ricalcolo Rank Classifiche")
+    print("="*60)
+    print(f"Tornei: {len(tournament_ids)}")
+
+    try:
+        with db.transaction():
+            if args.recompute_totals:
+                entries = recompute_totals(db, tournament_ids)
+                print(f"Totali ricalcolati: {entries} voci")
+            changes = rank_changes(db, tournament_ids)
+            pending = sum(len(tournament_changes) for tournament_changes in changes.values())
+            if args.dry_run:
+                for tournament_id, tournament_changes in changes.items():
+                    if tournament_changes:
+                        print(f"  {tournament_id}: {len(tournament_changes)} rank da aggiornare")
+                raise _DryRun()
+            updated = sum(write_ranks(db, tournament_changes, args.chunk)
+                          for tournament_changes in changes.values())
+    except _DryRun:
+        print(f"Dry run: {pending} rank da aggiornare, nessuna modifica scritta")
+    else:
+        print(f"Rank aggiornati: {updated}")
+    finally:
+        db.close()
+
+    print(f"Tempo: {time.perf_counter() - started:.2f}s")
+    print("="*60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
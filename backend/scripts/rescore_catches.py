@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Ricalcolo vettoriale dei punteggi Catch & Release.
+
+Carica le catture approvate dei tornei CATCH_RELEASE e le tabelle
+SpeciesScoring in array NumPy e calcola fascia (S/M/L/XL) e punti di tutte
+le catture in un solo passaggio:
+  - fascia dalla lunghezza alla forca con le soglie thresholdSmallCm /
+    thresholdMediumCm / thresholdLargeCm: la fascia sale di uno per la
+    soglia più alta raggiunta (S = S, ..., L = XL, sotto tutte = S), le
+    soglie NULL vengono saltate; senza soglie o lunghezza si usa la
+    sizeCategory assegnata dal giudice. Questa regola è propria dello
+    script: CatchService.calculateCatchReleasePoints usa sempre la
+    sizeCategory (--stored-bands riproduce quel comportamento)
+  - punti della fascia come CatchService, 100/200/400/800 se la specie non
+    ha SpeciesScoring
+  - rilascio: punti * catchReleaseBonus (default 1.5), arrotondati
+  - cattura senza specie: 0 punti
+
+Lo script non scrive mai sul database. Senza --what-if confronta i punti
+salvati con quelli ricalcolati; con --what-if confronta le regole attuali
+con quelle dello scenario:
+
+    {
+      "default": {"catchReleaseBonus": 2.0},
+      "species": {
+        "Alalunga": {"thresholdSmallCm": 60, "thresholdMediumCm": 80,
+                     "thresholdLargeCm": 100, "pointsLarge": 500}
+      }
+    }
+
+(specie indicate per id, nome scientifico o nome italiano).
+
+Uso:
+    python backend/scripts/rescore_catches.py [--tournament ID ...] [--tenant ID] [--season ANNO]
+                                              [--what-if SCENARIO.json] [--diff FILE.csv]
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from database import connect
+
+SIZE_CATEGORIES = ("SMALL", "MEDIUM", "LARGE", "EXTRA_LARGE")
+BAND_LABELS = ("S", "M", "L", "XL")
+
+# Valori usati da CatchService quando manca la riga SpeciesScoring
+DEFAULT_POINTS = (100, 200, 400, 800)
+DEFAULT_BONUS = 1.5
+
+THRESHOLD_FIELDS = ("thresholdSmallCm", "thresholdMediumCm", "thresholdLargeCm")
+POINTS_FIELDS = ("pointsSmall", "pointsMedium", "pointsLarge", "pointsExtraLarge")
+
+
+class CatchBatch:
+    """Catture come colonne NumPy (una posizione per cattura)"""
+
+    def __init__(self, rows):
+        self.ids = np.array([r["id"] for r in rows], dtype=object)
+        self.tournament_ids = np.array([r["tournamentId"] for r in rows], dtype=str)
+        self.species_ids = np.array([r["speciesId"] or "" for r in rows], dtype=str)
+        self.length = np.array([np.nan if r["length"] is None else float(r["length"]) for r in rows])
+        self.released = np.array([bool(r["wasReleased"]) for r in rows])
+        self.points = np.array([np.nan if r["points"] is None else float(r["points"]) for r in rows])
+        codes = {name: code for code, name in enumerate(SIZE_CATEGORIES)}
+        # Categoria mancante: CatchService usa i punti della fascia S
+        self.stored_bands = np.array([codes.get(r["sizeCategory"], 0) for r in rows], dtype=np.int8)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ScoringTable:
+    """
+    Righe SpeciesScoring come array, ordinate per chiave torneo|specie.
+    L'ultima riga contiene i valori di default per le specie senza configurazione.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: (r["tournamentId"], r["speciesId"]))
+        self.keys = np.array([f"{r['tournamentId']}|{r['speciesId']}" for r in rows], dtype=str)
+        self.species_ids = np.array([r["speciesId"] for r in rows] + [""], dtype=str)
+        self.thresholds = np.array(
+            [[np.nan if r[f] is None else float(r[f]) for f in THRESHOLD_FIELDS] for r in rows]
+            + [[np.nan] * 3], dtype=float).reshape(-1, 3)
+        self.points = np.array(
+            [[float(r[f]) for f in POINTS_FIELDS] for r in rows] + [DEFAULT_POINTS],
+            dtype=float).reshape(-1, 4)
+        self.bonus = np.array(
+            [float(r["catchReleaseBonus"] or 0) or DEFAULT_BONUS for r in rows] + [DEFAULT_BONUS])
+
+    def copy(self):
+        table = object.__new__(ScoringTable)
+        table.keys = self.keys
+        table.species_ids = self.species_ids
+        table.thresholds = self.thresholds.copy()
+        table.points = self.points.copy()
+        table.bonus = self.bonus.copy()
+        return table
+
+    def lookup(self, tournament_ids, species_ids):
+        """Indice della riga di ogni cattura (riga di default se non configurata)"""
+        default = len(self.keys)
+        if not default:
+            return np.full(len(tournament_ids), default)
+        keys = np.char.add(np.char.add(tournament_ids, "|"), species_ids)
+        index = np.searchsorted(self.keys, keys)
+        found = self.keys[np.minimum(index, default - 1)] == keys
+        return np.where(found, index, default)
+
+    def add_defaults(self, tournament_ids, species_id):
+        """Righe per `species_id` nei tornei che non la configurano, copiate dalla riga di default"""
+        keys = np.setdiff1d(np.char.add(np.unique(tournament_ids), f"|{species_id}"), self.keys)
+        if not len(keys):
+            return
+        default = len(self.keys)
+        all_keys = np.concatenate([self.keys, keys])
+        order = np.argsort(all_keys, kind="stable")
+        # Riga sorgente di ogni nuova riga, la riga di default resta l'ultima
+        source = np.append(np.concatenate([np.arange(default), np.full(len(keys), default)])[order], default)
+        species_ids = np.concatenate([self.species_ids[:default], np.full(len(keys), species_id)])
+        self.keys = all_keys[order]
+        self.species_ids = np.append(species_ids[order], "")
+        self.thresholds = self.thresholds[source]
+        self.points = self.points[source]
+        self.bonus = self.bonus[source]
+
+    def apply(self, mask, fields):
+        """Sostituisce i campi SpeciesScoring `fields` nelle righe selezionate da `mask`"""
+        for name, value in fields.items():
+            if name in THRESHOLD_FIELDS:
+                self.thresholds[mask, THRESHOLD_FIELDS.index(name)] = np.nan if value is None else value
+            elif name in POINTS_FIELDS:
+                self.points[mask, POINTS_FIELDS.index(name)] = value
+            elif name == "catchReleaseBonus":
+                self.bonus[mask] = value or DEFAULT_BONUS
+            else:
+                raise ValueError(f"Campo sconosciuto nello scenario: {name}")
+
+
+def score(batch, table, stored_bands=False):
+    """
+    Fascia e punti di tutte le catture in un passaggio vettoriale.
+    Restituisce (fasce 0-3, punti).
+    """
+    row = table.lookup(batch.tournament_ids, batch.species_ids)
+    if stored_bands:
+        bands = batch.stored_bands.astype(np.intp)
+    else:
+        thresholds = table.thresholds[row]
+        usable = ~np.isnan(batch.length) & ~np.isnan(thresholds).all(axis=1)
+        # Fascia = 1 + indice della soglia più alta raggiunta; le soglie NULL
+        # non sono mai raggiunte ma non abbassano quelle successive
+        with np.errstate(invalid="ignore"):
+            reached = batch.length[:, None] >= thresholds
+        highest = len(THRESHOLD_FIELDS) - np.argmax(reached[:, ::-1], axis=1)
+        from_length = np.where(reached.any(axis=1), highest, 0)
+        bands = np.where(usable, from_length, batch.stored_bands).astype(np.intp)
+
+    base = table.points[row, bands]
+    # Math.round di JavaScript: metà arrotondata verso l'alto
+    points = np.where(batch.released, np.floor(base * table.bonus[row] + 0.5), base)
+    points[batch.species_ids == ""] = 0
+    return bands, points
+
+def load_catches(db, tournaments=None, tenant=None, season=None):
+    """Catture approvate dei tornei Catch & Release (filtri opzionali)"""
+    sql = """
+        SELECT c.id, c.tournamentId, c.speciesId, c.sizeCategory, c.length,
+               c.wasReleased, c.points
+        FROM catches c JOIN tournaments t ON t.id = c.tournamentId
+        WHERE c.status = 'APPROVED' AND t.gameMode = 'CATCH_RELEASE'
+    """
+    params = []
+    if tournaments:
+        sql += f" AND t.id IN ({db.placeholders(len(tournaments))})"
+        params.extend(tournaments)
+    if tenant:
+        sql += " AND t.tenantId = %s"
+        params.append(tenant)
+    if season:
+        sql += " AND t.startDate >= %s AND t.startDate < %s"
+        params.extend([f"{season}-01-01", f"{season + 1}-01-01"])
+    return CatchBatch(list(db.stream(sql, params)))
+
+def load_scoring(db, tournament_ids):
+    """Righe SpeciesScoring dei tornei che compaiono nelle catture"""
+    tournament_ids = sorted(set(tournament_ids))
+    if not tournament_ids:
+        return ScoringTable([])
+    rows = []
+    # IN (...) a blocchi per non superare i limiti di parametri
+    for start in range(0, len(tournament_ids), 1000):
+        chunk = tournament_ids[start:start + 1000]
+        rows.extend(db.query(
+            f"SELECT * FROM species_scoring WHERE tournamentId IN ({db.placeholders(len(chunk))})",
+            chunk,
+        ))
+    return ScoringTable(rows)
+
+def load_species_names(db):
+    """id, nome scientifico e nome italiano (minuscoli) -> id specie"""
+    names = {}
+    for row in db.query("SELECT id, scientificName, commonNameIt FROM species"):
+        for value in (row["id"], row["scientificName"], row["commonNameIt"]):
+            if value:
+                names[value.lower()] = row["id"]
+    return names
+
+def apply_scenario(table, scenario, species_names, tournament_ids):
+    """Copia di `table` con le modifiche dello scenario what-if"""
+    table = table.copy()
+    everything = np.ones(len(table.bonus), dtype=bool)
+    table.apply(everything, scenario.get("default", {}))
+    for name, fields in scenario.get("species", {}).items():
+        species_id = species_names.get(name.lower())
+        if species_id is None:
+            raise ValueError(f"Specie sconosciuta nello scenario: {name}")
+        # Le catture di una specie senza SpeciesScoring usano la riga di default:
+        # la modifica vale anche per loro, partendo dai valori di default
+        table.add_defaults(tournament_ids, species_id)
+        table.apply(table.species_ids == species_id, fields)
+    return table
+
+def changes(before, after):
+    """Indici delle catture i cui punti cambiano (punti mancanti contano come modifica)"""
+    return np.flatnonzero(~np.isclose(before[1], after[1], rtol=0, atol=0.005))
+
+def write_diff(path, batch, changed, before, after):
+    (bands_before, points_before), (bands_after, points_after) = before, after
+    target = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(target)
+        writer.writerow(["catchId", "tournamentId", "speciesId", "length", "wasReleased",
+                         "bandBefore", "bandAfter", "pointsBefore", "pointsAfter", "delta"])
+        for i in changed:
+            old = points_before[i]
+            writer.writerow([
+                batch.ids[i], batch.tournament_ids[i], batch.species_ids[i] or "",
+                "" if np.isnan(batch.length[i]) else f"{batch.length[i]:.2f}",
+                int(batch.released[i]),
+                BAND_LABELS[bands_before[i]], BAND_LABELS[bands_after[i]],
+                "" if np.isnan(old) else f"{old:.2f}", f"{points_after[i]:.2f}",
+                f"{points_after[i] - np.nan_to_num(old):.2f}",
+            ])
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+def tournament_deltas(batch, changed, before, after):
+    """Variazione totale dei punti per torneo, ordinata per valore assoluto"""
+    tournaments, inverse = np.unique(batch.tournament_ids[changed], return_inverse=True)
+    delta = after[1][changed] - np.nan_to_num(before[1][changed])
+    totals = np.bincount(inverse, weights=delta, minlength=len(tournaments))
+    counts = np.bincount(inverse, minlength=len(tournaments))
+    order = np.argsort(-np.abs(totals))
+    return [(tournaments[i], int(counts[i]), float(totals[i])) for i in order]
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricalcolo vettoriale punteggi Catch & Release")
+    parser.add_argument("--tournament", action="append", default=None,
+                        help="id torneo (ripetibile, default: tutti i tornei C&R)")
+    parser.add_argument("--tenant", default=None, help="solo i tornei di questa associazione")
+    parser.add_argument("--season", type=int, default=None, help="solo i tornei iniziati in quest'anno")
+    parser.add_argument("--what-if", metavar="SCENARIO", default=None,
+                        help="file JSON con soglie/punti/bonus alternativi")
+    parser.add_argument("--stored-bands", action="store_true",
+                        help="usa sempre la fascia assegnata dal giudice invece della lunghezza")
+    parser.add_argument("--diff", metavar="FILE", default=None,
+                        help="scrive le catture modificate in CSV ('-' = stdout)")
+    parser.add_argument("--top", type=int, default=10,
+                        help="tornei mostrati nel riepilogo (default: %(default)s)")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+
+    db = connect(args.database_url)
+    log = sys.stderr if args.diff == "-" else sys.stdout
+
+    started = time.perf_counter()
+    batch = load_catches(db, args.tournament, args.tenant, args.season)
+    scoring = load_scoring(db, batch.tournament_ids)
+    loaded = time.perf_counter()
+
+    current = score(batch, scoring, args.stored_bands)
+    if args.what_if:
+        with open(args.what_if, encoding="utf-8") as f:
+            scenario = json.load(f)
+        before = current
+        after = score(batch, apply_scenario(scoring, scenario, load_species_names(db), batch.tournament_ids),
+                      args.stored_bands)
+    else:
+        before = (batch.stored_bands.astype(np.intp), batch.points)
+        after = current
+    computed = time.perf_counter()
+    db.close()
+
+    changed = changes(before, after)
+    if args.diff:
+        write_diff(args.diff, batch, changed, before, after)
+
+    print("="*60, file=log)
+    print("Ricalcolo Punteggi Catch & Release", file=log)
+    print("="*60, file=log)
+    print(f"Catture: {len(batch)}, configurazioni SpeciesScoring: {len(scoring.keys)}", file=log)
+    print(f"Caricamento: {loaded - started:.2f}s, calcolo: {(computed - loaded) * 1000:.1f} ms", file=log)
+    label = "scenario vs regole attuali" if args.what_if else "ricalcolati vs salvati"
+    delta = float(np.sum(after[1][changed] - np.nan_to_num(before[1][changed])))
+    print(f"Punti modificati ({label}): {len(changed)} catture, variazione totale {delta:+.0f}", file=log)
+    for tournament, count, total in tournament_deltas(batch, changed, before, after)[:args.top]:
+        print(f"  {tournament}: {count} catture, {total:+.0f} punti", file=log)
+    print("="*60, file=log)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Verifica delle istantanee di replay_leaderboard.py su un database SQLite
+temporaneo: un'istantanea non deve contenere eventi successivi al suo istante.
+
+Uso:
+    python backend/scripts/test_replay_leaderboard.py
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from database import connect
+from replay_leaderboard import SnapshotStore, replay
+
+
+class SnapshotBoundaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "tm.db")
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE catches (id TEXT, tournamentId TEXT, userId TEXT, status TEXT, points REAL,
+                                  weight REAL, caughtAt TEXT, reviewedAt TEXT, updatedAt TEXT);
+            CREATE TABLE penalties (id TEXT, tournamentId TEXT, type TEXT, status TEXT, points INT,
+                                    userId TEXT, teamId TEXT, issuedAt TEXT, appealedAt TEXT,
+                                    appealDecidedAt TEXT, updatedAt TEXT);
+            INSERT INTO catches VALUES
+                ('c1', 't1', 'u1', 'APPROVED', 100, 5, '2026-06-01 13:50:00.000',
+                 '2026-06-01 14:05:00.000', '2026-06-01 14:05:00.000'),
+                ('c2', 't1', 'u2', 'APPROVED', 50, 3, '2026-06-01 13:55:00.000',
+                 '2026-06-01 14:10:00.000', '2026-06-01 14:10:00.000');
+        """)
+        conn.commit()
+        conn.close()
+        self.db = connect(f"sqlite:///{path}")
+        self.store = SnapshotStore(os.path.join(self.tmp.name, "snapshots"), "t1")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_snapshot_does_not_contain_later_events(self):
+        replay(self.db, "t1", "2026-06-01 15:00:00.000", self.store, 60)
+        for snapshot in self.store.candidates("2026-06-01 15:00:00.000"):
+            self.assertEqual(snapshot["state"]["users"], {},
+                             f"istantanea {snapshot['at']} con eventi successivi")
+
+        board, _ = replay(self.db, "t1", "2026-06-01 14:01:00.000", self.store, 60)
+        self.assertEqual(board.ranking(), [])
+
+    def test_snapshot_replay_matches_full_replay(self):
+        for at in ("2026-06-01 14:07:00.000", "2026-06-01 15:00:00.000"):
+            replay(self.db, "t1", "2026-06-01 15:00:00.000", self.store, 5)
+            cached, _ = replay(self.db, "t1", at, self.store, 5)
+            full, _ = replay(self.db, "t1", at, SnapshotStore(self.tmp.name, "none"), 0)
+            self.assertEqual(cached.ranking(), full.ranking())
+
+
+if __name__ == "__main__":
+    unittest.main()
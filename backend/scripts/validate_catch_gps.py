@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Verifica GPS in blocco delle catture di interi tornei.
+
+Stesse regole di GPSService.validateCatchLocation, ma le zone di pesca
+(fishing_zones attive) vengono lette e preparate una sola volta:
+  - ogni poligono GeoJSON (Polygon o parte di MultiPolygon) diventa un
+    array di lati, con il suo riquadro di ingombro
+  - i riquadri di ogni torneo formano un R-tree impacchettato con STR
+    (Sort-Tile-Recursive), interrogato per tutte le catture del torneo
+    insieme: il punto-nel-poligono (pari/dispari, in gradi come Turf) si
+    calcola solo per le zone il cui riquadro contiene la cattura
+  - per le catture fuori zona, la distanza dalla zona piu' vicina si calcola
+    solo per le zone il cui riquadro e' piu' vicino della distanza migliore
+    gia' trovata; la distanza punto-lato usa la proiezione equirettangolare
+    locale (scarto trascurabile rispetto a Turf per distanze di pochi km)
+
+Per ogni cattura: dentro/fuori zona, zona che la contiene, zona piu' vicina
+e distanza in metri; il riepilogo segnala le catture il cui isInsideZone
+salvato non coincide. Lo script non scrive mai sul database.
+
+Uso:
+    python backend/scripts/validate_catch_gps.py [--tournament ID ...] [--tenant ID]
+                                                 [--output FILE.csv] [--only-mismatch]
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from database import connect
+
+# Raggio terrestre medio usato da Turf (metri)
+EARTH_RADIUS = 6371008.8
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+
+# Figli per nodo dell'R-tree
+NODE_CAPACITY = 16
+
+# Coppie punto x lato calcolate per blocco (limita la memoria)
+PAIR_BLOCK = 2_000_000
+
+
+def str_pack(boxes, capacity=NODE_CAPACITY):
+    """
+    Ordine STR dei riquadri (minx, miny, maxx, maxy): fasce verticali per
+    centro x, ordinate per centro y al loro interno, poi gruppi di `capacity`.
+    Restituisce (ordine, inizio di ogni gruppo).
+    """
+    count = len(boxes)
+    groups = -(-count // capacity)
+    per_slice = math.ceil(math.sqrt(groups)) * capacity
+    center_x = boxes[:, 0] + boxes[:, 2]
+    center_y = boxes[:, 1] + boxes[:, 3]
+    by_x = np.argsort(center_x, kind="stable")
+    order = np.concatenate([
+        chunk[np.argsort(center_y[chunk], kind="stable")]
+        for chunk in np.array_split(by_x, range(per_slice, count, per_slice))
+    ])
+    return order, np.arange(0, count, capacity)
+
+
+class STRTree:
+    """R-tree statico sui riquadri, costruito con STR e interrogato in blocco"""
+
+    def __init__(self, boxes, capacity=NODE_CAPACITY):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.levels = []
+        if not len(boxes):
+            self.items = np.zeros(0, dtype=np.intp)
+            self.boxes = boxes
+            return
+        order, starts = str_pack(boxes, capacity)
+        self.items = order
+        self.boxes = boxes[order]
+
+        # Livelli dal basso: riquadri dei nodi e intervallo dei figli nel livello sotto
+        level = self.boxes
+        while True:
+            ends = np.append(starts[1:], len(level))
+            nodes = np.column_stack([
+                np.minimum.reduceat(level[:, 0], starts), np.minimum.reduceat(level[:, 1], starts),
+                np.maximum.reduceat(level[:, 2], starts), np.maximum.reduceat(level[:, 3], starts),
+            ])
+            if len(nodes) == 1:
+                self.levels.append((nodes, starts, ends))
+                break
+            order, next_starts = str_pack(nodes, capacity)
+            self.levels.append((nodes[order], starts[order], ends[order]))
+            level, starts = nodes[order], next_starts
+
+    @staticmethod
+    def _inside(boxes, x, y):
+        return (boxes[:, 0] <= x) & (x <= boxes[:, 2]) & (boxes[:, 1] <= y) & (y <= boxes[:, 3])
+
+    def query(self, x, y):
+        """Coppie (indice punto, indice riquadro) con il punto dentro il riquadro"""
+        points = np.arange(len(x))
+        nodes = np.zeros(len(x), dtype=np.intp)
+        if not self.levels:
+            return points[:0], nodes[:0]
+        for boxes, starts, ends in reversed(self.levels):
+            keep = self._inside(boxes[nodes], x[points], y[points])
+            points, nodes = points[keep], nodes[keep]
+            # Ogni coppia si espande nei figli del nodo
+            counts = ends[nodes] - starts[nodes]
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            points = np.repeat(points, counts)
+            nodes = np.repeat(starts[nodes], counts) + offsets
+        keep = self._inside(self.boxes[nodes], x[points], y[points])
+        return points[keep], self.items[nodes[keep]]
+
+
+class ZoneSet:
+    """Poligoni delle zone di pesca come array di lati, con un R-tree per torneo"""
+
+    def __init__(self, rows):
+        self.zone_ids, self.zone_names, self.zone_tournaments = [], [], []
+        shape_zone, edges, edge_counts = [], [], []
+        for row in rows:
+            try:
+                geometry = json.loads(row["geoJson"])
+                if geometry["type"] == "Polygon":
+                    polygons = [geometry["coordinates"]]
+                elif geometry["type"] == "MultiPolygon":
+                    polygons = geometry["coordinates"]
+                else:
+                    raise ValueError(geometry["type"])
+            except (ValueError, KeyError, TypeError) as error:
+                print(f"Zona {row['name']} ({row['id']}) ignorata: GeoJSON non valido ({error})",
+                      file=sys.stderr)
+                continue
+            zone = len(self.zone_ids)
+            self.zone_ids.append(row["id"])
+            self.zone_names.append(row["name"])
+            self.zone_tournaments.append(row["tournamentId"])
+            for rings in polygons:
+                # Anello esterno e buchi: il pari/dispari su tutti i lati esclude i buchi
+                shape_edges = []
+                for ring in rings:
+                    ring = np.asarray(ring, dtype=float)[:, :2]
+                    if len(ring) < 3:
+                        continue
+                    if not np.array_equal(ring[0], ring[-1]):
+                        ring = np.vstack([ring, ring[:1]])
+                    shape_edges.append(np.hstack([ring[:-1], ring[1:]]))
+                if shape_edges:
+                    shape_zone.append(zone)
+                    edges.append(np.vstack(shape_edges))
+                    edge_counts.append(len(edges[-1]))
+
+        self.shape_zone = np.array(shape_zone, dtype=np.intp)
+        self.edges = np.vstack(edges) if edges else np.zeros((0, 4))
+        self.edge_starts = np.concatenate([[0], np.cumsum(edge_counts)]).astype(np.intp)
+        self.boxes = np.array([
+            [min(e[:, 0].min(), e[:, 2].min()), min(e[:, 1].min(), e[:, 3].min()),
+             max(e[:, 0].max(), e[:, 2].max()), max(e[:, 1].max(), e[:, 3].max())]
+            for e in edges
+        ]).reshape(-1, 4)
+
+        # Le catture si confrontano solo con le zone del proprio torneo
+        self.tournaments = {}
+        for shape, zone in enumerate(self.shape_zone):
+            self.tournaments.setdefault(self.zone_tournaments[zone], []).append(shape)
+        self.trees = {
+            tournament: (np.array(shapes, dtype=np.intp), STRTree(self.boxes[shapes]))
+            for tournament, shapes in self.tournaments.items()
+        }
+
+    def __len__(self):
+        return len(self.zone_ids)
+
+    def shape_edges(self, shape):
+        return self.edges[self.edge_starts[shape]:self.edge_starts[shape + 1]]
+
+    def contains(self, shape, x, y):
+        """Punti dentro il poligono `shape` (pari/dispari sui lati, in gradi)"""
+        edges = self.shape_edges(shape)
+        inside = np.zeros(len(x), dtype=bool)
+        for block in _blocks(len(x), len(edges)):
+            px, py = x[block, None], y[block, None]
+            x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+            spans = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside[block] = (np.count_nonzero(spans & (px < crossing), axis=1) % 2) == 1
+        return inside
+
+    def distance(self, shape, x, y):
+        """Distanza in metri dal bordo del poligono `shape`"""
+        edges = self.shape_edges(shape)
+        result = np.empty(len(x))
+        for block in _blocks(len(x), len(edges)):
+            # Proiezione equirettangolare centrata su ogni punto
+            kx = (np.cos(np.radians(y[block])) * METERS_PER_DEGREE)[:, None]
+            ax = (edges[:, 0] - x[block, None]) * kx
+            ay = (edges[:, 1] - y[block, None]) * METERS_PER_DEGREE
+            dx = (edges[:, 2] - edges[:, 0]) * kx
+            dy = np.broadcast_to((edges[:, 3] - edges[:, 1]) * METERS_PER_DEGREE, dx.shape)
+            length = dx * dx + dy * dy
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = np.clip(np.where(length > 0, -(ax * dx + ay * dy) / length, 0), 0, 1)
+            result[block] = np.sqrt((ax + t * dx) ** 2 + (ay + t * dy) ** 2).min(axis=1)
+        return result
+
+    def box_distance(self, shape, x, y):
+        """Limite inferiore della distanza (metri) tra i punti e il poligono `shape`"""
+        box = self.boxes[shape]
+        gap_x = np.maximum(np.maximum(box[0] - x, x - box[2]), 0)
+        gap_y = np.maximum(np.maximum(box[1] - y, y - box[3]), 0)
+        return np.hypot(gap_x * np.cos(np.radians(y)) * METERS_PER_DEGREE, gap_y * METERS_PER_DEGREE)
+
+
+def _blocks(points, edges):
+    """Fette di punti tali che punti x lati non superi PAIR_BLOCK"""
+    size = max(1, PAIR_BLOCK // max(edges, 1))
+    return [slice(start, start + size) for start in range(0, points, size)]
+
+
+class CatchPoints:
+    """Coordinate delle catture come colonne NumPy"""
+
+    def __init__(self, rows):
+        self.ids = np.array([r["id"] for r in rows], dtype=object)
+        self.tournament_ids = np.array([r["tournamentId"] for r in rows], dtype=object)
+        self.latitude = np.array([np.nan if r["latitude"] is None else float(r["latitude"]) for r in rows])
+        self.longitude = np.array([np.nan if r["longitude"] is None else float(r["longitude"]) for r in rows])
+        self.accuracy = np.array([np.nan if r["gpsAccuracy"] is None else float(r["gpsAccuracy"])
+                                  for r in rows])
+        # -1 = non calcolato al momento dell'inserimento
+        self.stored_inside = np.array([-1 if r["isInsideZone"] is None else int(bool(r["isInsideZone"]))
+                                       for r in rows], dtype=np.int8)
+        self.status = np.array([r["status"] for r in rows], dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def valid(self):
+        """Come GPSService.isValidCoordinate"""
+        with np.errstate(invalid="ignore"):
+            return ((np.abs(self.latitude) <= 90) & (np.abs(self.longitude) <= 180))
+
+
+class Validation:
+    """Esito per cattura: zona che la contiene, zona piu' vicina e distanza"""
+
+    def __init__(self, count):
+        self.valid = np.zeros(count, dtype=bool)
+        self.inside = np.zeros(count, dtype=bool)
+        self.zone = np.full(count, -1, dtype=np.intp)
+        self.nearest = np.full(count, -1, dtype=np.intp)
+        self.distance = np.full(count, np.nan)
+
+
+def validate(catches, zones):
+    """Dentro/fuori zona e distanza dalla zona piu' vicina per tutte le catture"""
+    result = Validation(len(catches))
+    result.valid = catches.valid()
+    tournaments, inverse = np.unique(catches.tournament_ids, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(tournaments) + 1))
+    for i, tournament in enumerate(tournaments):
+        if tournament not in zones.trees:
+            continue
+        members = order[bounds[i]:bounds[i + 1]]
+        members = members[result.valid[members]]
+        validate_tournament(catches, zones, tournament, members, result)
+    result.inside = result.zone >= 0
+    return result
+
+def validate_tournament(catches, zones, tournament, members, result):
+    """Verifica delle catture `members` (coordinate valide) di un torneo"""
+    shapes, tree = zones.trees[tournament]
+    x, y = catches.longitude[members], catches.latitude[members]
+
+    # Punto nel poligono solo per le coppie trovate dall'R-tree
+    points, boxes = tree.query(x, y)
+    # Come il break di validateCatchLocation vale la prima zona (in ordine di lettura)
+    first = np.full(len(members), len(zones), dtype=np.intp)
+    order = np.argsort(boxes, kind="stable")
+    points, boxes = points[order], boxes[order]
+    for box, start, count in zip(*np.unique(boxes, return_index=True, return_counts=True)):
+        candidates = points[start:start + count]
+        hits = candidates[zones.contains(shapes[box], x[candidates], y[candidates])]
+        first[hits] = np.minimum(first[hits], zones.shape_zone[shapes[box]])
+    zone = np.where(first < len(zones), first, -1)
+    result.zone[members] = zone
+
+    # Distanza per le catture fuori zona: poligoni dal piu' vicino al centro delle
+    # catture, saltando quelli il cui riquadro e' oltre la distanza migliore trovata
+    outside = np.flatnonzero(zone < 0)
+    if not len(outside):
+        return
+    px, py = x[outside], y[outside]
+    center_x, center_y = np.median(px), np.median(py)
+    shapes = sorted(shapes, key=lambda shape: float(zones.box_distance(shape, center_x, center_y)))
+    best = np.full(len(outside), np.inf)
+    nearest = np.full(len(outside), -1, dtype=np.intp)
+    for shape in shapes:
+        near = np.flatnonzero(zones.box_distance(shape, px, py) < best)
+        if not len(near):
+            continue
+        distance = zones.distance(shape, px[near], py[near])
+        closer = distance < best[near]
+        best[near[closer]] = distance[closer]
+        nearest[near[closer]] = zones.shape_zone[shape]
+    result.nearest[members[outside]] = nearest
+    result.distance[members[outside]] = np.where(np.isfinite(best), best, np.nan)
+
+def load_zones(db, tournaments=None, tenant=None):
+    """Zone di pesca attive (filtri opzionali)"""
+    sql = """
+        SELECT z.id, z.name, z.geoJson, z.tournamentId
+        FROM fishing_zones z JOIN tournaments t ON t.id = z.tournamentId
+        WHERE z.isActive = 1
+    """
+    params = []
+    if tournaments:
+        sql += f" AND t.id IN ({db.placeholders(len(tournaments))})"
+        params.extend(tournaments)
+    if tenant:
+        sql += " AND t.tenantId = %s"
+        params.append(tenant)
+    return ZoneSet(db.query(sql + " ORDER BY z.tournamentId, z.createdAt, z.id", params))
+
+def load_catches(db, tournament_ids):
+    """Catture dei tornei indicati (a blocchi di IN (...))"""
+    tournament_ids = sorted(set(tournament_ids))
+    rows = []
+    for start in range(0, len(tournament_ids), 1000):
+        chunk = tournament_ids[start:start + 1000]
+        rows.extend(db.stream(
+            "SELECT id, tournamentId, latitude, longitude, gpsAccuracy, isInsideZone, status "
+            f"FROM catches WHERE tournamentId IN ({db.placeholders(len(chunk))})",
+            chunk,
+        ))
+    return CatchPoints(rows)
+
+def mismatches(catches, result):
+    """Catture con isInsideZone salvato diverso dal ricalcolo"""
+    return (catches.stored_inside >= 0) & (catches.stored_inside != result.inside)
+
+def write_results(path, catches, zones, result, rows):
+    target = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(target)
+        writer.writerow(["catchId", "tournamentId", "status", "latitude", "longitude", "gpsAccuracy",
+                         "validCoordinates", "isInsideZone", "storedIsInsideZone", "zoneId",
+                         "nearestZoneId", "nearestZoneName", "distanceFromZoneM"])
+        for i in rows:
+            nearest = result.nearest[i]
+            writer.writerow([
+                catches.ids[i], catches.tournament_ids[i], catches.status[i],
+                catches.latitude[i], catches.longitude[i],
+                "" if np.isnan(catches.accuracy[i]) else f"{catches.accuracy[i]:.0f}",
+                int(result.valid[i]), int(result.inside[i]),
+                "" if catches.stored_inside[i] < 0 else int(catches.stored_inside[i]),
+                zones.zone_ids[result.zone[i]] if result.zone[i] >= 0 else "",
+                zones.zone_ids[nearest] if nearest >= 0 else "",
+                zones.zone_names[nearest] if nearest >= 0 else "",
+                "" if np.isnan(result.distance[i]) else f"{result.distance[i]:.0f}",
+            ])
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica GPS in blocco delle catture")
+    parser.add_argument("--tournament", action="append", default=None,
+                        help="id torneo (ripetibile, default: tutti i tornei con zone attive)")
+    parser.add_argument("--tenant", default=None, help="solo i tornei di questa associazione")
+    parser.add_argument("--output", metavar="FILE", default=None,
+                        help="esito per cattura in CSV ('-' = stdout)")
+    parser.add_argument("--only-mismatch", action="store_true",
+                        help="nel CSV solo le catture con isInsideZone salvato diverso")
+    parser.add_argument("--database-url", default=None,
+                        help="default: DATABASE_URL dell'ambiente o di backend/.env")
+    args = parser.parse_args()
+
+    db = connect(args.database_url)
+    log = sys.stderr if args.output == "-" else sys.stdout
+
+    started = time.perf_counter()
+    zones = load_zones(db, args.tournament, args.tenant)
+    catches = load_catches(db, zones.zone_tournaments)
+    db.close()
+    loaded = time.perf_counter()
+
+    result = validate(catches, zones)
+    computed = time.perf_counter()
+
+    differ = mismatches(catches, result)
+    if args.output:
+        rows = np.flatnonzero(differ) if args.only_mismatch else range(len(catches))
+        write_results(args.output, catches, zones, result, rows)
+
+    outside = result.valid & ~result.inside
+    print("="*60, file=log)
+    print("Verifica GPS Catture", file=log)
+    print("="*60, file=log)
+    print(f"Zone: {len(zones)} ({len(zones.shape_zone)} poligoni, {len(zones.edges)} lati), "
+          f"catture: {len(catches)}", file=log)
+    print(f"Caricamento: {loaded - started:.2f}s, verifica: {(computed - loaded) * 1000:.1f} ms", file=log)
+    print(f"Dentro zona: {int(result.inside.sum())}, fuori zona: {int(outside.sum())}, "
+          f"coordinate non valide: {int((~result.valid).sum())}", file=log)
+    if outside.any():
+        distance = result.distance[outside]
+        print(f"Distanza fuori zona: mediana {np.nanmedian(distance):.0f} m, "
+              f"massima {np.nanmax(distance):.0f} m", file=log)
+    print(f"isInsideZone salvato diverso: {int(differ.sum())}", file=log)
+    print("="*60, file=log)
+
+if __name__ == "__main__":
+    main()
@@ -50,6 +50,28 @@ export const config = {
     pass: process.env.SMTP_PASS || "",
     from: process.env.SMTP_FROM || "noreply@tournamentmaster.com",
   },
+
+  // PDF Classifica: "pdfkit" (nel processo API) o "python" (processo esterno)
+  leaderboardPdf: {
+    renderer: process.env.LEADERBOARD_PDF_RENDERER || "pdfkit",
+    pythonBin: process.env.PYTHON_BIN || "python3",
+    script: process.env.LEADERBOARD_PDF_SCRIPT || path.join(__dirname, "../../../docs/generate_leaderboard_pdf.py"),
+    timeoutMs: parseInt(process.env.LEADERBOARD_PDF_TIMEOUT || "120000", 10),
+  },
+
+  // Aggregati analytics precalcolati (backend/scripts/analytics_cube.py, pianificato in
+  // ecosystem.config.js); vuoto = query dirette. Tornei in corso e stagione corrente sono sempre live
+  analyticsCube: {
+    dir: process.env.ANALYTICS_CUBE_DIR || "",
+    maxAgeMinutes: parseInt(process.env.ANALYTICS_CUBE_MAX_AGE || "15", 10),
+  },
+
+  // Classifiche in memoria (services/live-leaderboard.service.ts)
+  liveLeaderboard: {
+    enabled: process.env.LIVE_LEADERBOARD !== "false",
+    refreshMs: parseInt(process.env.LIVE_LEADERBOARD_REFRESH_MS || "300000", 10), // 5 min
+    idleMs: parseInt(process.env.LIVE_LEADERBOARD_IDLE_MS || "1800000", 10), // 30 min
+  },
 };
 
 export default config;
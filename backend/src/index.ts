@@ -3,6 +3,7 @@ import app from "./app";
 import { config } from "./config";
 import prisma from "./lib/prisma";
 import { TournamentSchedulerService } from "./services/tournament";
+import { LiveLeaderboardService } from "./services/live-leaderboard.service";
 import { initializeWebSocket } from "./services/websocket.service";
 
 // Create HTTP server for Socket.io
@@ -45,6 +46,11 @@ const startServer = async () => {
 
       // Start tournament scheduler for auto-transitions
       TournamentSchedulerService.start();
+
+      // Load live leaderboards of ONGOING tournaments
+      LiveLeaderboardService.warmUp()
+        .then((count) => console.log(`[Leaderboard] Live rankings loaded: ${count}`))
+        .catch((error) => console.error("[Leaderboard] Live rankings warm-up failed:", error));
     });
   } catch (error) {
     console.error("Failed to start server:", error);
@@ -1,6 +1,7 @@
 import { Router, Response } from "express";
 import { param, query, validationResult } from "express-validator";
 import { LeaderboardService } from "../services/leaderboard.service";
+import { TeamLeaderboardService } from "../services/team-leaderboard.service";
 import {
   authenticate,
   authorize,
@@ -92,6 +93,85 @@ router.get(
   }
 );
 
+// GET /api/leaderboard/:tournamentId/teams - Get team leaderboard (public)
+router.get(
+  "/:tournamentId/teams",
+  optionalAuth,
+  param("tournamentId").notEmpty(),
+  async (req: AuthenticatedRequest, res: Response) => {
+    try {
+      const errors = validationResult(req);
+      if (!errors.isEmpty()) {
+        return res.status(400).json({
+          success: false,
+          message: "Validation error",
+          errors: errors.array(),
+        });
+      }
+
+      const standings = await TeamLeaderboardService.getTeamLeaderboard(
+        req.params.tournamentId
+      );
+
+      res.json({
+        success: true,
+        data: standings,
+      });
+    } catch (error) {
+      const message =
+        error instanceof Error ? error.message : "Failed to get team leaderboard";
+      res.status(500).json({
+        success: false,
+        message,
+      });
+    }
+  }
+);
+
+// GET /api/leaderboard/:tournamentId/teams/:teamId - Get team position
+router.get(
+  "/:tournamentId/teams/:teamId",
+  optionalAuth,
+  param("tournamentId").notEmpty(),
+  param("teamId").notEmpty(),
+  async (req: AuthenticatedRequest, res: Response) => {
+    try {
+      const errors = validationResult(req);
+      if (!errors.isEmpty()) {
+        return res.status(400).json({
+          success: false,
+          message: "Validation error",
+          errors: errors.array(),
+        });
+      }
+
+      const position = await TeamLeaderboardService.getTeamPosition(
+        req.params.tournamentId,
+        req.params.teamId
+      );
+
+      if (!position) {
+        return res.status(404).json({
+          success: false,
+          message: "Team not found in leaderboard",
+        });
+      }
+
+      res.json({
+        success: true,
+        data: position,
+      });
+    } catch (error) {
+      const message =
+        error instanceof Error ? error.message : "Failed to get team position";
+      res.status(500).json({
+        success: false,
+        message,
+      });
+    }
+  }
+);
+
 // GET /api/leaderboard/:tournamentId/my - Get user's position
 router.get(
   "/:tournamentId/my",
@@ -14,6 +14,7 @@ import { body, param, query, validationResult } from "express-validator";
 import { authenticate, authorize, isAdminOrPresident } from "../middleware/auth.middleware";
 import { AuthenticatedRequest, UserRole } from "../types";
 import prisma from "../lib/prisma";
+import { TeamLeaderboardService } from "../services/team-leaderboard.service";
 
 const router = Router();
 
@@ -246,6 +247,7 @@ router.post(
           role: "TEAM_LEADER",
         },
       });
+      TeamLeaderboardService.invalidate(team.tournamentId);
 
       res.status(201).json({
         success: true,
@@ -321,6 +323,7 @@ router.put(
           members: { include: { user: { select: { id: true, firstName: true, lastName: true } } } },
         },
       });
+      TeamLeaderboardService.invalidate(updatedTeam.tournamentId);
 
       res.json({
         success: true,
@@ -349,7 +352,8 @@ router.delete(
         return res.status(400).json({ success: false, errors: errors.array() });
       }
 
-      await prisma.team.delete({ where: { id: req.params.id } });
+      const team = await prisma.team.delete({ where: { id: req.params.id } });
+      TeamLeaderboardService.invalidate(team.tournamentId);
 
       res.json({ success: true, message: "Team deleted successfully" });
     } catch (error) {
@@ -411,6 +415,7 @@ router.post(
           user: { select: { id: true, firstName: true, lastName: true, email: true } },
         },
       });
+      TeamLeaderboardService.invalidate(team.tournamentId);
 
       res.status(201).json({
         success: true,
@@ -472,6 +477,7 @@ router.delete(
           },
         },
       });
+      TeamLeaderboardService.invalidate(team.tournamentId);
 
       res.json({ success: true, message: "Member removed successfully" });
     } catch (error) {
@@ -538,6 +544,7 @@ router.post(
           role: req.body.role,
         },
       });
+      TeamLeaderboardService.invalidate(team.tournamentId);
 
       res.status(201).json({
         success: true,
@@ -13,7 +13,15 @@
  * =============================================================================
  */
 
+import { promises as fs } from "fs";
+import path from "path";
 import prisma from "../lib/prisma";
+import { config } from "../config";
+import { TournamentStatus } from "../types";
+
+// Only finished tournaments are served from the cube: the others still
+// receive catches and are read live
+const SETTLED_STATUSES: string[] = [TournamentStatus.COMPLETED, TournamentStatus.CANCELLED];
 
 // ============================================================================
 // INTERFACES
@@ -84,6 +92,42 @@ interface DashboardKPIs {
 // ============================================================================
 
 export class AnalyticsService {
+  /**
+   * Read a precomputed aggregate from the analytics cube
+   * Returns null when the cube is disabled, older than maxAgeMinutes or
+   * missing the file, so the caller falls back to the live query
+   */
+  private static async readCube<T>(segments: string[], pick: (data: any) => T): Promise<T | null> {
+    const { dir, maxAgeMinutes } = config.analyticsCube;
+    if (!dir || !segments.every((s) => /^[\w-]+$/.test(s))) return null;
+
+    try {
+      const state = JSON.parse(await fs.readFile(path.join(dir, "state.json"), "utf8"));
+      if (Date.now() - Date.parse(state.generatedAt) > maxAgeMinutes * 60_000) return null;
+
+      const file = path.join(dir, ...segments.slice(0, -1), `${segments[segments.length - 1]}.json`);
+      return pick(JSON.parse(await fs.readFile(file, "utf8"))) ?? null;
+    } catch {
+      return null;
+    }
+  }
+
+  /**
+   * readCube() for a tournament's aggregates, only once the tournament is
+   * COMPLETED or CANCELLED (the cube is refreshed by a scheduled job, not on
+   * every catch, so a live tournament would lag behind)
+   */
+  private static async readTournamentCube<T>(tournamentId: string, pick: (data: any) => T): Promise<T | null> {
+    if (!config.analyticsCube.dir) return null;
+
+    const tournament = await prisma.tournament.findUnique({
+      where: { id: tournamentId },
+      select: { status: true },
+    });
+    if (!tournament || !SETTLED_STATUSES.includes(tournament.status)) return null;
+    return this.readCube(["tournaments", tournamentId], pick);
+  }
+
   /**
    * Get catches over time for a tournament (hourly/daily breakdown)
    */
@@ -91,6 +135,9 @@ export class AnalyticsService {
     tournamentId: string,
     granularity: "hourly" | "daily" = "hourly"
   ): Promise<TimeSeriesPoint[]> {
+    const cached = await this.readTournamentCube(tournamentId, (d) => d.timeSeries?.[granularity]);
+    if (cached) return cached;
+
     const catches = await prisma.catch.findMany({
       where: { tournamentId, status: "APPROVED" },
       select: { createdAt: true, weight: true },
@@ -128,6 +175,9 @@ export class AnalyticsService {
    * Get weight distribution (histogram buckets)
    */
   static async getWeightDistribution(tournamentId: string): Promise<DistributionItem[]> {
+    const cached = await this.readTournamentCube(tournamentId, (d) => d.weightDistribution);
+    if (cached) return cached;
+
     const catches = await prisma.catch.findMany({
       where: { tournamentId, status: "APPROVED" },
       select: { weight: true },
@@ -179,6 +229,9 @@ export class AnalyticsService {
    * Get species distribution for a tournament
    */
   static async getSpeciesDistribution(tournamentId: string): Promise<DistributionItem[]> {
+    const cached = await this.readTournamentCube(tournamentId, (d) => d.speciesDistribution);
+    if (cached) return cached;
+
     const catches = await prisma.catch.findMany({
       where: { tournamentId, status: "APPROVED" },
       select: { species: true, weight: true },
@@ -329,6 +382,13 @@ export class AnalyticsService {
    */
   static async getSeasonStats(tenantId: string, year?: number): Promise<SeasonStats> {
     const targetYear = year || new Date().getFullYear();
+    // The current season is still changing: read it live
+    const cached =
+      targetYear < new Date().getFullYear()
+        ? await this.readCube<SeasonStats>(["seasons", tenantId, String(targetYear)], (d) => d)
+        : null;
+    if (cached) return cached;
+
     const startOfYear = new Date(targetYear, 0, 1);
     const endOfYear = new Date(targetYear, 11, 31, 23, 59, 59);
 
@@ -529,6 +589,9 @@ export class AnalyticsService {
    * Get hourly activity heatmap data
    */
   static async getActivityHeatmap(tournamentId: string): Promise<{ hour: number; day: string; value: number }[]> {
+    const cached = await this.readTournamentCube(tournamentId, (d) => d.activityHeatmap);
+    if (cached) return cached;
+
     const catches = await prisma.catch.findMany({
       where: { tournamentId },
       select: { createdAt: true },
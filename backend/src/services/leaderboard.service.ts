@@ -1,5 +1,11 @@
+import { Prisma } from "@prisma/client";
 import prisma from "../lib/prisma";
 import { CatchStatus } from "../types";
+import { LiveLeaderboardService } from "./live-leaderboard.service";
+import { TeamLeaderboardService } from "./team-leaderboard.service";
+
+// Righe aggiornate da un singolo UPDATE bulk dei rank
+const RANK_UPDATE_CHUNK = 1000;
 
 export class LeaderboardService {
   /**
@@ -51,7 +57,7 @@ export class LeaderboardService {
         : null;
 
     // Upsert leaderboard entry
-    await prisma.leaderboardEntry.upsert({
+    const entry = await prisma.leaderboardEntry.upsert({
       where: {
         tournamentId_userId: {
           tournamentId,
@@ -78,6 +84,13 @@ export class LeaderboardService {
         lastUpdated: new Date(),
       },
     });
+    LiveLeaderboardService.update(entry);
+    TeamLeaderboardService.updateMember(tournamentId, userId, {
+      totalPoints,
+      totalWeight,
+      catchCount,
+      biggestCatch,
+    });
 
     // Recalculate ranks
     await this.recalculateRanks(tournamentId);
@@ -85,11 +98,20 @@ export class LeaderboardService {
 
   /**
    * Recalculate all ranks for a tournament
+   * Dense ranking: entries tied on points, biggest catch and catch count share
+   * the same rank. Only changed ranks are written, in one bulk UPDATE.
    */
   static async recalculateRanks(tournamentId: string) {
     // Get all entries sorted by points (descending), then by biggest catch
     const entries = await prisma.leaderboardEntry.findMany({
       where: { tournamentId },
+      select: {
+        id: true,
+        rank: true,
+        totalPoints: true,
+        biggestCatch: true,
+        catchCount: true,
+      },
       orderBy: [
         { totalPoints: "desc" },
         { biggestCatch: "desc" },
@@ -97,17 +119,48 @@ export class LeaderboardService {
       ],
     });
 
-    // Update ranks
-    for (let i = 0; i < entries.length; i++) {
-      await prisma.leaderboardEntry.update({
-        where: { id: entries[i].id },
-        data: { rank: i + 1 },
-      });
+    const changes: { id: string; rank: number }[] = [];
+    let rank = 0;
+    entries.forEach((entry, i) => {
+      const previous = entries[i - 1];
+      const tied =
+        previous !== undefined &&
+        Number(previous.totalPoints) === Number(entry.totalPoints) &&
+        Number(previous.biggestCatch ?? -1) === Number(entry.biggestCatch ?? -1) &&
+        previous.catchCount === entry.catchCount;
+      if (!tied) rank++;
+      if (entry.rank !== rank) changes.push({ id: entry.id, rank });
+    });
+
+    await this.writeRanks(changes);
+  }
+
+  /**
+   * Write ranks with UPDATE ... SET rank = CASE id WHEN ... END
+   * (one statement per RANK_UPDATE_CHUNK entries, all in one transaction)
+   */
+  private static async writeRanks(changes: { id: string; rank: number }[]) {
+    if (changes.length === 0) return;
+
+    const statements = [];
+    for (let i = 0; i < changes.length; i += RANK_UPDATE_CHUNK) {
+      const chunk = changes.slice(i, i + RANK_UPDATE_CHUNK);
+      const cases = Prisma.join(
+        chunk.map((c) => Prisma.sql`WHEN ${c.id} THEN ${c.rank}`),
+        " "
+      );
+      statements.push(prisma.$executeRaw`
+        UPDATE leaderboard_entries
+        SET \`rank\` = CASE id ${cases} END, updatedAt = NOW(3)
+        WHERE id IN (${Prisma.join(chunk.map((c) => c.id))})
+      `);
     }
+    await prisma.$transaction(statements);
   }
 
   /**
    * Get leaderboard for a tournament
+   * Served from the in-memory ranking when live leaderboards are enabled
    */
   static async getLeaderboard(
     tournamentId: string,
@@ -119,6 +172,19 @@ export class LeaderboardService {
     const page = options.page || 1;
     const limit = options.limit || 50;
 
+    if (LiveLeaderboardService.enabled) {
+      const ranking = await LiveLeaderboardService.get(tournamentId);
+      return {
+        entries: ranking.slice((page - 1) * limit, limit),
+        pagination: {
+          page,
+          limit,
+          total: ranking.size,
+          totalPages: Math.ceil(ranking.size / limit),
+        },
+      };
+    }
+
     const [entries, total] = await Promise.all([
       prisma.leaderboardEntry.findMany({
         where: { tournamentId },
@@ -146,6 +212,12 @@ export class LeaderboardService {
    * Get user's position in leaderboard
    */
   static async getUserPosition(tournamentId: string, userId: string) {
+    if (LiveLeaderboardService.enabled) {
+      const ranking = await LiveLeaderboardService.get(tournamentId);
+      const ranked = ranking.rankOf(userId);
+      return ranked ? { ...ranked, totalParticipants: ranking.size } : null;
+    }
+
     const entry = await prisma.leaderboardEntry.findUnique({
       where: {
         tournamentId_userId: {
@@ -173,6 +245,11 @@ export class LeaderboardService {
    * Get top N participants
    */
   static async getTopN(tournamentId: string, n: number) {
+    if (LiveLeaderboardService.enabled) {
+      const ranking = await LiveLeaderboardService.get(tournamentId);
+      return ranking.slice(0, n);
+    }
+
     const entries = await prisma.leaderboardEntry.findMany({
       where: { tournamentId },
       orderBy: { rank: "asc" },
@@ -226,6 +303,7 @@ export class LeaderboardService {
 
     // Set initial ranks (all tied at 1)
     await this.recalculateRanks(tournamentId);
+    LiveLeaderboardService.invalidate(tournamentId);
   }
 
   /**
@@ -0,0 +1,341 @@
+/**
+ * =============================================================================
+ * LIVE LEADERBOARD SERVICE
+ * =============================================================================
+ * In-memory rankings for the tournaments being followed live
+ *
+ * Each tournament keeps a treap of its distinct scores, ordered like
+ * recalculateRanks (totalPoints, biggestCatch, catchCount, descending).
+ * Every node holds the entries tied on that score and the subtree counts
+ * (entries and distinct scores), so:
+ * - an approved catch moves one entry in O(log n)
+ * - "my position" (dense rank) is O(log n)
+ * - top N / a page is O(log n + N)
+ *
+ * Rankings are loaded from leaderboard_entries (ONGOING tournaments at
+ * startup, the others on first read), dropped when nobody reads them and
+ * reloaded every refreshMs to pick up writes made outside this process
+ * (other instances, backend/scripts).
+ * =============================================================================
+ */
+
+import { LeaderboardEntry } from "@prisma/client";
+import prisma from "../lib/prisma";
+import { config } from "../config";
+import { TournamentStatus } from "../types";
+
+type Score = [points: number, biggestCatch: number, catchCount: number];
+
+interface ScoreNode {
+  score: Score;
+  entries: Map<string, LeaderboardEntry>;
+  sorted: LeaderboardEntry[] | null;
+  priority: number;
+  left: ScoreNode | null;
+  right: ScoreNode | null;
+  size: number; // entries in the subtree
+  scores: number; // distinct scores in the subtree
+}
+
+export type RankedEntry = LeaderboardEntry & { rank: number };
+
+function scoreOf(entry: LeaderboardEntry): Score {
+  return [
+    Number(entry.totalPoints),
+    Number(entry.biggestCatch ?? -1),
+    entry.catchCount,
+  ];
+}
+
+/** Negative when a ranks above b */
+function compareScores(a: Score, b: Score): number {
+  return b[0] - a[0] || b[1] - a[1] || b[2] - a[2];
+}
+
+const sizeOf = (node: ScoreNode | null) => (node ? node.size : 0);
+const scoresOf = (node: ScoreNode | null) => (node ? node.scores : 0);
+
+function refresh(node: ScoreNode): ScoreNode {
+  node.size = sizeOf(node.left) + node.entries.size + sizeOf(node.right);
+  node.scores = scoresOf(node.left) + 1 + scoresOf(node.right);
+  return node;
+}
+
+function rotateRight(node: ScoreNode): ScoreNode {
+  const left = node.left!;
+  node.left = left.right;
+  left.right = refresh(node);
+  return refresh(left);
+}
+
+function rotateLeft(node: ScoreNode): ScoreNode {
+  const right = node.right!;
+  node.right = right.left;
+  right.left = refresh(node);
+  return refresh(right);
+}
+
+function insert(node: ScoreNode | null, score: Score, entry: LeaderboardEntry): ScoreNode {
+  if (!node) {
+    return refresh({
+      score,
+      entries: new Map([[entry.userId, entry]]),
+      sorted: null,
+      priority: Math.random(),
+      left: null,
+      right: null,
+      size: 0,
+      scores: 0,
+    });
+  }
+
+  const cmp = compareScores(score, node.score);
+  if (cmp === 0) {
+    node.entries.set(entry.userId, entry);
+    node.sorted = null;
+  } else if (cmp < 0) {
+    node.left = insert(node.left, score, entry);
+    if (node.left.priority > node.priority) return rotateRight(node);
+  } else {
+    node.right = insert(node.right, score, entry);
+    if (node.right.priority > node.priority) return rotateLeft(node);
+  }
+  return refresh(node);
+}
+
+/** Joins two treaps where every score in a ranks above every score in b */
+function merge(a: ScoreNode | null, b: ScoreNode | null): ScoreNode | null {
+  if (!a) return b;
+  if (!b) return a;
+  if (a.priority > b.priority) {
+    a.right = merge(a.right, b);
+    return refresh(a);
+  }
+  b.left = merge(a, b.left);
+  return refresh(b);
+}
+
+function remove(node: ScoreNode | null, score: Score, userId: string): ScoreNode | null {
+  if (!node) return null;
+
+  const cmp = compareScores(score, node.score);
+  if (cmp < 0) {
+    node.left = remove(node.left, score, userId);
+  } else if (cmp > 0) {
+    node.right = remove(node.right, score, userId);
+  } else {
+    node.entries.delete(userId);
+    node.sorted = null;
+    if (node.entries.size === 0) return merge(node.left, node.right);
+  }
+  return refresh(node);
+}
+
+/** Entries tied on a score, in a stable order (name, then user id) */
+function tiedEntries(node: ScoreNode): LeaderboardEntry[] {
+  if (!node.sorted) {
+    node.sorted = [...node.entries.values()].sort(
+      (a, b) =>
+        a.participantName.localeCompare(b.participantName) ||
+        a.userId.localeCompare(b.userId)
+    );
+  }
+  return node.sorted;
+}
+
+/**
+ * Ranking of a single tournament
+ */
+export class TournamentRanking {
+  private root: ScoreNode | null = null;
+  private byUser = new Map<string, LeaderboardEntry>();
+
+  constructor(entries: LeaderboardEntry[] = []) {
+    entries.forEach((entry) => this.upsert(entry));
+  }
+
+  get size(): number {
+    return this.byUser.size;
+  }
+
+  upsert(entry: LeaderboardEntry): void {
+    const previous = this.byUser.get(entry.userId);
+    if (previous) {
+      this.root = remove(this.root, scoreOf(previous), previous.userId);
+    }
+    this.byUser.set(entry.userId, entry);
+    this.root = insert(this.root, scoreOf(entry), entry);
+  }
+
+  /** Dense rank: 1 + number of distinct scores above the entry's score */
+  rankOf(userId: string): RankedEntry | null {
+    const entry = this.byUser.get(userId);
+    if (!entry) return null;
+
+    const score = scoreOf(entry);
+    let above = 0;
+    let node = this.root;
+    while (node) {
+      const cmp = compareScores(score, node.score);
+      if (cmp < 0) {
+        node = node.left;
+      } else if (cmp > 0) {
+        above += scoresOf(node.left) + 1;
+        node = node.right;
+      } else {
+        above += scoresOf(node.left);
+        break;
+      }
+    }
+    return { ...entry, rank: above + 1 };
+  }
+
+  /** `take` entries in leaderboard order, starting from position `skip` */
+  slice(skip: number, take: number): RankedEntry[] {
+    const out: RankedEntry[] = [];
+    if (take <= 0) return out;
+
+    const state = { skip, above: 0 };
+    const walk = (node: ScoreNode | null): void => {
+      if (!node || out.length >= take) return;
+
+      // Whole subtrees before the requested position are skipped by size
+      if (state.skip >= node.size) {
+        state.skip -= node.size;
+        state.above += node.scores;
+        return;
+      }
+
+      walk(node.left);
+      if (out.length >= take) return;
+
+      const tied = tiedEntries(node);
+      if (state.skip >= tied.length) {
+        state.skip -= tied.length;
+      } else {
+        const rank = state.above + 1;
+        for (const entry of tied.slice(state.skip, state.skip + take - out.length)) {
+          out.push({ ...entry, rank });
+        }
+        state.skip = 0;
+      }
+      state.above += 1;
+
+      walk(node.right);
+    };
+
+    walk(this.root);
+    return out;
+  }
+}
+
+interface CachedRanking {
+  ranking: TournamentRanking;
+  loadedAt: number;
+  readAt: number;
+}
+
+interface PendingLoad {
+  promise: Promise<TournamentRanking>;
+  // Entries written while the load query was running
+  updates: LeaderboardEntry[];
+}
+
+const rankings = new Map<string, CachedRanking>();
+const loading = new Map<string, PendingLoad>();
+
+/**
+ * Live rankings shared by LeaderboardService
+ */
+export class LiveLeaderboardService {
+  static get enabled(): boolean {
+    return config.liveLeaderboard.enabled;
+  }
+
+  /**
+   * Ranking of a tournament, loaded from leaderboard_entries when missing
+   * or older than refreshMs
+   */
+  static async get(tournamentId: string): Promise<TournamentRanking> {
+    const now = Date.now();
+    this.evictIdle(now);
+
+    const cached = rankings.get(tournamentId);
+    if (cached && now - cached.loadedAt < config.liveLeaderboard.refreshMs) {
+      cached.readAt = now;
+      return cached.ranking;
+    }
+    return this.load(tournamentId);
+  }
+
+  /**
+   * Apply an updated entry (after LeaderboardService.updateEntry)
+   */
+  static update(entry: LeaderboardEntry): void {
+    rankings.get(entry.tournamentId)?.ranking.upsert(entry);
+    loading.get(entry.tournamentId)?.updates.push(entry);
+  }
+
+  /**
+   * Drop a tournament (it is reloaded on the next read)
+   */
+  static invalidate(tournamentId: string): void {
+    rankings.delete(tournamentId);
+    loading.delete(tournamentId);
+  }
+
+  /**
+   * Load the ONGOING tournaments (server startup)
+   */
+  static async warmUp(): Promise<number> {
+    if (!this.enabled) return 0;
+
+    const tournaments = await prisma.tournament.findMany({
+      where: { status: TournamentStatus.ONGOING },
+      select: { id: true },
+    });
+    for (const tournament of tournaments) {
+      await this.load(tournament.id);
+    }
+    return tournaments.length;
+  }
+
+  private static load(tournamentId: string): Promise<TournamentRanking> {
+    const pending = loading.get(tournamentId);
+    if (pending) return pending.promise;
+
+    const load: PendingLoad = {
+      updates: [],
+      promise: prisma.leaderboardEntry
+        .findMany({ where: { tournamentId } })
+        .then((entries) => {
+          const ranking = new TournamentRanking(entries);
+          load.updates.forEach((entry) => ranking.upsert(entry));
+
+          // Only keep the result if nobody invalidated it meanwhile
+          if (loading.get(tournamentId) === load) {
+            loading.delete(tournamentId);
+            const now = Date.now();
+            rankings.set(tournamentId, { ranking, loadedAt: now, readAt: now });
+          }
+          return ranking;
+        })
+        .catch((error) => {
+          if (loading.get(tournamentId) === load) loading.delete(tournamentId);
+          throw error;
+        }),
+    };
+    loading.set(tournamentId, load);
+    return load.promise;
+  }
+
+  private static evictIdle(now: number): void {
+    for (const [tournamentId, cached] of rankings) {
+      if (now - cached.readAt > config.liveLeaderboard.idleMs) {
+        rankings.delete(tournamentId);
+      }
+    }
+  }
+}
+
+export default LiveLeaderboardService;
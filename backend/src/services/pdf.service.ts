@@ -9,7 +9,9 @@
  */
 
 import PDFDocument from "pdfkit";
+import { spawn } from "child_process";
 import prisma from "../lib/prisma";
+import { config } from "../config";
 import { TournamentStaffRole } from "@prisma/client";
 
 // =============================================================================
@@ -854,8 +856,102 @@ export class PDFService {
 
   /**
    * Costruisce il documento PDF Classifica
+   * Con LEADERBOARD_PDF_RENDERER=python il rendering avviene in un processo
+   * esterno (docs/generate_leaderboard_pdf.py) e non blocca l'event loop;
+   * in caso di errore si ripiega su PDFKit.
    */
-  private static buildLeaderboardPDF(
+  private static async buildLeaderboardPDF(
+    tournament: TournamentPDFData,
+    leaderboard: any[],
+    catchDetails: any[],
+    organizerName: string,
+    primaryColor: string,
+    logoBuffer: Buffer | null = null
+  ): Promise<Buffer> {
+    if (config.leaderboardPdf.renderer === "python") {
+      try {
+        return await this.renderLeaderboardOutOfProcess(
+          tournament, leaderboard, catchDetails, organizerName, primaryColor, logoBuffer
+        );
+      } catch (error) {
+        console.error("Renderer PDF classifica Python non disponibile, uso PDFKit:", error);
+      }
+    }
+    return this.buildLeaderboardPDFKit(
+      tournament, leaderboard, catchDetails, organizerName, primaryColor, logoBuffer
+    );
+  }
+
+  /**
+   * Rendering classifica nel processo Python: le righe vengono inviate come
+   * JSON lines su stdin (rispettando il backpressure), il PDF letto da stdout
+   */
+  private static renderLeaderboardOutOfProcess(
+    tournament: TournamentPDFData,
+    leaderboard: any[],
+    catchDetails: any[],
+    organizerName: string,
+    primaryColor: string,
+    logoBuffer: Buffer | null
+  ): Promise<Buffer> {
+    const { pythonBin, script, timeoutMs } = config.leaderboardPdf;
+
+    return new Promise((resolve, reject) => {
+      const child = spawn(pythonBin, [script], { stdio: ["pipe", "pipe", "pipe"] });
+      const chunks: Buffer[] = [];
+      const errors: Buffer[] = [];
+      const timer = setTimeout(() => {
+        child.kill();
+        reject(new Error(`Timeout rendering classifica (${timeoutMs} ms)`));
+      }, timeoutMs);
+
+      child.stdout.on("data", (chunk: Buffer) => chunks.push(chunk));
+      child.stderr.on("data", (chunk: Buffer) => errors.push(chunk));
+      child.on("error", (error) => {
+        clearTimeout(timer);
+        reject(error);
+      });
+      child.on("close", (code) => {
+        clearTimeout(timer);
+        if (code === 0) resolve(Buffer.concat(chunks));
+        else reject(new Error(`Renderer terminato con codice ${code}: ${Buffer.concat(errors).toString().slice(-500)}`));
+      });
+      child.stdin.on("error", () => {
+        // Il processo è terminato prima di leggere tutto: l'errore arriva da "close"
+      });
+
+      const header = {
+        tournament,
+        tenant: {
+          name: tournament.tenantName,
+          primaryColor,
+          logoData: logoBuffer ? logoBuffer.toString("base64") : null,
+        },
+        organizerName,
+      };
+      const lines = (function* () {
+        yield header;
+        for (const row of leaderboard) yield { table: "leaderboard", ...row };
+        for (const row of catchDetails) yield { table: "catches", ...row };
+      })();
+
+      const writeLines = () => {
+        for (let next = lines.next(); !next.done; next = lines.next()) {
+          if (!child.stdin.write(JSON.stringify(next.value) + "\n")) {
+            child.stdin.once("drain", writeLines);
+            return;
+          }
+        }
+        child.stdin.end();
+      };
+      writeLines();
+    });
+  }
+
+  /**
+   * Costruisce il documento PDF Classifica con PDFKit (nel processo API)
+   */
+  private static buildLeaderboardPDFKit(
     tournament: TournamentPDFData,
     leaderboard: any[],
     catchDetails: any[],
@@ -8,6 +8,7 @@
  */
 
 import { PrismaClient, PenaltyType, PenaltyStatus } from "@prisma/client";
+import { TeamLeaderboardService } from "./team-leaderboard.service";
 
 const prisma = new PrismaClient();
 
@@ -121,6 +122,7 @@ export class PenaltyService {
       console.log(`Team ${input.teamId} disqualified from tournament ${input.tournamentId}`);
     }
 
+    TeamLeaderboardService.invalidate(input.tournamentId);
     return penalty;
   }
 
@@ -228,6 +230,7 @@ export class PenaltyService {
       },
     });
 
+    TeamLeaderboardService.invalidate(penalty.tournamentId);
     return penalty;
   }
 
@@ -250,6 +253,7 @@ export class PenaltyService {
     await prisma.penalty.delete({
       where: { id: penaltyId },
     });
+    TeamLeaderboardService.invalidate(penalty.tournamentId);
 
     return { success: true };
   }
@@ -281,6 +285,7 @@ export class PenaltyService {
         team: true,
       },
     });
+    TeamLeaderboardService.invalidate(penalty.tournamentId);
 
     return updated;
   }
@@ -320,6 +325,7 @@ export class PenaltyService {
         team: true,
       },
     });
+    TeamLeaderboardService.invalidate(penalty.tournamentId);
 
     return updated;
   }
@@ -0,0 +1,341 @@
+/**
+ * =============================================================================
+ * TEAM LEADERBOARD SERVICE
+ * =============================================================================
+ * Classifica a squadre: approved catches of the crew members (TeamMember)
+ * minus the team penalties (ACTIVE/UPHELD, as getTeamPenaltyPoints)
+ *
+ * A tournament is loaded with three grouped queries (teams with members,
+ * approved catches GROUP BY userId, penalties GROUP BY teamId/type) and
+ * totalled in one pass, instead of one query per team. The table is kept
+ * in memory and updated per member when LeaderboardService.updateEntry
+ * recomputes a user's totals; team/penalty changes invalidate it.
+ *
+ * Ranking: net points, biggest catch, catch count (descending, dense as
+ * recalculateRanks); disqualified teams last with rank null.
+ * =============================================================================
+ */
+
+import { PenaltyStatus, PenaltyType } from "@prisma/client";
+import prisma from "../lib/prisma";
+import { config } from "../config";
+import { CatchStatus } from "../types";
+
+export interface MemberTotals {
+  totalPoints: number;
+  totalWeight: number;
+  catchCount: number;
+  biggestCatch: number | null;
+}
+
+export interface TeamStanding {
+  rank: number | null;
+  teamId: string;
+  teamName: string;
+  boatName: string;
+  boatNumber: number | null;
+  clubName: string | null;
+  memberCount: number;
+  catchPoints: number;
+  penaltyPoints: number;
+  totalPoints: number; // catchPoints - penaltyPoints
+  totalWeight: number;
+  catchCount: number;
+  biggestCatch: number | null;
+  isDisqualified: boolean;
+}
+
+interface TeamRow {
+  standing: TeamStanding;
+  members: string[]; // registered members (userId)
+}
+
+const EMPTY_TOTALS: MemberTotals = {
+  totalPoints: 0,
+  totalWeight: 0,
+  catchCount: 0,
+  biggestCatch: null,
+};
+
+// Decimal(10,2) points and Decimal(8,3) weights: keep sums exact
+const round = (value: number, digits: number) =>
+  Math.round(value * 10 ** digits) / 10 ** digits;
+
+/**
+ * Team table of a single tournament
+ */
+export class TeamTable {
+  private teams = new Map<string, TeamRow>();
+  private teamsOfUser = new Map<string, string[]>();
+  private members: Map<string, MemberTotals>;
+  private ranked: TeamStanding[] | null = null;
+
+  constructor(
+    teams: {
+      id: string;
+      name: string;
+      boatName: string;
+      boatNumber: number | null;
+      clubName: string | null;
+      members: { userId: string | null }[];
+    }[],
+    members: Map<string, MemberTotals>,
+    penalties: Map<string, { points: number; isDisqualified: boolean }>
+  ) {
+    this.members = members;
+
+    for (const team of teams) {
+      const memberIds = team.members
+        .map((m) => m.userId)
+        .filter((userId): userId is string => userId !== null);
+      const penalty = penalties.get(team.id);
+      const standing: TeamStanding = {
+        rank: null,
+        teamId: team.id,
+        teamName: team.name,
+        boatName: team.boatName,
+        boatNumber: team.boatNumber,
+        clubName: team.clubName,
+        memberCount: team.members.length,
+        catchPoints: 0,
+        penaltyPoints: penalty?.points ?? 0,
+        totalPoints: 0,
+        totalWeight: 0,
+        catchCount: 0,
+        biggestCatch: null,
+        isDisqualified: penalty?.isDisqualified ?? false,
+      };
+
+      for (const userId of memberIds) {
+        const totals = members.get(userId) ?? EMPTY_TOTALS;
+        standing.catchPoints += totals.totalPoints;
+        standing.totalWeight += totals.totalWeight;
+        standing.catchCount += totals.catchCount;
+        if (
+          totals.biggestCatch !== null &&
+          totals.biggestCatch > (standing.biggestCatch ?? -1)
+        ) {
+          standing.biggestCatch = totals.biggestCatch;
+        }
+        this.teamsOfUser.set(userId, [...(this.teamsOfUser.get(userId) ?? []), team.id]);
+      }
+      this.settle(standing);
+      this.teams.set(team.id, { standing, members: memberIds });
+    }
+  }
+
+  /**
+   * Replace one member's totals and adjust only the teams they belong to
+   */
+  updateMember(userId: string, totals: MemberTotals): void {
+    const previous = this.members.get(userId) ?? EMPTY_TOTALS;
+    this.members.set(userId, totals);
+
+    for (const teamId of this.teamsOfUser.get(userId) ?? []) {
+      const { standing, members } = this.teams.get(teamId)!;
+      standing.catchPoints += totals.totalPoints - previous.totalPoints;
+      standing.totalWeight += totals.totalWeight - previous.totalWeight;
+      standing.catchCount += totals.catchCount - previous.catchCount;
+
+      if (
+        previous.biggestCatch !== null &&
+        previous.biggestCatch === standing.biggestCatch &&
+        (totals.biggestCatch ?? -1) < previous.biggestCatch
+      ) {
+        // The team's best catch went down: scan the crew again
+        standing.biggestCatch = members.reduce<number | null>((best, memberId) => {
+          const biggest = this.members.get(memberId)?.biggestCatch ?? null;
+          return biggest !== null && biggest > (best ?? -1) ? biggest : best;
+        }, null);
+      } else if (
+        totals.biggestCatch !== null &&
+        totals.biggestCatch > (standing.biggestCatch ?? -1)
+      ) {
+        standing.biggestCatch = totals.biggestCatch;
+      }
+      this.settle(standing);
+      this.ranked = null;
+    }
+  }
+
+  standings(): TeamStanding[] {
+    if (!this.ranked) {
+      this.ranked = this.rank();
+    }
+    return this.ranked;
+  }
+
+  standing(teamId: string): TeamStanding | null {
+    if (!this.teams.has(teamId)) return null;
+    return this.standings().find((s) => s.teamId === teamId) ?? null;
+  }
+
+  private settle(standing: TeamStanding): void {
+    standing.catchPoints = round(standing.catchPoints, 2);
+    standing.totalWeight = round(standing.totalWeight, 3);
+    standing.totalPoints = round(standing.catchPoints - standing.penaltyPoints, 2);
+  }
+
+  private rank(): TeamStanding[] {
+    const standings = [...this.teams.values()].map((t) => t.standing);
+    standings.sort(
+      (a, b) =>
+        Number(a.isDisqualified) - Number(b.isDisqualified) ||
+        b.totalPoints - a.totalPoints ||
+        (b.biggestCatch ?? -1) - (a.biggestCatch ?? -1) ||
+        b.catchCount - a.catchCount ||
+        a.teamName.localeCompare(b.teamName)
+    );
+
+    let rank = 0;
+    return standings.map((standing, i) => {
+      const previous = standings[i - 1];
+      const tied =
+        previous !== undefined &&
+        !previous.isDisqualified &&
+        previous.totalPoints === standing.totalPoints &&
+        (previous.biggestCatch ?? -1) === (standing.biggestCatch ?? -1) &&
+        previous.catchCount === standing.catchCount;
+      if (!tied) rank++;
+      return { ...standing, rank: standing.isDisqualified ? null : rank };
+    });
+  }
+}
+
+interface CachedTable {
+  table: TeamTable;
+  loadedAt: number;
+  readAt: number;
+}
+
+const tables = new Map<string, CachedTable>();
+const loading = new Map<string, Promise<TeamTable>>();
+
+export class TeamLeaderboardService {
+  /**
+   * Team leaderboard of a tournament
+   */
+  static async getTeamLeaderboard(tournamentId: string): Promise<TeamStanding[]> {
+    const table = await this.get(tournamentId);
+    return table.standings();
+  }
+
+  /**
+   * Position of a single team
+   */
+  static async getTeamPosition(tournamentId: string, teamId: string) {
+    const table = await this.get(tournamentId);
+    const standing = table.standing(teamId);
+    if (!standing) return null;
+    return { ...standing, totalTeams: table.standings().length };
+  }
+
+  /**
+   * Apply a member's recomputed totals (after LeaderboardService.updateEntry)
+   */
+  static updateMember(tournamentId: string, userId: string, totals: MemberTotals): void {
+    tables.get(tournamentId)?.table.updateMember(userId, totals);
+    if (loading.has(tournamentId)) {
+      // A load started before this change may not see it
+      this.invalidate(tournamentId);
+    }
+  }
+
+  /**
+   * Drop a tournament after team, crew or penalty changes
+   */
+  static invalidate(tournamentId: string): void {
+    tables.delete(tournamentId);
+    loading.delete(tournamentId);
+  }
+
+  /**
+   * Load teams, catches and penalties of a tournament in one grouped pass
+   */
+  static async build(tournamentId: string): Promise<TeamTable> {
+    const [teams, catchGroups, penaltyGroups] = await Promise.all([
+      prisma.team.findMany({
+        where: { tournamentId },
+        select: {
+          id: true,
+          name: true,
+          boatName: true,
+          boatNumber: true,
+          clubName: true,
+          members: { select: { userId: true } },
+        },
+      }),
+      prisma.catch.groupBy({
+        by: ["userId"],
+        where: { tournamentId, status: CatchStatus.APPROVED },
+        _sum: { points: true, weight: true },
+        _count: { id: true },
+        _max: { weight: true },
+      }),
+      prisma.penalty.groupBy({
+        by: ["teamId", "type"],
+        where: {
+          tournamentId,
+          teamId: { not: null },
+          status: { in: [PenaltyStatus.ACTIVE, PenaltyStatus.UPHELD] },
+        },
+        _sum: { points: true },
+      }),
+    ]);
+
+    const members = new Map<string, MemberTotals>();
+    for (const group of catchGroups) {
+      members.set(group.userId, {
+        totalPoints: Number(group._sum.points || 0),
+        totalWeight: Number(group._sum.weight || 0),
+        catchCount: group._count.id,
+        biggestCatch: group._max.weight !== null ? Number(group._max.weight) : null,
+      });
+    }
+
+    const penalties = new Map<string, { points: number; isDisqualified: boolean }>();
+    for (const group of penaltyGroups) {
+      const penalty = penalties.get(group.teamId!) ?? { points: 0, isDisqualified: false };
+      penalty.points += group._sum.points || 0;
+      penalty.isDisqualified ||= group.type === PenaltyType.DISQUALIFICATION;
+      penalties.set(group.teamId!, penalty);
+    }
+
+    return new TeamTable(teams, members, penalties);
+  }
+
+  private static async get(tournamentId: string): Promise<TeamTable> {
+    if (!config.liveLeaderboard.enabled) {
+      return this.build(tournamentId);
+    }
+
+    const now = Date.now();
+    for (const [id, cached] of tables) {
+      if (now - cached.readAt > config.liveLeaderboard.idleMs) tables.delete(id);
+    }
+
+    const cached = tables.get(tournamentId);
+    if (cached && now - cached.loadedAt < config.liveLeaderboard.refreshMs) {
+      cached.readAt = now;
+      return cached.table;
+    }
+
+    const pending = loading.get(tournamentId);
+    if (pending) return pending;
+
+    const load = this.build(tournamentId);
+    loading.set(tournamentId, load);
+    try {
+      const table = await load;
+      // Keep the table only if nothing invalidated it while loading
+      if (loading.get(tournamentId) === load) {
+        tables.set(tournamentId, { table, loadedAt: Date.now(), readAt: Date.now() });
+      }
+      return table;
+    } finally {
+      if (loading.get(tournamentId) === load) loading.delete(tournamentId);
+    }
+  }
+}
+
+export default TeamLeaderboardService;
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmark delle pipeline documentazione e regolamenti.
+
+Misura su fixture fisse (screenshot di docs/screenshots, righe di classifica
+generate con seed fisso, PDF di prova serviti da un server HTTP locale):
+tempo, picco di memoria (RSS), dimensione dei PDF prodotti e documenti al
+secondo. Ogni caso gira in un processo separato con cache vuote, così il
+picco RSS e i tempi non dipendono dai casi precedenti.
+
+Uso:
+    python benchmark_pipelines.py [--case NOME ...] [--repeat N]
+    python benchmark_pipelines.py --save-baseline        # registra la baseline
+    python benchmark_pipelines.py --threshold 0.15       # confronta con la baseline
+
+I risultati vengono confrontati con BASELINE_FILE: un caso più lento, più
+pesante in memoria o con output più grande oltre la soglia è una regressione
+e il comando termina con codice 1.
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows: RSS non disponibile
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = os.path.join(ROOT_DIR, "docs")
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.15
+
+# Metriche confrontate con la baseline (più alto = peggio)
+COMPARED_METRICS = ("wall_s", "peak_rss_mb", "output_bytes")
+
+# Fixture di classifica e download
+LEADERBOARD_TEAMS = 2000
+LEADERBOARD_CATCHES = 10000
+DOWNLOAD_DOCUMENTS = 24
+DOWNLOAD_WORKERS = 4
+FIXTURE_SEED = 20260110
+
+
+# =============================================================================
+# CASI (eseguiti nel processo figlio)
+# =============================================================================
+
+def case_manuale_sezioni(workdir, base_url):
+    """generate_pdf_manual.build_sections() a cache vuota"""
+    import generate_pdf_manual as manual
+    output = os.path.join(workdir, "manuale.pdf")
+
+    def run():
+        manual.build_sections(output, use_cache=False)
+        return 1, [output]
+    return run
+
+def case_manuale_sezioni_cache(workdir, base_url):
+    """build_sections() con tutte le sezioni già in cache (la prima build non è misurata)"""
+    import generate_pdf_manual as manual
+    output = os.path.join(workdir, "manuale.pdf")
+    manual.build_sections(output)
+
+    def run():
+        manual.build_sections(output)
+        return 1, [output]
+    return run
+
+def case_manuale_single_pass(workdir, base_url):
+    """build_document() + un solo doc.build"""
+    import generate_pdf_manual as manual
+    output = os.path.join(workdir, "manuale.pdf")
+
+    def run():
+        doc = manual.create_doc(output)
+        doc.build(manual.build_document(), onFirstPage=manual.add_header_footer,
+                  onLaterPages=manual.add_header_footer)
+        return 1, [output]
+    return run
+
+def case_manuale_immagini(workdir, base_url):
+    """generate_pdf_with_images.build_pdf()"""
+    import generate_pdf_with_images as manual
+    manual.OUTPUT_PDF = os.path.join(workdir, "manuale_immagini.pdf")
+
+    def run():
+        if not manual.build_pdf():
+            raise RuntimeError("build_pdf() non riuscita")
+        return 1, [manual.OUTPUT_PDF]
+    return run
+
+def leaderboard_lines(teams=LEADERBOARD_TEAMS, catches=LEADERBOARD_CATCHES, seed=FIXTURE_SEED):
+    """Input JSON lines del renderer classifica, sempre uguale per lo stesso seed"""
+    rnd = random.Random(seed)
+    yield json.dumps({
+        "tournament": {"name": "Trofeo Benchmark", "discipline": "BIG_GAME", "location": "Ischia",
+                       "startDate": "2026-06-01T06:00:00Z", "endDate": "2026-06-03T18:00:00Z"},
+        "tenant": {"name": "Associazione Benchmark", "primaryColor": "#0066CC"},
+        "organizerName": "Direttore Benchmark",
+    })
+    for i in range(teams):
+        yield json.dumps({
+            "table": "leaderboard", "rank": i + 1, "teamName": f"Squadra {i + 1}",
+            "boatName": f"Barca {i + 1}", "boatNumber": i + 1, "captainName": "Mario Rossi",
+            "clubName": "ASD Pesca Sportiva", "catchCount": rnd.randint(0, 12),
+            "releasedCount": rnd.randint(0, 3), "lostCount": rnd.randint(0, 3),
+            "totalWeight": round(rnd.uniform(0, 400), 2), "biggestCatch": round(rnd.uniform(0, 120), 2),
+            "totalPoints": (teams - i) * 100,
+        })
+    for i in range(catches):
+        yield json.dumps({
+            "table": "catches", "rank": i + 1, "teamName": f"Squadra {rnd.randint(1, teams)}",
+            "boatName": "Barca", "anglerName": "Luca Bianchi", "rodNumber": rnd.randint(1, 6),
+            "speciesName": "Tonno rosso", "weight": round(rnd.uniform(1, 120), 2),
+            "length": round(rnd.uniform(40, 220), 1), "caughtAt": "2026-06-01T09:30:00Z",
+            "points": rnd.randint(100, 12000),
+        })
+
+def case_classifica_pdf(workdir, base_url):
+    """generate_leaderboard_pdf.render_stream() su LEADERBOARD_TEAMS squadre e LEADERBOARD_CATCHES catture"""
+    import generate_leaderboard_pdf as leaderboard
+    lines = list(leaderboard_lines())
+    output = os.path.join(workdir, "classifica.pdf")
+
+    def run():
+        leaderboard.render_stream(lines, output)
+        return 1, [output]
+    return run
+
+def case_download_regolamenti(workdir, base_url):
+    """download_regulations.download_all() dal server HTTP locale"""
+    import download_regulations as dr
+    regulations = fixture_regulations()
+    output_dir = os.path.join(workdir, "pdf")
+    os.makedirs(output_dir)
+    cache = dr.MetadataStore(os.path.join(output_dir, dr.CACHE_FILE))
+
+    def run():
+        session = dr.create_session(DOWNLOAD_WORKERS)
+        try:
+            totals = dr.download_all(regulations, DOWNLOAD_WORKERS, base_url, output_dir,
+                                     dr.HostRateLimiter(0), cache, True, session, 1)
+        finally:
+            session.close()
+        if totals[dr.FAILED]:
+            raise RuntimeError(f"{totals[dr.FAILED]} download falliti")
+        paths = [os.path.join(output_dir, info["filename"]) for info in regulations.values()]
+        return len(paths), paths
+    return run
+
+CASES = {
+    "manuale-sezioni": case_manuale_sezioni,
+    "manuale-sezioni-cache": case_manuale_sezioni_cache,
+    "manuale-single-pass": case_manuale_single_pass,
+    "manuale-immagini": case_manuale_immagini,
+    "classifica-pdf": case_classifica_pdf,
+    "download-regolamenti": case_download_regolamenti,
+}
+
+
+def peak_rss_mb():
+    """Picco RSS del processo e dei suoi figli (pool di rendering), in MB"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux riporta KB, macOS byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_child(name, workdir, base_url):
+    """Esegue un caso e scrive le metriche in workdir/result.json"""
+    sys.path[:0] = [DOCS_DIR, ROOT_DIR]
+    run = CASES[name](workdir, base_url)
+    started = time.perf_counter()
+    documents, outputs = run()
+    wall = time.perf_counter() - started
+    result = {
+        "wall_s": wall,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": sum(os.path.getsize(path) for path in outputs),
+        "documents": documents,
+    }
+    with open(os.path.join(workdir, "result.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+# =============================================================================
+# FIXTURE HTTP
+# =============================================================================
+
+def fixture_regulations():
+    """REGULATIONS dei PDF di prova (stesso formato di download_regulations.py)"""
+    return {
+        f"fixture-{i:02d}": {"url": f"/fixtures/regolamento_{i:02d}.pdf",
+                             "filename": f"regolamento_{i:02d}.pdf"}
+        for i in range(DOWNLOAD_DOCUMENTS)
+    }
+
+def write_fixture_pdfs(directory, seed=FIXTURE_SEED):
+    """PDF di prova da 100 KB a 2 MB, contenuto deterministico"""
+    rnd = random.Random(seed)
+    target = os.path.join(directory, "fixtures")
+    os.makedirs(target, exist_ok=True)
+    for info in fixture_regulations().values():
+        size = rnd.randint(100 * 1024, 2 * 1024 * 1024)
+        with open(os.path.join(target, info["filename"]), "wb") as f:
+            f.write(b"%PDF-1.4\n" + rnd.randbytes(size))
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_server(directory):
+    """Server HTTP locale sulla porta libera scelta dal sistema; restituisce (server, base_url)"""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# =============================================================================
+# ESECUZIONE E CONFRONTO
+# =============================================================================
+
+def run_case(name, repeat, base_url, verbose=False):
+    """Esegue `repeat` volte il caso in processi separati; restituisce le metriche aggregate"""
+    runs = []
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        env = dict(os.environ, PDF_CACHE_DIR=os.path.join(workdir, "cache"))
+        try:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", name,
+                 "--workdir", workdir, "--base-url", base_url],
+                env=env, check=True, cwd=ROOT_DIR,
+                stdout=None if verbose else subprocess.DEVNULL,
+            )
+            with open(os.path.join(workdir, "result.json"), encoding="utf-8") as f:
+                runs.append(json.load(f))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    wall = statistics.median(r["wall_s"] for r in runs)
+    rss = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+    return {
+        "wall_s": round(wall, 4),
+        "wall_min_s": round(min(r["wall_s"] for r in runs), 4),
+        "peak_rss_mb": round(max(rss), 1) if rss else None,
+        "output_bytes": runs[-1]["output_bytes"],
+        "documents": runs[-1]["documents"],
+        "docs_per_s": round(runs[-1]["documents"] / wall, 3) if wall else None,
+        "repeat": repeat,
+    }
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_results(path, results):
+    data = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "cases": results,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def compare(current, baseline, threshold):
+    """
+    Variazione relativa delle metriche rispetto alla baseline.
+    Restituisce {metrica: (variazione, regressione)} per le metriche confrontabili.
+    """
+    changes = {}
+    for metric in COMPARED_METRICS:
+        old, new = baseline.get(metric), current.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        changes[metric] = (change, change > threshold)
+    return changes
+
+def format_change(changes, metric):
+    if metric not in changes:
+        return "-"
+    change, regression = changes[metric]
+    return f"{change:+.0%}{' !' if regression else ''}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline documentazione e regolamenti")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), default=None,
+                        help="caso da eseguire (ripetibile, default: tutti)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="esecuzioni per caso, si usa la mediana (default: %(default)s)")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="file JSON della baseline (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="salva i risultati come nuova baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="peggioramento tollerato, 0.15 = 15%% (default: %(default)s)")
+    parser.add_argument("--results", default=None,
+                        help="salva anche i risultati di questa esecuzione in un file JSON")
+    parser.add_argument("--verbose", action="store_true",
+                        help="mostra l'output delle pipeline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workdir, args.base_url)
+        return 0
+
+    names = args.case or list(CASES)
+    baseline = load_baseline(args.baseline)
+
+    print("="*60)
+    print("Benchmark Pipeline TournamentMaster")
+    print("="*60)
+    print(f"Casi: {len(names)}, ripetizioni: {args.repeat}, soglia: {args.threshold:.0%}")
+    if baseline is None:
+        print(f"Baseline: nessuna ({args.baseline})")
+    else:
+        print(f"Baseline: {args.baseline} ({baseline['created_at']})")
+        if baseline.get("environment") != environment():
+            print("Warning: baseline registrata su un ambiente diverso, confronto indicativo")
+    print()
+
+    fixtures = tempfile.mkdtemp(prefix="bench-fixtures-")
+    write_fixture_pdfs(fixtures)
+    server, base_url = start_fixture_server(fixtures)
+
+    results = {}
+    regressions = []
+    try:
+        print(f"{'caso':<24}{'tempo':>9}{'RSS':>9}{'output':>10}{'doc/s':>8}"
+              f"{'Δtempo':>9}{'ΔRSS':>8}{'Δoutput':>9}")
+        for name in names:
+            current = results[name] = run_case(name, args.repeat, base_url, args.verbose)
+            previous = (baseline or {}).get("cases", {}).get(name)
+            changes = compare(current, previous, args.threshold) if previous else {}
+            regressions.extend(f"{name}: {metric}" for metric, (_, bad) in changes.items() if bad)
+
+            rss = f"{current['peak_rss_mb']:.0f}MB" if current["peak_rss_mb"] is not None else "-"
+            print(f"{name:<24}{current['wall_s']:>8.2f}s{rss:>9}"
+                  f"{current['output_bytes'] / 1024:>8.0f}KB{current['docs_per_s']:>8.2f}"
+                  f"{format_change(changes, 'wall_s'):>9}{format_change(changes, 'peak_rss_mb'):>8}"
+                  f"{format_change(changes, 'output_bytes'):>9}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(fixtures, ignore_errors=True)
+
+    if args.results:
+        save_results(args.results, results)
+    if args.save_baseline:
+        merged = dict((baseline or {}).get("cases", {}), **results)
+        save_results(args.baseline, merged)
+        print(f"\nBaseline salvata: {args.baseline}")
+
+    print()
+    print("="*60)
+    if regressions:
+        print(f"REGRESSIONI oltre il {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        print("="*60)
+        return 1
+    print("Nessuna regressione" if baseline else "Nessuna baseline da confrontare")
+    print("="*60)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Crawler del catalogo regolamenti FIPSAS.
+
+Visita in parallelo le pagine indice delle discipline (le cartelle che
+contengono i documenti di REGULATIONS), estrae i link "/<id>-<slug>/file" e
+aggiorna in modo incrementale il catalogo salvato in CATALOGUE_FILE.
+Le pagine vengono richieste con If-None-Match/If-Modified-Since: se la pagina
+o l'elenco dei link non è cambiato il catalogo non viene toccato.
+
+Uso:
+    python crawl_regulations.py [--workers N] [--rate R] [--base-url URL]
+
+Il catalogo può poi essere usato da download_regulations.py con --catalogue.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from download_regulations import (
+    BASE_URL, DEFAULT_BURST, DEFAULT_RATE, DEFAULT_WORKERS, REGULATIONS,
+    HostRateLimiter, conditional_headers, create_session, utc_now,
+)
+
+# Catalogo dei documenti scoperti
+CATALOGUE_FILE = "regulations_catalogue.json"
+
+# "/.../5789-circolare-normativa-2025-big-game/file"
+FILE_LINK_RE = re.compile(r"/(?P<id>\d+)-(?P<slug>[^/]+)/file$")
+YEAR_RE = re.compile(r"(?:^|-)(?P<year>20\d{2})(?:-|$)")
+PAGINATION_PARAMS = ("start=", "limitstart=")
+SLUG_PREFIXES = ("circolare-normativa-",)
+
+
+def seed_index_pages(regulations=REGULATIONS):
+    """Pagine indice da cui partire: le cartelle dei documenti già noti."""
+    pages = set()
+    for info in regulations.values():
+        pages.add(info["url"].rsplit("/", 2)[0])
+    return sorted(pages)
+
+
+class LinkParser(HTMLParser):
+    """Raccoglie (href, testo) di tutti i tag <a> di una pagina."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self._href = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._href = dict(attrs).get("href")
+            self._text = []
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._href is not None:
+            self.links.append((self._href, " ".join("".join(self._text).split())))
+            self._href = None
+
+
+def parse_listing(html, page_path):
+    """
+    Estrae da una pagina indice i documenti (dict id -> url, slug, titolo)
+    e le altre pagine dello stesso elenco (paginazione).
+    """
+    parser = LinkParser()
+    parser.feed(html)
+
+    documents = {}
+    pages = set()
+    for href, text in parser.links:
+        path = urlsplit(urljoin(page_path + "/", href))
+        match = FILE_LINK_RE.search(path.path)
+        if match:
+            documents[match.group("id")] = {
+                "url": path.path,
+                "slug": match.group("slug"),
+                "title": text,
+            }
+        elif path.path.rstrip("/") == page_path and any(p in path.query for p in PAGINATION_PARAMS):
+            pages.add(f"{path.path.rstrip('/')}?{path.query}")
+    return documents, pages
+
+def listing_hash(documents):
+    """Hash dell'elenco dei link, indipendente dal resto dell'HTML."""
+    data = json.dumps(sorted((d["url"], d["title"]) for d in documents.values()))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def document_key(slug):
+    """
+    Chiave e nome file per un documento non presente in REGULATIONS:
+    "circolare-normativa-2025-big-game" -> ("big-game-2025", "circolare_normativa_2025_big_game.pdf")
+    """
+    name = slug
+    for prefix in SLUG_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    match = YEAR_RE.search(name)
+    if match:
+        rest = (name[:match.start()] + "-" + name[match.end():]).strip("-")
+        name = f"{rest}-{match.group('year')}"
+    return name, slug.replace("-", "_") + ".pdf"
+
+def unique_document(key, filename, doc_id, taken_keys, taken_files):
+    """
+    Chiave e nome file di un documento, resi unici se uno dei due è già usato
+    da un altro documento: "<key>-id<id>" e "<nome>_<id>.pdf". Il suffisso
+    "-id" non viene letto come anno da regulation_store.split_key.
+    """
+    if key in taken_keys or filename in taken_files:
+        stem, ext = os.path.splitext(filename)
+        return f"{key}-id{doc_id}", f"{stem}_{doc_id}{ext}"
+    return key, filename
+
+
+class Catalogue:
+    """
+    Catalogo persistito in JSON:
+        pages:     path pagina -> etag, last_modified, listing_hash, fetched_at
+        documents: id documento -> key, url, filename, title, page, first_seen, last_seen
+    """
+
+    def __init__(self, path=CATALOGUE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"pages": {}, "documents": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def page(self, page_path):
+        with self.lock:
+            return dict(self.data["pages"].get(page_path, {}))
+
+    def update_page(self, page_path, **fields):
+        with self.lock:
+            self.data["pages"].setdefault(page_path, {}).update(fields)
+
+    def merge(self, page_path, documents, known_urls):
+        """Aggiunge/aggiorna i documenti di una pagina; restituisce quanti sono nuovi."""
+        now = utc_now()
+        added = 0
+        with self.lock:
+            taken_keys = {key for key, _ in known_urls.values()}
+            taken_files = {filename for _, filename in known_urls.values()}
+            for entry in self.data["documents"].values():
+                taken_keys.add(entry["key"])
+                taken_files.add(entry["filename"])
+            for doc_id, doc in documents.items():
+                entry = self.data["documents"].get(doc_id)
+                if entry is None:
+                    if doc["url"] in known_urls:
+                        key, filename = known_urls[doc["url"]]
+                    else:
+                        derived, derived_file = document_key(doc["slug"])
+                        key, filename = unique_document(derived, derived_file, doc_id,
+                                                        taken_keys, taken_files)
+                        if key != derived:
+                            print(f"  {page_path}: '{derived}' già usato, documento {doc_id} "
+                                  f"-> '{key}' ({filename})")
+                    taken_keys.add(key)
+                    taken_files.add(filename)
+                    entry = self.data["documents"][doc_id] = {
+                        "key": key,
+                        "filename": filename,
+                        "first_seen": now,
+                    }
+                    added += 1
+                entry.update(url=doc["url"], title=doc["title"], page=page_path, last_seen=now)
+        return added
+
+    def regulations(self, reserved=None):
+        """
+        Catalogo nel formato di REGULATIONS (key -> url, filename).
+        Chiavi o file già usati (da un altro documento o in `reserved`, nel
+        formato di REGULATIONS) vengono resi unici con unique_document(),
+        così nessun documento viene perso o sovrascritto.
+        """
+        with self.lock:
+            documents = sorted(self.data["documents"].items(), key=lambda item: (item[1]["key"], item[0]))
+        reserved = reserved or {}
+        regulations = {}
+        taken_keys = set(reserved)
+        taken_files = {info["filename"] for info in reserved.values()}
+        for doc_id, doc in documents:
+            key, filename = unique_document(doc["key"], doc["filename"], doc_id,
+                                            taken_keys, taken_files)
+            taken_keys.add(key)
+            taken_files.add(filename)
+            regulations[key] = {"url": doc["url"], "filename": filename}
+        return regulations
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.data, indent=2, sort_keys=True, ensure_ascii=False)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def load_catalogue(path=CATALOGUE_FILE):
+    """REGULATIONS esteso con i documenti scoperti dal crawler (se il catalogo esiste)."""
+    regulations = dict(REGULATIONS)
+    if os.path.exists(path):
+        known = {info["url"] for info in regulations.values()}
+        for key, info in Catalogue(path).regulations(reserved=REGULATIONS).items():
+            if info["url"] not in known:
+                regulations[key] = info
+    return regulations
+
+def crawl_page(page_path, catalogue, session, base_url=BASE_URL, limiter=None, known_urls=None):
+    """
+    Scarica una pagina indice (richiesta condizionale) e aggiorna il catalogo.
+    Restituisce (esito, documenti nuovi, pagine di paginazione scoperte).
+    """
+    url = base_url + page_path
+    meta = catalogue.page(page_path)
+    if limiter is not None:
+        limiter.acquire(url)
+
+    try:
+        response = session.get(url, timeout=30, headers=conditional_headers(meta))
+    except requests.RequestException as e:
+        print(f"  {page_path}: ERRORE ({str(e)[:50]})")
+        return "errore", 0, set()
+
+    if response.status_code == 304:
+        catalogue.update_page(page_path, fetched_at=utc_now())
+        return "invariata", 0, set(meta.get("pages", []))
+    if response.status_code != 200:
+        print(f"  {page_path}: ERRORE ({response.status_code})")
+        return "errore", 0, set()
+
+    documents, pages = parse_listing(response.text, page_path.split("?")[0])
+    digest = listing_hash(documents)
+    catalogue.update_page(
+        page_path,
+        etag=response.headers.get("etag"),
+        last_modified=response.headers.get("last-modified"),
+        fetched_at=utc_now(),
+        pages=sorted(pages),
+    )
+    if digest == meta.get("listing_hash"):
+        return "invariata", 0, pages
+
+    added = catalogue.merge(page_path, documents, known_urls or {})
+    catalogue.update_page(page_path, listing_hash=digest)
+    print(f"  {page_path}: {len(documents)} documenti, {added} nuovi")
+    return "aggiornata", added, pages
+
+def crawl(catalogue, pages, session, base_url=BASE_URL, workers=DEFAULT_WORKERS, limiter=None):
+    """
+    Visita in parallelo `pages` e le pagine di paginazione che emergono.
+    Restituisce (pagine aggiornate, pagine invariate, errori, documenti nuovi).
+    """
+    known_urls = {info["url"]: (key, info["filename"]) for key, info in REGULATIONS.items()}
+    seen = set(pages)
+    frontier = list(pages)
+    updated = unchanged = errors = added = 0
+
+    def worker(page_path):
+        return crawl_page(page_path, catalogue, session, base_url, limiter, known_urls)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while frontier:
+            results = list(pool.map(worker, frontier))
+            frontier = []
+            for status, new_docs, more_pages in results:
+                updated += status == "aggiornata"
+                unchanged += status == "invariata"
+                errors += status == "errore"
+                added += new_docs
+                for page_path in sorted(more_pages - seen):
+                    seen.add(page_path)
+                    frontier.append(page_path)
+
+    return updated, unchanged, errors, added
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawler catalogo regolamenti FIPSAS")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="pagine scaricate in parallelo (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="richieste al secondo per host, 0 = illimitato (default: %(default)s)")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST,
+                        help="richieste consecutive senza attesa (default: %(default)s)")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="URL base del sito (default: %(default)s)")
+    parser.add_argument("--catalogue", default=CATALOGUE_FILE,
+                        help="file del catalogo (default: %(default)s)")
+    parser.add_argument("--page", action="append", default=None,
+                        help="pagina indice da visitare (ripetibile, default: cartelle di REGULATIONS)")
+    args = parser.parse_args()
+
+    pages = args.page or seed_index_pages()
+
+    print("="*60)
+    print("Crawler Catalogo Regolamenti FIPSAS")
+    print("="*60)
+    print(f"Pagine indice: {len(pages)}")
+    print()
+
+    catalogue = Catalogue(args.catalogue)
+    session = create_session(max(1, args.workers))
+    limiter = HostRateLimiter(args.rate, args.burst)
+
+    started = time.monotonic()
+    try:
+        updated, unchanged, errors, added = crawl(
+            catalogue, pages, session, args.base_url.rstrip("/"), args.workers, limiter
+        )
+    finally:
+        session.close()
+    catalogue.save()
+    elapsed = time.monotonic() - started
+
+    print()
+    print("="*60)
+    print(f"Pagine: {updated} aggiornate, {unchanged} invariate, {errors} errori ({elapsed:.1f}s)")
+    print(f"Documenti nel catalogo: {len(catalogue.data['documents'])} ({added} nuovi)")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+TournamentMaster - Leaderboard PDF Renderer
+Renders the official tournament leaderboard (team ranking + catch detail) with
+the table and page helpers of generate_pdf_manual.py.
+
+Meant to run outside the API process: the backend pipes the rows in as JSON
+lines and reads the PDF back from stdout.
+    python docs/generate_leaderboard_pdf.py [--input FILE|-] [--output FILE|-]
+
+Input (one JSON object per line):
+    {"tournament": {...}, "tenant": {...}, "organizerName": "..."}   first line
+    {"table": "leaderboard", "rank": 1, "teamName": ..., ...}         LeaderboardRow
+    {"table": "catches", "rank": 1, "anglerName": ..., ...}           CatchDetail
+
+Rows are consumed one page at a time: each page becomes its own table, is
+drawn and released, so the row data held at once is bounded by a page. The
+PDF itself still grows with the rows: the Canvas keeps every page until
+save(), and pdf.service.ts collects stdout into a single Buffer.
+"""
+
+import argparse
+import base64
+import io
+import json
+import sys
+import time
+from datetime import datetime
+from itertools import groupby, islice
+
+from reportlab.lib.colors import HexColor, white
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+import generate_pdf_manual as manual
+
+PAGE_SIZE = landscape(A4)
+MARGIN_X = 1.5*cm
+TABLE_TOP = PAGE_SIZE[1] - 1.6*cm
+TABLE_BOTTOM = 2.6*cm
+BANNER_HEIGHT = 1.8*cm
+CELL_PADDING = 3
+FONT_SIZE = 8
+HEADER_TITLE = "Classifica Ufficiale FIPSAS"
+
+# Colours of the PDFKit version
+PODIUM_COLORS = [HexColor('#FFD700'), HexColor('#C0C0C0'), HexColor('#CD7F32')]
+DEFAULT_PRIMARY = '#0066CC'
+
+MONTHS = ['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno', 'luglio',
+          'agosto', 'settembre', 'ottobre', 'novembre', 'dicembre']
+
+# (header, width in points on the 782pt wide PDFKit page, row -> text)
+LEADERBOARD_COLUMNS = [
+    ("Pos", 35, lambda r: str(r['rank'])),
+    ("Squadra", 120, lambda r: r.get('teamName') or "-"),
+    ("Barca", 90, lambda r: r.get('boatName') or "-"),
+    ("N.", 30, lambda r: str(r['boatNumber']) if r.get('boatNumber') else "-"),
+    ("Capitano", 95, lambda r: r.get('captainName') or "-"),
+    ("Società", 85, lambda r: r.get('clubName') or "-"),
+    ("Catture", 50, lambda r: str(r.get('catchCount', 0))),
+    ("Rilasci", 45, lambda r: str(r.get('releasedCount', 0))),
+    ("Persi", 40, lambda r: str(r.get('lostCount', 0))),
+    ("Peso Tot.", 60, lambda r: f"{float(r.get('totalWeight') or 0):.2f} kg"),
+    ("Max Peso", 55, lambda r: f"{float(r['biggestCatch']):.2f} kg" if r.get('biggestCatch') else "-"),
+    ("Punti", 55, lambda r: f"{float(r.get('totalPoints') or 0):.0f}"),
+]
+
+CATCH_COLUMNS = [
+    ("Pos", 28, lambda c: str(c['rank'])),
+    ("Squadra", 100, lambda c: c.get('teamName') or "N/A"),
+    ("Barca", 85, lambda c: c.get('boatName') or "-"),
+    ("Angler", 95, lambda c: c.get('anglerName') or "N/A"),
+    ("Canna", 38, lambda c: str(c['rodNumber']) if c.get('rodNumber') else "-"),
+    ("Specie", 80, lambda c: c.get('speciesName') or "N/A"),
+    ("Peso", 45, lambda c: f"{float(c.get('weight') or 0):.2f}"),
+    ("Lung.", 42, lambda c: f"{float(c['length']):.1f}" if c.get('length') else "-"),
+    ("Ora", 42, lambda c: format_time(c.get('caughtAt'))),
+    ("Punti", 50, lambda c: f"{float(c.get('points') or 0):.0f}"),
+]
+
+
+def parse_date(value):
+    """ISO date from the JSON input, in local time like the PDFKit version"""
+    if not value:
+        return None
+    date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return date.astimezone() if date.tzinfo else date
+
+def format_date(value):
+    date = parse_date(value)
+    return f"{date.day} {MONTHS[date.month - 1]} {date.year}" if date else "-"
+
+def format_time(value):
+    date = parse_date(value)
+    return date.strftime('%H:%M') if date else "-"
+
+class TableLayout:
+    """
+    Column widths, text limits and row styles of one table, computed once
+    and shared by every page of that table
+    """
+
+    def __init__(self, columns, frame_width):
+        scale = frame_width / sum(width for _, width, _ in columns)
+        self.headers = [header for header, _, _ in columns]
+        self.widths = [width * scale for _, width, _ in columns]
+        self.formatters = [fmt for _, _, fmt in columns]
+        self.text_widths = [width - 2 * CELL_PADDING for width in self.widths]
+        # Denser than the manual tables: thousands of rows
+        self.base_styles = [
+            ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ]
+        self.row_height = self.measure_row_height()
+        self._styles = {}
+
+    def measure_row_height(self):
+        table = manual.create_table([self.headers, self.headers], self.widths,
+                                    extra_styles=self.base_styles)
+        table.wrap(0, 0)
+        return max(table._rowHeights)
+
+    @staticmethod
+    def fit(text, width):
+        """Clip `text` to a single line of `width` points"""
+        if stringWidth(text, manual.FONT_REGULAR, FONT_SIZE) <= width:
+            return text
+        while text and stringWidth(text + '…', manual.FONT_REGULAR, FONT_SIZE) > width:
+            text = text[:-1]
+        return text + '…'
+
+    def cells(self, row):
+        return [self.fit(fmt(row), width) for fmt, width in zip(self.formatters, self.text_widths)]
+
+    def rows_per_page(self, height):
+        return max(1, int(height // self.row_height) - 1)
+
+    def page_styles(self, first_index, count):
+        """
+        Style commands for a page of `count` rows starting at row `first_index`,
+        cached: all full pages of a table share the same list
+        """
+        key = (min(first_index, 3), first_index % 2, count)
+        if key not in self._styles:
+            styles = list(self.base_styles)
+            # create_table shades every second data row of the page; pages
+            # starting on an odd row shift the stripes to keep them continuous
+            if first_index % 2:
+                for i in range(1, count + 1):
+                    styles.append(('BACKGROUND', (0, i), (-1, i),
+                                   manual.TABLE_ROW_ALT if i % 2 else white))
+            for index in range(first_index, min(first_index + count, len(PODIUM_COLORS))):
+                row = index - first_index + 1
+                styles.append(('BACKGROUND', (0, row), (-1, row), PODIUM_COLORS[index]))
+                styles.append(('TEXTCOLOR', (0, row), (-1, row), HexColor('#000000')))
+            self._styles[key] = styles
+        return self._styles[key]
+
+    def table(self, rows, first_index):
+        """Page table for `rows`, the first of which is row `first_index` overall"""
+        data = [self.headers] + [self.cells(row) for row in rows]
+        return manual.create_table(data, self.widths,
+                                   extra_styles=self.page_styles(first_index, len(rows)))
+
+
+class LeaderboardRenderer:
+    """Draws pages straight on a canvas, one page table at a time"""
+
+    def __init__(self, output, header):
+        self.tournament = header.get('tournament', {})
+        self.tenant = header.get('tenant', {})
+        self.organizer = header.get('organizerName') or "-"
+        self.printed_at = datetime.now()
+
+        manual.apply_branding({
+            'name': self.tenant.get('name'),
+            'primaryColor': self.tenant.get('primaryColor') or DEFAULT_PRIMARY,
+        })
+        self.logo = self.load_logo(self.tenant)
+
+        self.canvas = Canvas(output, pagesize=PAGE_SIZE, pageCompression=1)
+        self.canvas.setTitle(f"Classifica Ufficiale - {self.tournament.get('name', '')}")
+        self.canvas.setAuthor(self.tenant.get('name') or "TournamentMaster")
+        self.canvas.setSubject("Classifica Torneo di Pesca FIPSAS")
+        self.frame_width = PAGE_SIZE[0] - 2 * MARGIN_X
+        self.pages = 0
+        self.rows = 0
+
+    @staticmethod
+    def load_logo(tenant):
+        """Logo as base64 (logoData) or local path (logo); URLs are not fetched"""
+        try:
+            if tenant.get('logoData'):
+                return ImageReader(io.BytesIO(base64.b64decode(tenant['logoData'])))
+            logo = tenant.get('logo')
+            if logo and '://' not in logo:
+                return ImageReader(logo)
+        except Exception as e:
+            print(f"Warning: logo not usable: {e}", file=sys.stderr)
+        return None
+
+    def draw_banner(self, title):
+        """Coloured banner with association name, title and tournament details; returns the y below it"""
+        c = self.canvas
+        top = TABLE_TOP
+        c.setFillColor(manual.PRIMARY_BLUE)
+        c.rect(MARGIN_X, top - BANNER_HEIGHT, self.frame_width, BANNER_HEIGHT, stroke=0, fill=1)
+
+        text_x = MARGIN_X + 0.5*cm
+        if self.logo is not None:
+            size = BANNER_HEIGHT - 0.3*cm
+            c.drawImage(self.logo, MARGIN_X + 0.15*cm, top - BANNER_HEIGHT + 0.15*cm, size, size,
+                        preserveAspectRatio=True, mask='auto')
+            text_x = MARGIN_X + size + 0.5*cm
+        c.setFillColor(white)
+        c.setFont(manual.FONT_BOLD, 16)
+        c.drawString(text_x, top - BANNER_HEIGHT / 2 - 6, (self.tenant.get('name') or "").upper())
+
+        y = top - BANNER_HEIGHT - 0.8*cm
+        c.setFillColor(HexColor('#000000'))
+        c.setFont(manual.FONT_BOLD, 18)
+        c.drawCentredString(PAGE_SIZE[0] / 2, y, title)
+        y -= 0.65*cm
+        c.setFillColor(manual.PRIMARY_BLUE)
+        c.setFont(manual.FONT_REGULAR, 13)
+        c.drawCentredString(PAGE_SIZE[0] / 2, y, self.tournament.get('name') or "")
+        y -= 0.5*cm
+        c.setFillColor(HexColor('#666666'))
+        c.setFont(manual.FONT_REGULAR, 9)
+        details = (f"{self.tournament.get('discipline', '')} - {self.tournament.get('location', '')} | "
+                   f"{format_date(self.tournament.get('startDate'))} - "
+                   f"{format_date(self.tournament.get('endDate'))}")
+        c.drawCentredString(PAGE_SIZE[0] / 2, y, details)
+        y -= 0.3*cm
+        c.setStrokeColor(manual.PRIMARY_BLUE)
+        c.setLineWidth(2)
+        c.line(MARGIN_X, y, PAGE_SIZE[0] - MARGIN_X, y)
+        return y - 0.3*cm
+
+    def draw_footer(self):
+        c = self.canvas
+        y = TABLE_BOTTOM - 0.6*cm
+        c.setFillColor(HexColor('#666666'))
+        c.setFont(manual.FONT_REGULAR, 8)
+        printed = self.printed_at.strftime('%H:%M')
+        c.drawString(MARGIN_X, y, f"Stampato il: {format_date(self.printed_at.isoformat())} {printed}")
+        c.drawString(MARGIN_X + 7*cm, y, f"Direttore di Gara: {self.organizer}   Firma: _______________")
+        manual.add_header_footer(c, None, HEADER_TITLE)
+
+    def finish_page(self):
+        self.draw_footer()
+        self.canvas.showPage()
+        self.pages += 1
+
+    def draw_table(self, title, columns, rows):
+        """
+        Draw `rows` (an iterator) under a banner, continuing on new pages with
+        the column header repeated. Returns (rows drawn, y below the last table).
+        """
+        layout = TableLayout(columns, self.frame_width)
+        rows = iter(rows)
+        y = self.draw_banner(title)
+        count = 0
+        # One row is read ahead so that no page is started for nothing
+        pending = next(rows, None)
+        while True:
+            page_rows = []
+            if pending is not None:
+                page_rows = [pending] + list(islice(rows, layout.rows_per_page(y - TABLE_BOTTOM) - 1))
+            table = layout.table(page_rows, count)
+            _, height = table.wrap(self.frame_width, y - TABLE_BOTTOM)
+            table.drawOn(self.canvas, MARGIN_X, y - height)
+            count += len(page_rows)
+            y -= height
+            pending = next(rows, None)
+            if pending is None:
+                break
+            self.finish_page()
+            y = TABLE_TOP
+        self.rows += count
+        return count, y
+
+    def draw_summary(self, y, participants, catches, weight):
+        if y - 1*cm < TABLE_BOTTOM:
+            self.finish_page()
+            y = TABLE_TOP
+        self.canvas.setFillColor(HexColor('#000000'))
+        self.canvas.setFont(manual.FONT_BOLD, 10)
+        self.canvas.drawCentredString(
+            PAGE_SIZE[0] / 2, y - 0.7*cm,
+            f"Partecipanti: {participants}  |  Catture: {catches}  |  Peso totale: {weight:.2f} kg")
+
+    def render(self, leaderboard, catches):
+        totals = {'participants': 0, 'catches': 0, 'weight': 0.0}
+
+        def counted(rows):
+            for row in rows:
+                totals['participants'] += 1
+                totals['catches'] += int(row.get('catchCount') or 0)
+                totals['weight'] += float(row.get('totalWeight') or 0)
+                yield row
+
+        _, y = self.draw_table("CLASSIFICA UFFICIALE", LEADERBOARD_COLUMNS, counted(leaderboard))
+        self.draw_summary(y, totals['participants'], totals['catches'], totals['weight'])
+        self.finish_page()
+
+        first = next(catches, None)
+        if first is not None:
+            self.draw_table("DETTAGLIO CATTURE", CATCH_COLUMNS, _chain_first(first, catches))
+            self.finish_page()
+
+        self.canvas.save()
+        return self.pages, self.rows
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+def read_rows(lines):
+    """
+    Split the JSON lines input into (header, leaderboard rows, catch rows).
+    Both row iterators are lazy; leaderboard rows must precede catch rows.
+    """
+    records = (json.loads(line) for line in lines if line.strip())
+    header = next(records, None)
+    if header is None or 'table' in header:
+        raise ValueError("The first line must be the tournament header")
+    tables = groupby(records, key=lambda record: record.get('table'))
+    current = [next(tables, (None, iter(())))]
+
+    def table(name):
+        while current[0][0] is not None:
+            group, rows = current[0]
+            if group not in ('leaderboard', 'catches'):
+                raise ValueError(f"Unknown table: {group}")
+            if group != name:
+                return
+            yield from rows
+            current[0] = next(tables, (None, iter(())))
+
+    return header, table('leaderboard'), table('catches')
+
+def render_leaderboard(header, leaderboard, catches, output):
+    """
+    Render the leaderboard PDF to `output` (path or binary file object).
+    `leaderboard` and `catches` are iterables of row dicts, consumed lazily.
+    Returns (pages, rows).
+    """
+    renderer = LeaderboardRenderer(output, header)
+    return renderer.render(iter(leaderboard), iter(catches))
+
+def render_stream(lines, output):
+    """Render from an iterable of JSON lines (the out-of-process entry point)"""
+    header, leaderboard, catches = read_rows(lines)
+    return render_leaderboard(header, leaderboard, catches, output)
+
+def main():
+    parser = argparse.ArgumentParser(description="TournamentMaster - Leaderboard PDF Renderer")
+    parser.add_argument('--input', default='-',
+                        help="JSON lines with header and rows, '-' for stdin (default)")
+    parser.add_argument('--output', default='-',
+                        help="output PDF, '-' for stdout (default)")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    target = sys.stdout.buffer if args.output == '-' else args.output
+    try:
+        pages, rows = render_stream(source, target)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if args.output == '-':
+        sys.stdout.buffer.flush()
+    print(f"Leaderboard PDF: {rows} rows, {pages} pages ({time.monotonic() - started:.2f}s)",
+          file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
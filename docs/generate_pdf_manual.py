@@ -3,13 +3,47 @@
 """
 TournamentMaster - Admin Manual PDF Generator
 Generates professional PDF with screenshots
+
+Each section of the manual is rendered to its own PDF in a process pool and
+cached under docs/.pdf_cache, keyed by a hash of the section's inputs
+(source, styles, screenshot bytes). Only changed sections are re-rendered;
+the cached pieces are then merged and stamped with header/footer.
+
+Usage:
+    python docs/generate_pdf_manual.py [--workers N] [--no-cache] [--single-pass]
+                                       [--dpi N] [--image-format png|quantize|jpeg]
+
+Screenshots are embedded at --dpi for their drawn size (see pdf_assets.py)
+rather than at their original resolution.
+
+Batch mode renders one branded manual per association:
+    python docs/generate_pdf_manual.py --tenants tenants.json [--output-dir DIR]
+
+tenants.json is a list of Tenant branding profiles (same field names as the
+Prisma model): slug, name, logo (local image path), primaryColor, secondaryColor.
+All sections of all tenants share one process pool, and screenshots, fonts and
+styles are prepared once per process instead of once per tenant.
+
+--trace FILE records timing spans for sections, screenshots, tables, doc.build
+and the merge phases (pool workers included), writes them as a Chrome trace
+and prints a summary table (see pdf_trace.py).
 """
 
+import argparse
+import hashlib
+import inspect
+import io
+import json
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import reportlab
+from pypdf import PdfReader, PdfWriter
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm, mm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.colors import HexColor, white, black
+from reportlab.lib.colors import Color, HexColor, white, black
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle,
@@ -17,6 +51,15 @@ from reportlab.platypus import (
 )
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+import pdf_assets
+import pdf_trace
+from pdf_assets import (
+    apply_fonts, configure_screenshots, font_fingerprint, image_size, prepare_screenshot,
+    prime_font_subsets, register_fonts, screenshot_settings
+)
+from pdf_trace import span, traced
 
 # Colors - Professional blue theme
 PRIMARY_BLUE = HexColor('#1e40af')
@@ -28,14 +71,37 @@ TABLE_ROW_ALT = HexColor('#f0f9ff')
 TEXT_GRAY = HexColor('#374151')
 BORDER_COLOR = HexColor('#93c5fd')
 
+# Branding - set per association by apply_branding() in batch mode
+BRAND_NAME = None
+BRAND_LOGO = None
+DEFAULT_PALETTE = {
+    'PRIMARY_BLUE': PRIMARY_BLUE,
+    'LIGHT_BLUE': LIGHT_BLUE,
+    'DARK_BLUE': DARK_BLUE,
+    'HEADER_BG': HEADER_BG,
+    'TABLE_HEADER_BG': TABLE_HEADER_BG,
+    'TABLE_ROW_ALT': TABLE_ROW_ALT,
+    'BORDER_COLOR': BORDER_COLOR,
+}
+
+# Fonts - TTF family registered once per process (see pdf_assets.py)
+FONTS = register_fonts()
+FONT_REGULAR = FONTS['regular']
+FONT_BOLD = FONTS['bold']
+
 # Paths
 DOCS_DIR = os.path.dirname(os.path.abspath(__file__))
 SCREENSHOTS_DIR = os.path.join(DOCS_DIR, 'screenshots')
 OUTPUT_PDF = os.path.join(DOCS_DIR, 'MANUALE_AMMINISTRATORE_ASSOCIAZIONE.pdf')
+SECTION_CACHE_DIR = os.path.join(pdf_assets.PDF_CACHE_DIR, 'sections')
+TENANT_OUTPUT_DIR = os.path.join(DOCS_DIR, 'manuali')
+
+# Screenshot file names referenced in a section's source
+SCREENSHOT_REF_RE = re.compile(r"['\"]([\w.-]+\.(?:png|jpe?g))['\"]")
 
 def create_styles():
     """Create custom paragraph styles"""
-    styles = getSampleStyleSheet()
+    styles = apply_fonts(getSampleStyleSheet())
 
     # Title style
     styles.add(ParagraphStyle(
@@ -45,7 +111,7 @@ def create_styles():
         textColor=PRIMARY_BLUE,
         spaceAfter=30,
         alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
+        fontName=FONT_BOLD
     ))
 
     # Subtitle
@@ -66,7 +132,7 @@ def create_styles():
         textColor=PRIMARY_BLUE,
         spaceBefore=25,
         spaceAfter=15,
-        fontName='Helvetica-Bold',
+        fontName=FONT_BOLD,
         borderWidth=0,
         borderPadding=0
     ))
@@ -79,7 +145,7 @@ def create_styles():
         textColor=DARK_BLUE,
         spaceBefore=15,
         spaceAfter=8,
-        fontName='Helvetica-Bold'
+        fontName=FONT_BOLD
     ))
 
     # Body text
@@ -132,20 +198,36 @@ def create_styles():
 
     return styles
 
+_styles_cache = {}
+
+def get_styles():
+    """create_styles() memoised per palette, shared by all sections of a process"""
+    key = branding_state()
+    if key not in _styles_cache:
+        _styles_cache[key] = create_styles()
+    return _styles_cache[key]
+
+@traced('add_screenshot', 'image')
 def add_screenshot(story, filename, caption, styles, max_width=14*cm, max_height=9*cm):
     """Add screenshot with caption"""
     img_path = os.path.join(SCREENSHOTS_DIR, filename)
     if os.path.exists(img_path):
         try:
-            img = Image(img_path)
+            # Dimensions come from the file header; pixels are decoded at draw time
+            image_width, image_height = image_size(img_path)
+            draw_width, draw_height = image_width, image_height
             # Scale to fit
-            aspect = img.imageWidth / img.imageHeight
-            if img.imageWidth > max_width:
-                img.drawWidth = max_width
-                img.drawHeight = max_width / aspect
-            if img.drawHeight > max_height:
-                img.drawHeight = max_height
-                img.drawWidth = max_height * aspect
+            aspect = image_width / image_height
+            if image_width > max_width:
+                draw_width = max_width
+                draw_height = max_width / aspect
+            if draw_height > max_height:
+                draw_height = max_height
+                draw_width = max_height * aspect
+
+            # Embed a copy resampled for the drawn size instead of the original
+            prepared = prepare_screenshot(img_path, draw_width, draw_height)
+            img = Image(prepared, width=draw_width, height=draw_height, lazy=2)
 
             # Center the image
             img.hAlign = 'CENTER'
@@ -159,15 +241,17 @@ def add_screenshot(story, filename, caption, styles, max_width=14*cm, max_height
     else:
         print(f"Warning: Screenshot not found: {img_path}")
 
-def create_table(data, col_widths=None, header=True):
-    """Create styled table"""
+@traced('create_table', 'table')
+def create_table(data, col_widths=None, header=True, extra_styles=None):
+    """Create styled table (extra_styles: TableStyle commands applied last)"""
     if col_widths is None:
         col_widths = [4*cm] * len(data[0])
 
     table = Table(data, colWidths=col_widths)
 
     style_commands = [
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 0), (-1, -1), FONT_REGULAR),
+        ('FONTNAME', (0, 0), (-1, 0), FONT_BOLD),
         ('FONTSIZE', (0, 0), (-1, -1), 9),
         ('TEXTCOLOR', (0, 0), (-1, -1), TEXT_GRAY),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -189,6 +273,9 @@ def create_table(data, col_widths=None, header=True):
             if i % 2 == 0:
                 style_commands.append(('BACKGROUND', (0, i), (-1, i), TABLE_ROW_ALT))
 
+    if extra_styles:
+        style_commands.extend(extra_styles)
+
     table.setStyle(TableStyle(style_commands))
     return table
 
@@ -211,17 +298,16 @@ def add_note_box(story, text, styles, note_type='info'):
     story.append(table)
     story.append(Spacer(1, 10))
 
-def build_document():
-    """Build the complete PDF document"""
-    styles = create_styles()
-    story = []
-
-    # =====================================================================
-    # COVER PAGE
-    # =====================================================================
-    story.append(Spacer(1, 3*cm))
+def section_cover(story, styles):
+    """Copertina"""
+    if BRAND_LOGO and os.path.exists(BRAND_LOGO):
+        logo_width, logo_height = image_size(BRAND_LOGO)
+        scale = min(4*cm / logo_width, 3*cm / logo_height)
+        story.append(Image(BRAND_LOGO, width=logo_width * scale, height=logo_height * scale, lazy=2))
+    else:
+        story.append(Spacer(1, 3*cm))
     story.append(Paragraph("MANUALE AMMINISTRATORE", styles['CustomTitle']))
-    story.append(Paragraph("ASSOCIAZIONE", styles['CustomTitle']))
+    story.append(Paragraph(BRAND_NAME or "ASSOCIAZIONE", styles['CustomTitle']))
     story.append(Spacer(1, 1*cm))
     story.append(Paragraph("TournamentMaster - Guida Operativa Completa", styles['Subtitle']))
     story.append(Spacer(1, 2*cm))
@@ -234,7 +320,8 @@ def build_document():
     ]
     cover_table = Table(cover_data, colWidths=[4*cm, 10*cm])
     cover_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 0), (-1, -1), FONT_REGULAR),
+        ('FONTNAME', (0, 0), (0, -1), FONT_BOLD),
         ('FONTSIZE', (0, 0), (-1, -1), 11),
         ('TEXTCOLOR', (0, 0), (-1, -1), TEXT_GRAY),
         ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
@@ -243,11 +330,9 @@ def build_document():
         ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
     ]))
     story.append(cover_table)
-    story.append(PageBreak())
 
-    # =====================================================================
-    # TABLE OF CONTENTS
-    # =====================================================================
+def section_toc(story, styles):
+    """Indice"""
     story.append(Paragraph("Indice", styles['SectionHeader']))
     story.append(Spacer(1, 10))
 
@@ -269,11 +354,8 @@ def build_document():
     for item in toc_items:
         story.append(Paragraph(f"&bull; {item}", styles['CustomBody']))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 1: PRIMO ACCESSO
-    # =====================================================================
+def section_primo_accesso(story, styles):
+    """1. Primo Accesso"""
     story.append(Paragraph("1. Primo Accesso", styles['SectionHeader']))
 
     story.append(Paragraph("1.1 Accedere alla Piattaforma", styles['SubsectionHeader']))
@@ -303,11 +385,8 @@ def build_document():
         styles['CustomBody']
     ))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 2: DASHBOARD
-    # =====================================================================
+def section_dashboard(story, styles):
+    """2. La Tua Dashboard"""
     story.append(Paragraph("2. La Tua Dashboard", styles['SectionHeader']))
 
     story.append(Paragraph(
@@ -343,11 +422,8 @@ def build_document():
     for item in menu_items:
         story.append(Paragraph(f"&bull; {item}", styles['ListItem']))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 3: GESTIONE TORNEI
-    # =====================================================================
+def section_tornei(story, styles):
+    """3. Gestione Tornei"""
     story.append(Paragraph("3. Gestione Tornei", styles['SectionHeader']))
 
     story.append(Paragraph("3.1 Lista Tornei", styles['SubsectionHeader']))
@@ -394,11 +470,8 @@ def build_document():
     ]
     story.append(create_table(states_data, [4*cm, 5*cm, 6*cm]))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 4: GESTIONE PARTECIPANTI
-    # =====================================================================
+def section_partecipanti(story, styles):
+    """4. Gestione Partecipanti"""
     story.append(Paragraph("4. Gestione Partecipanti", styles['SectionHeader']))
 
     story.append(Paragraph("4.1 Visualizzare gli Iscritti", styles['SubsectionHeader']))
@@ -426,11 +499,8 @@ def build_document():
         styles['CustomBody']
     ))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 5: GESTIONE GIUDICI
-    # =====================================================================
+def section_giudici(story, styles):
+    """5. Gestione Giudici e Staff"""
     story.append(Paragraph("5. Gestione Giudici e Staff", styles['SectionHeader']))
 
     story.append(Paragraph("5.1 Assegnare Giudici al Torneo", styles['SubsectionHeader']))
@@ -461,11 +531,8 @@ def build_document():
         "ispettori con barca assegnata, contatti di emergenza e mappa zone.",
         styles, 'info')
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 6: VALIDAZIONE CATTURE
-    # =====================================================================
+def section_catture(story, styles):
+    """6. Validazione Catture"""
     story.append(Paragraph("6. Validazione Catture", styles['SectionHeader']))
 
     story.append(Paragraph("6.1 Live Dashboard - Catture in Tempo Reale", styles['SubsectionHeader']))
@@ -502,11 +569,8 @@ def build_document():
         styles['CustomBody']
     ))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 7: CLASSIFICHE
-    # =====================================================================
+def section_classifiche(story, styles):
+    """7. Classifiche e Punteggi"""
     story.append(Paragraph("7. Classifiche e Punteggi", styles['SectionHeader']))
 
     story.append(Paragraph("7.1 Classifica Pubblica", styles['SubsectionHeader']))
@@ -535,11 +599,8 @@ def build_document():
         styles['CustomBody']
     ))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 8: IMPORT/EXPORT
-    # =====================================================================
+def section_import_export(story, styles):
+    """8. Import/Export Dati"""
     story.append(Paragraph("8. Import/Export Dati", styles['SectionHeader']))
 
     story.append(Paragraph("8.1 Importare Partecipanti da Excel", styles['SubsectionHeader']))
@@ -563,11 +624,8 @@ def build_document():
     ]
     story.append(create_table(export_data, [4*cm, 5*cm, 6*cm]))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 9: ARCHIVIO
-    # =====================================================================
+def section_archivio(story, styles):
+    """9. Archivio e Statistiche"""
     story.append(Paragraph("9. Archivio e Statistiche", styles['SectionHeader']))
 
     story.append(Paragraph("9.1 Archivio Storico", styles['SubsectionHeader']))
@@ -599,11 +657,8 @@ def build_document():
     for record in records:
         story.append(Paragraph(f"&bull; {record}", styles['ListItem']))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 10: IMPOSTAZIONI
-    # =====================================================================
+def section_impostazioni(story, styles):
+    """10. Impostazioni Associazione"""
     story.append(Paragraph("10. Impostazioni Associazione", styles['SectionHeader']))
 
     story.append(Paragraph("10.1 Gestione Utenti", styles['SubsectionHeader']))
@@ -638,11 +693,8 @@ def build_document():
         styles['CustomBody']
     ))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 11: RISOLUZIONE PROBLEMI
-    # =====================================================================
+def section_problemi(story, styles):
+    """11. Risoluzione Problemi"""
     story.append(Paragraph("11. Risoluzione Problemi", styles['SectionHeader']))
 
     problems = [
@@ -662,11 +714,8 @@ def build_document():
         story.append(Paragraph(f"<b>{title}</b>", styles['SubsectionHeader']))
         story.append(Paragraph(solution, styles['CustomBody']))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # SECTION 12: FAQ
-    # =====================================================================
+def section_faq(story, styles):
+    """12. Domande Frequenti"""
     story.append(Paragraph("12. Domande Frequenti", styles['SectionHeader']))
 
     faqs = [
@@ -683,11 +732,8 @@ def build_document():
         story.append(Paragraph(f"R: {answer}", styles['ListItem']))
         story.append(Spacer(1, 5))
 
-    story.append(PageBreak())
-
-    # =====================================================================
-    # GLOSSARY & CONTACTS
-    # =====================================================================
+def section_glossario(story, styles):
+    """Glossario e Contatti"""
     story.append(Paragraph("Glossario", styles['SectionHeader']))
 
     glossary_data = [
@@ -718,37 +764,339 @@ def build_document():
         styles['Caption']
     ))
 
+SECTIONS = [
+    ('cover', section_cover),
+    ('toc', section_toc),
+    ('primo_accesso', section_primo_accesso),
+    ('dashboard', section_dashboard),
+    ('tornei', section_tornei),
+    ('partecipanti', section_partecipanti),
+    ('giudici', section_giudici),
+    ('catture', section_catture),
+    ('classifiche', section_classifiche),
+    ('import_export', section_import_export),
+    ('archivio', section_archivio),
+    ('impostazioni', section_impostazioni),
+    ('problemi', section_problemi),
+    ('faq', section_faq),
+    ('glossario', section_glossario),
+]
+
+def build_document():
+    """Build the complete PDF document"""
+    styles = create_styles()
+    story = []
+
+    for i, (name, builder) in enumerate(SECTIONS):
+        if i:
+            story.append(PageBreak())
+        with span(f"section:{name}", 'section'):
+            builder(story, styles)
+
     return story
 
-def add_header_footer(canvas, doc):
-    """Add header and footer to each page"""
+def add_header_footer(canvas, doc, title="Manuale Amministratore"):
+    """Add header and footer to each page (any page size)"""
+    page_width, page_height = canvas._pagesize
     canvas.saveState()
 
     # Header line
     canvas.setStrokeColor(PRIMARY_BLUE)
     canvas.setLineWidth(2)
-    canvas.line(1.5*cm, A4[1] - 1.2*cm, A4[0] - 1.5*cm, A4[1] - 1.2*cm)
+    canvas.line(1.5*cm, page_height - 1.2*cm, page_width - 1.5*cm, page_height - 1.2*cm)
 
     # Header text
     canvas.setFillColor(PRIMARY_BLUE)
-    canvas.setFont('Helvetica-Bold', 9)
-    canvas.drawString(1.5*cm, A4[1] - 1*cm, "TournamentMaster - Manuale Amministratore")
+    canvas.setFont(FONT_BOLD, 9)
+    canvas.drawString(1.5*cm, page_height - 1*cm, f"{BRAND_NAME or 'TournamentMaster'} - {title}")
 
     # Footer
     canvas.setStrokeColor(BORDER_COLOR)
     canvas.setLineWidth(1)
-    canvas.line(1.5*cm, 1.5*cm, A4[0] - 1.5*cm, 1.5*cm)
+    canvas.line(1.5*cm, 1.5*cm, page_width - 1.5*cm, 1.5*cm)
 
     # Page number
     canvas.setFillColor(TEXT_GRAY)
-    canvas.setFont('Helvetica', 9)
+    canvas.setFont(FONT_REGULAR, 9)
     page_num = canvas.getPageNumber()
-    canvas.drawCentredString(A4[0]/2, 1*cm, f"Pagina {page_num}")
+    canvas.drawCentredString(page_width/2, 1*cm, f"Pagina {page_num}")
 
     canvas.restoreState()
 
+def tint(color, amount):
+    """Mix `color` with white (amount 0 = unchanged, 1 = white)"""
+    return Color(*(c + (1 - c) * amount for c in (color.red, color.green, color.blue)))
+
+def apply_branding(profile=None):
+    """
+    Set palette, name and logo from a Tenant branding profile
+    (None restores the default TournamentMaster theme)
+    """
+    global BRAND_NAME, BRAND_LOGO
+    palette = dict(DEFAULT_PALETTE)
+    profile = profile or {}
+    if profile.get('primaryColor'):
+        primary = HexColor(profile['primaryColor'])
+        palette.update(
+            PRIMARY_BLUE=primary,
+            TABLE_HEADER_BG=primary,
+            LIGHT_BLUE=tint(primary, 0.25),
+            BORDER_COLOR=tint(primary, 0.55),
+            HEADER_BG=tint(primary, 0.85),
+            TABLE_ROW_ALT=tint(primary, 0.94),
+        )
+    if profile.get('secondaryColor'):
+        palette['DARK_BLUE'] = HexColor(profile['secondaryColor'])
+    globals().update(palette)
+
+    BRAND_NAME = profile.get('name')
+    BRAND_LOGO = profile.get('logo')
+    if BRAND_LOGO and not os.path.exists(BRAND_LOGO):
+        print(f"Warning: logo not found for {BRAND_NAME}: {BRAND_LOGO}")
+        BRAND_LOGO = None
+
+def branding_state():
+    """Current palette, name and logo as a hashable tuple"""
+    colors = tuple(globals()[name].hexval() for name in sorted(DEFAULT_PALETTE))
+    return colors + (BRAND_NAME, BRAND_LOGO)
+
+def create_doc(path):
+    """Document template shared by the single-pass and the sectioned build"""
+    return SimpleDocTemplate(
+        path,
+        pagesize=A4,
+        rightMargin=1.5*cm,
+        leftMargin=1.5*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+
+def file_digest(path):
+    """SHA-256 of a file's bytes (a fixed marker if the file is missing)"""
+    if not os.path.exists(path):
+        return b'missing'
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+def section_key(builder):
+    """Hash of everything that affects how a section renders"""
+    digest = hashlib.sha256(reportlab.Version.encode())
+    for func in (create_doc, create_styles, add_screenshot, create_table, add_note_box):
+        digest.update(inspect.getsource(func).encode())
+    digest.update(inspect.getsource(pdf_assets).encode())
+    digest.update(screenshot_settings().encode())
+    digest.update(font_fingerprint().encode())
+    for name, value in sorted(globals().items()):
+        if isinstance(value, Color):
+            digest.update(f"{name}={value.hexval()}".encode())
+    digest.update(repr((BRAND_NAME, BRAND_LOGO)).encode())
+    if BRAND_LOGO:
+        digest.update(file_digest(BRAND_LOGO))
+
+    source = inspect.getsource(builder)
+    digest.update(source.encode())
+    for filename in sorted(set(SCREENSHOT_REF_RE.findall(source))):
+        digest.update(filename.encode())
+        digest.update(file_digest(os.path.join(SCREENSHOTS_DIR, filename)))
+    return digest.hexdigest()
+
+def section_path(name, key):
+    return os.path.join(SECTION_CACHE_DIR, f"{name}-{key[:16]}.pdf")
+
+def render_section(name, key):
+    """Render one section to its own PDF in the cache (runs in a worker process)"""
+    path = section_path(name, key)
+    builder = dict(SECTIONS)[name]
+
+    story = []
+    with span(f"section:{name}", 'section'):
+        builder(story, get_styles())
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with span('doc.build', section=name):
+        create_doc(tmp_path).build(story, onFirstPage=prime_font_subsets)
+    os.replace(tmp_path, path)
+    pdf_trace.flush()
+    return path
+
+def merge_sections(paths, output_path):
+    """Concatenate the section PDFs and stamp header/footer with page numbers"""
+    writer = PdfWriter()
+    with span('merge:append', 'merge'):
+        for path in paths:
+            writer.append(path)
+
+    with span('merge:stamp', 'merge'):
+        buffer = io.BytesIO()
+        overlay = Canvas(buffer, pagesize=A4)
+        prime_font_subsets(overlay)
+        for _ in writer.pages:
+            add_header_footer(overlay, None)
+            overlay.showPage()
+        overlay.save()
+
+        for page, stamp in zip(writer.pages, PdfReader(buffer).pages):
+            page.merge_page(stamp)
+    # Font subsets primed with the same characters are stored once
+    with span('merge:compress', 'merge'):
+        writer.compress_identical_objects()
+
+    tmp_path = output_path + '.tmp'
+    with span('flush', 'merge'), open(tmp_path, 'wb') as f:
+        writer.write(f)
+    os.replace(tmp_path, output_path)
+
+def prune_section_cache(kept, replace=None):
+    """
+    Record the renderings used by each manual ({owner: paths}) and drop the
+    cached ones that no manual uses any more. The default and the tenant
+    manuals share the cache, so a build only replaces its own owners' lists;
+    with `replace` (an owner prefix) the lists of owners with that prefix
+    missing from `kept` are dropped too, e.g. tenants no longer configured.
+    """
+    for owner, paths in kept.items():
+        with open(os.path.join(SECTION_CACHE_DIR, f"kept-{owner}.json"), 'w', encoding='utf-8') as f:
+            json.dump(sorted(os.path.basename(path) for path in paths), f)
+
+    if replace:
+        current_lists = {f"kept-{owner}.json" for owner in kept}
+        for filename in os.listdir(SECTION_CACHE_DIR):
+            if filename.startswith(f"kept-{replace}") and filename not in current_lists:
+                os.remove(os.path.join(SECTION_CACHE_DIR, filename))
+
+    current = set()
+    for filename in os.listdir(SECTION_CACHE_DIR):
+        if filename.startswith('kept-') and filename.endswith('.json'):
+            with open(os.path.join(SECTION_CACHE_DIR, filename), encoding='utf-8') as f:
+                current.update(json.load(f))
+    for filename in os.listdir(SECTION_CACHE_DIR):
+        if filename.endswith('.pdf') and filename not in current:
+            os.remove(os.path.join(SECTION_CACHE_DIR, filename))
+
+def create_pool(workers=None):
+    """Process pool whose workers use the current screenshot settings"""
+    settings = (pdf_assets.SCREENSHOT_DPI, pdf_assets.SCREENSHOT_FORMAT)
+    return ProcessPoolExecutor(max_workers=workers, initializer=configure_screenshots,
+                               initargs=settings)
+
+def build_sections(output_path=OUTPUT_PDF, workers=None, use_cache=True):
+    """
+    Render changed sections in parallel, reuse cached ones, merge the result.
+    Returns (rendered, cached) section counts.
+    """
+    os.makedirs(SECTION_CACHE_DIR, exist_ok=True)
+    with span('section_keys'):
+        keys = [(name, section_key(builder)) for name, builder in SECTIONS]
+    todo = [(name, key) for name, key in keys
+            if not use_cache or not os.path.exists(section_path(name, key))]
+
+    if todo:
+        with create_pool(workers) as pool:
+            list(pool.map(render_section, *zip(*todo)))
+
+    paths = [section_path(name, key) for name, key in keys]
+    merge_sections(paths, output_path)
+
+    # Drop stale renderings of sections that changed
+    prune_section_cache({'default': paths})
+
+    return len(todo), len(keys) - len(todo)
+
+def load_tenants(path):
+    """Tenant branding profiles from a JSON list (or {"tenants": [...]})"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    tenants = data.get('tenants', []) if isinstance(data, dict) else data
+    for tenant in tenants:
+        if not tenant.get('slug'):
+            raise ValueError(f"Tenant profile without slug: {tenant}")
+    return tenants
+
+def tenant_output_path(tenant, output_dir=TENANT_OUTPUT_DIR):
+    slug = tenant['slug'].upper().replace('-', '_')
+    return os.path.join(output_dir, f"MANUALE_AMMINISTRATORE_{slug}.pdf")
+
+def render_tenant_section(tenant, name, key):
+    """render_section() with the tenant's branding (runs in a worker process)"""
+    apply_branding(tenant)
+    return render_section(name, key)  # flushes the worker's trace spans
+
+def merge_tenant(tenant, paths, output_path):
+    """merge_sections() with the tenant's header/footer (runs in a worker process)"""
+    apply_branding(tenant)
+    merge_sections(paths, output_path)
+    pdf_trace.flush()
+    return output_path
+
+def build_tenants(tenants, output_dir=TENANT_OUTPUT_DIR, workers=None, use_cache=True):
+    """
+    Render one branded manual per tenant. Sections of every tenant go through
+    the same pool, then each manual is merged in the pool as well.
+    Returns (rendered, cached) section counts over all tenants.
+    """
+    os.makedirs(SECTION_CACHE_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Screenshots are preprocessed once here, not by every worker/tenant
+    build_document()
+
+    jobs = []
+    manuals = []
+    for tenant in tenants:
+        apply_branding(tenant)
+        keys = [(name, section_key(builder)) for name, builder in SECTIONS]
+        paths = [section_path(name, key) for name, key in keys]
+        manuals.append((tenant, paths, tenant_output_path(tenant, output_dir)))
+        for name, key in keys:
+            if not use_cache or not os.path.exists(section_path(name, key)):
+                jobs.append((tenant, name, key))
+    apply_branding(None)
+
+    # The same section of two tenants with identical branding is rendered once
+    unique_jobs = list({section_path(name, key): (tenant, name, key)
+                        for tenant, name, key in jobs}.values())
+
+    with create_pool(workers) as pool:
+        if unique_jobs:
+            list(pool.map(render_tenant_section, *zip(*unique_jobs)))
+        for output_path in pool.map(merge_tenant, *zip(*manuals)):
+            print(f"  [OK] {output_path}")
+
+    # Only once every tenant is merged: their sections share the cache.
+    # The tenants file is the full list, so removed tenants release theirs
+    prune_section_cache({f"tenant-{tenant['slug']}": paths for tenant, paths, _ in manuals},
+                        replace='tenant-')
+
+    total = len(manuals) * len(SECTIONS)
+    return len(unique_jobs), total - len(unique_jobs)
+
 def main():
     """Main function to generate PDF"""
+    parser = argparse.ArgumentParser(description="TournamentMaster - Admin Manual PDF Generator")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for section rendering (default: CPU count)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="re-render every section even if cached")
+    parser.add_argument('--dpi', type=int, default=pdf_assets.SCREENSHOT_DPI,
+                        help="resolution of embedded screenshots (default: %(default)s)")
+    parser.add_argument('--image-format', choices=pdf_assets.SCREENSHOT_FORMATS,
+                        default=pdf_assets.SCREENSHOT_FORMAT,
+                        help="screenshot encoding (default: %(default)s)")
+    parser.add_argument('--single-pass', action='store_true',
+                        help="build the whole story with a single doc.build (no cache)")
+    parser.add_argument('--tenants', default=None,
+                        help="JSON file of tenant branding profiles: one manual per tenant")
+    parser.add_argument('--output-dir', default=TENANT_OUTPUT_DIR,
+                        help="output folder for --tenants (default: %(default)s)")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="record timing spans and write a Chrome trace (JSON) to FILE")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="with --trace, also track peak memory per span (tracemalloc, slower)")
+    args = parser.parse_args()
+    configure_screenshots(args.dpi, args.image_format)
+    if args.trace:
+        pdf_trace.enable(memory=args.trace_memory)
+
     print("=" * 60)
     print("TournamentMaster - Admin Manual PDF Generator")
     print("=" * 60)
@@ -777,24 +1125,31 @@ def main():
     # Create PDF
     print("\nGenerating PDF...")
 
-    doc = SimpleDocTemplate(
-        OUTPUT_PDF,
-        pagesize=A4,
-        rightMargin=1.5*cm,
-        leftMargin=1.5*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm
-    )
-
-    story = build_document()
-
     try:
-        doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
+        if args.tenants:
+            tenants = load_tenants(args.tenants)
+            print(f"Tenants: {len(tenants)}")
+            rendered, cached = build_tenants(tenants, args.output_dir, args.workers, not args.no_cache)
+            print(f"Sections: {rendered} rendered, {cached} from cache")
+            print(f"\n[SUCCESS] {len(tenants)} manuals generated in {args.output_dir}")
+            return
+        if args.single_pass:
+            doc = create_doc(OUTPUT_PDF)
+            with span('build_document'):
+                story = build_document()
+            with span('doc.build'):
+                doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
+        else:
+            rendered, cached = build_sections(OUTPUT_PDF, args.workers, not args.no_cache)
+            print(f"Sections: {rendered} rendered, {cached} from cache")
         print(f"\n[SUCCESS] PDF generated: {OUTPUT_PDF}")
         print(f"File size: {os.path.getsize(OUTPUT_PDF) / 1024:.1f} KB")
     except Exception as e:
         print(f"\n[ERROR] Failed to generate PDF: {e}")
         raise
+    finally:
+        if args.trace:
+            pdf_trace.finish(args.trace)
 
 if __name__ == '__main__':
     main()
@@ -11,8 +11,13 @@ from reportlab.lib.units import cm, mm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+import argparse
 import os
 
+import pdf_trace
+from pdf_assets import apply_fonts, image_size, prepare_screenshot, register_fonts
+from pdf_trace import Phases, span, traced
+
 # Colors
 PRIMARY = HexColor('#2563eb')
 PRIMARY_DARK = HexColor('#1d4ed8')
@@ -23,6 +28,10 @@ SUCCESS = HexColor('#22c55e')
 WARNING = HexColor('#f59e0b')
 DANGER = HexColor('#ef4444')
 
+# Fonts - TTF family registered once per process (see pdf_assets.py)
+FONTS = register_fonts()
+FONT_BOLD = FONTS['bold']
+
 # Paths
 DOCS_DIR = os.path.dirname(os.path.abspath(__file__))
 SCREENSHOTS_DIR = os.path.join(DOCS_DIR, 'screenshots')
@@ -30,7 +39,7 @@ OUTPUT_PDF = os.path.join(DOCS_DIR, 'MANUALE_AMMINISTRATORE_ASSOCIAZIONE.pdf')
 
 def create_styles():
     """Create custom paragraph styles"""
-    styles = getSampleStyleSheet()
+    styles = apply_fonts(getSampleStyleSheet())
 
     # Title style
     styles.add(ParagraphStyle(
@@ -40,7 +49,7 @@ def create_styles():
         textColor=PRIMARY,
         spaceAfter=12,
         alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
+        fontName=FONT_BOLD
     ))
 
     # Subtitle style
@@ -61,7 +70,7 @@ def create_styles():
         textColor=PRIMARY,
         spaceBefore=30,
         spaceAfter=15,
-        fontName='Helvetica-Bold',
+        fontName=FONT_BOLD,
         borderColor=PRIMARY,
         borderWidth=2,
         borderPadding=5
@@ -75,7 +84,7 @@ def create_styles():
         textColor=PRIMARY_DARK,
         spaceBefore=20,
         spaceAfter=10,
-        fontName='Helvetica-Bold'
+        fontName=FONT_BOLD
     ))
 
     # Body text
@@ -140,22 +149,28 @@ def create_styles():
 
     return styles
 
+@traced('add_screenshot', 'image')
 def add_screenshot(story, filename, caption, styles, max_width=14*cm):
     """Add a screenshot with caption to the story"""
     img_path = os.path.join(SCREENSHOTS_DIR, filename)
     if os.path.exists(img_path):
         try:
-            img = Image(img_path)
+            # Dimensions come from the file header; pixels are decoded at draw time
+            image_width, image_height = image_size(img_path)
             # Scale to fit width while maintaining aspect ratio
-            aspect = img.imageHeight / img.imageWidth
-            img.drawWidth = max_width
-            img.drawHeight = max_width * aspect
+            aspect = image_height / image_width
+            draw_width = max_width
+            draw_height = max_width * aspect
 
             # Limit max height
             max_height = 10*cm
-            if img.drawHeight > max_height:
-                img.drawHeight = max_height
-                img.drawWidth = max_height / aspect
+            if draw_height > max_height:
+                draw_height = max_height
+                draw_width = max_height / aspect
+
+            # Embed a copy resampled for the drawn size instead of the original
+            prepared = prepare_screenshot(img_path, draw_width, draw_height)
+            img = Image(prepared, width=draw_width, height=draw_height, lazy=2)
 
             story.append(Spacer(1, 10))
             story.append(img)
@@ -178,8 +193,10 @@ def build_pdf():
 
     styles = create_styles()
     story = []
+    phases = Phases()
 
     # ===== COVER PAGE =====
+    phases.start('section:cover_page')
     story.append(Spacer(1, 3*cm))
     story.append(Paragraph("MANUALE AMMINISTRATORE", styles['MainTitle']))
     story.append(Paragraph("ASSOCIAZIONE", styles['MainTitle']))
@@ -190,6 +207,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== TABLE OF CONTENTS =====
+    phases.start('section:table_of_contents')
     story.append(Paragraph("Indice", styles['SectionHeader']))
     toc_items = [
         "1. Accesso e Autenticazione",
@@ -208,6 +226,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 1: LOGIN =====
+    phases.start('section:login')
     story.append(Paragraph("1. Accesso e Autenticazione", styles['SectionHeader']))
     story.append(Paragraph(
         "Per accedere alla piattaforma TournamentMaster, navigare all'indirizzo web fornito "
@@ -234,6 +253,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 2: DASHBOARD =====
+    phases.start('section:dashboard')
     story.append(Paragraph("2. Dashboard Principale", styles['SectionHeader']))
     story.append(Paragraph(
         "La dashboard fornisce una panoramica completa dello stato dell'associazione, "
@@ -255,6 +275,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 3: TOURNAMENTS =====
+    phases.start('section:tournaments')
     story.append(Paragraph("3. Gestione Tornei", styles['SectionHeader']))
     story.append(Paragraph(
         "La sezione tornei permette di creare, configurare e gestire tutti gli eventi "
@@ -279,6 +300,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 4: PARTICIPANTS =====
+    phases.start('section:participants')
     story.append(Paragraph("4. Gestione Partecipanti", styles['SectionHeader']))
     story.append(Paragraph(
         "Gestione completa degli iscritti ai tornei con possibilita di import massivo, "
@@ -300,6 +322,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 5: JUDGES =====
+    phases.start('section:judges')
     story.append(Paragraph("5. Gestione Giudici", styles['SectionHeader']))
     story.append(Paragraph(
         "Configurazione del team giudici per ogni torneo, con assegnazione zone "
@@ -317,6 +340,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 6: CATCHES =====
+    phases.start('section:catches')
     story.append(Paragraph("6. Validazione Catture", styles['SectionHeader']))
     story.append(Paragraph(
         "Sistema di validazione catture in tempo reale con supporto foto, "
@@ -338,6 +362,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 7: LEADERBOARD =====
+    phases.start('section:leaderboard')
     story.append(Paragraph("7. Classifiche e Punteggi", styles['SectionHeader']))
     story.append(Paragraph(
         "Classifiche in tempo reale con calcolo automatico dei punteggi "
@@ -359,6 +384,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 8: REPORTS =====
+    phases.start('section:reports')
     story.append(Paragraph("8. Report e Statistiche", styles['SectionHeader']))
     story.append(Paragraph(
         "Generazione automatica di report dettagliati per analisi performance, "
@@ -379,6 +405,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 9: ARCHIVE =====
+    phases.start('section:archive')
     story.append(Paragraph("9. Archivio Storico", styles['SectionHeader']))
     story.append(Paragraph(
         "Accesso completo allo storico di tutti i tornei passati, "
@@ -400,6 +427,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== SECTION 10: ASSOCIATION =====
+    phases.start('section:association')
     story.append(Paragraph("10. Gestione Associazione", styles['SectionHeader']))
     story.append(Paragraph(
         "Configurazione generale dell'associazione, gestione utenti "
@@ -429,6 +457,7 @@ def build_pdf():
     story.append(PageBreak())
 
     # ===== APPENDIX =====
+    phases.start('section:appendix')
     story.append(Paragraph("Appendice: Supporto e Contatti", styles['SectionHeader']))
     story.append(Paragraph(
         "Per assistenza tecnica o domande sull'utilizzo della piattaforma:",
@@ -442,14 +471,32 @@ def build_pdf():
     for s in support_info:
         story.append(Paragraph(f"- {s}", styles['BulletItem']))
 
+    phases.end()
+
     # Build PDF
     try:
-        doc.build(story)
+        with span('doc.build'):
+            doc.build(story)
         print(f"PDF generated successfully: {OUTPUT_PDF}")
         return True
     except Exception as e:
         print(f"Error generating PDF: {e}")
         return False
 
+def main():
+    parser = argparse.ArgumentParser(description="TournamentMaster - PDF Manual with Screenshots")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="record timing spans and write a Chrome trace (JSON) to FILE")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="with --trace, also track peak memory per span (tracemalloc, slower)")
+    args = parser.parse_args()
+    if args.trace:
+        pdf_trace.enable(memory=args.trace_memory)
+    try:
+        build_pdf()
+    finally:
+        if args.trace:
+            pdf_trace.finish(args.trace)
+
 if __name__ == '__main__':
-    build_pdf()
+    main()
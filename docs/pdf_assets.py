@@ -0,0 +1,289 @@
+"""
+Shared assets for the TournamentMaster PDF generators
+Screenshot preprocessing: resample to the DPI of the box the image is drawn
+in and recompress, caching the result under docs/.pdf_cache/screenshots
+Image metadata: dimensions read from PNG/JPEG headers without decoding
+Fonts: a TTF family registered once per process; reportlab embeds only the
+glyphs a document actually uses (subset), so the files are never embedded whole.
+Documents built from separately rendered pieces prime the subsets with a
+shared character set so the embedded subsets are identical and can be merged.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+
+import reportlab
+from PIL import Image as PILImage
+from reportlab.lib.fonts import addMapping
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from pdf_trace import span
+
+DOCS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Root of the build caches; PDF_CACHE_DIR in the environment moves it (also
+# for pool workers, which may re-import this module)
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR') or os.path.join(DOCS_DIR, '.pdf_cache')
+SCREENSHOT_CACHE_DIR = os.path.join(PDF_CACHE_DIR, 'screenshots')
+
+# Resolution of embedded screenshots and output format (resampled PNGs of UI
+# screenshots tend to grow, so the default is the palette PNG):
+#   'png'      lossless, resampled only
+#   'quantize' 256-colour palette PNG (UI screenshots compress very well)
+#   'jpeg'     JPEG at SCREENSHOT_JPEG_QUALITY
+SCREENSHOT_DPI = 150
+SCREENSHOT_FORMAT = 'quantize'
+SCREENSHOT_JPEG_QUALITY = 85
+SCREENSHOT_FORMATS = ('png', 'quantize', 'jpeg')
+
+POINTS_PER_INCH = 72.0
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG start-of-frame markers (C4, C8 and CC are not frames)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Font family used by the manuals; the first candidate whose regular and bold
+# files are found wins (docs/fonts first, then system fonts, then the Vera
+# fonts shipped with reportlab). Missing italics fall back to the upright face.
+FONT_FAMILY = 'ManualSans'
+FONT_VARIANTS = ('regular', 'bold', 'italic', 'bold_italic')
+FONT_CANDIDATES = [
+    ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf', 'DejaVuSans-Oblique.ttf', 'DejaVuSans-BoldOblique.ttf'),
+    ('LiberationSans-Regular.ttf', 'LiberationSans-Bold.ttf',
+     'LiberationSans-Italic.ttf', 'LiberationSans-BoldItalic.ttf'),
+    ('arial.ttf', 'arialbd.ttf', 'ariali.ttf', 'arialbi.ttf'),
+    ('Vera.ttf', 'VeraBd.ttf', 'VeraIt.ttf', 'VeraBI.ttf'),
+]
+FONT_DIRS = [
+    os.path.join(DOCS_DIR, 'fonts'),
+    os.path.join(os.environ.get('WINDIR', r'C:\Windows'), 'Fonts'),
+    '/usr/share/fonts',
+    '/Library/Fonts',
+    os.path.join(os.path.dirname(reportlab.__file__), 'fonts'),
+]
+# Built-in Type 1 fonts used by getSampleStyleSheet() and their replacement
+BUILTIN_FONTS = {
+    'Helvetica': 'regular',
+    'Helvetica-Bold': 'bold',
+    'Helvetica-Oblique': 'italic',
+    'Helvetica-BoldOblique': 'bold_italic',
+}
+
+# Characters whose subset codes are assigned up front, in this order, in every
+# primed document: pieces rendered separately then embed identical subsets
+FONT_CHARSET = (
+    ''.join(chr(code) for code in range(32, 127))
+    + 'àèéìòùÀÈÉÌÒÙáíóú'
+    + '\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u2022\u20ac\u2192\u00b0'
+)
+PRIMED_VARIANTS = ('regular', 'bold')
+
+_fonts = None
+_font_files = {}
+
+# (path, mtime, size) -> value, per process
+_size_cache = {}
+_digest_cache = {}
+_cache_lock = threading.Lock()
+
+
+def configure_screenshots(dpi=None, fmt=None):
+    """Override DPI/format (also used as process pool initializer)"""
+    global SCREENSHOT_DPI, SCREENSHOT_FORMAT
+    if dpi is not None:
+        SCREENSHOT_DPI = dpi
+    if fmt is not None:
+        if fmt not in SCREENSHOT_FORMATS:
+            raise ValueError(f"Unknown screenshot format: {fmt}")
+        SCREENSHOT_FORMAT = fmt
+
+def screenshot_settings():
+    """Current settings, as a string usable in cache keys"""
+    return f"{SCREENSHOT_DPI}dpi-{SCREENSHOT_FORMAT}-q{SCREENSHOT_JPEG_QUALITY}"
+
+def file_signature(path):
+    """Cache key that changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def _cached(cache, path, compute):
+    key = file_signature(path)
+    with _cache_lock:
+        if key in cache:
+            return cache[key]
+    value = compute(path)
+    with _cache_lock:
+        cache[key] = value
+    return value
+
+def _read_png_size(f):
+    header = f.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', header[16:24])
+
+def _read_jpeg_size(f):
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # markers without a length field
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def _probe_size(path):
+    with open(path, 'rb') as f:
+        size = _read_png_size(f)
+        if size is None:
+            f.seek(0)
+            size = _read_jpeg_size(f)
+    if size is None:
+        # Other formats: PIL only parses the header on open()
+        with PILImage.open(path) as img:
+            size = img.size
+    return size
+
+def image_size(path):
+    """(width, height) in pixels from the file header, cached per (path, mtime, size)"""
+    return _cached(_size_cache, path, _probe_size)
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_digest(path):
+    """SHA-256 of the file, cached per (path, mtime, size)"""
+    return _cached(_digest_cache, path, _sha256)
+
+def target_pixels(draw_width, draw_height, dpi=None):
+    """Pixel size needed to draw a box of draw_width x draw_height points at dpi"""
+    dpi = dpi or SCREENSHOT_DPI
+    return (max(1, round(draw_width / POINTS_PER_INCH * dpi)),
+            max(1, round(draw_height / POINTS_PER_INCH * dpi)))
+
+def prepare_screenshot(path, draw_width, draw_height):
+    """
+    Return the path of a copy of `path` resampled for a draw_width x draw_height
+    (points) box at SCREENSHOT_DPI and recompressed as SCREENSHOT_FORMAT.
+    The copy is cached, keyed on the source hash, target size and settings.
+    Images already smaller than the target are only recompressed.
+    """
+    width, height = target_pixels(draw_width, draw_height)
+    ext = 'jpg' if SCREENSHOT_FORMAT == 'jpeg' else 'png'
+    key = f"{source_digest(path)[:16]}-{width}x{height}-{screenshot_settings()}"
+    name = os.path.splitext(os.path.basename(path))[0]
+    cached = os.path.join(SCREENSHOT_CACHE_DIR, f"{name}-{key}.{ext}")
+    if os.path.exists(cached):
+        return cached
+
+    os.makedirs(SCREENSHOT_CACHE_DIR, exist_ok=True)
+    with span('prepare_screenshot', 'image', source=os.path.basename(path)), PILImage.open(path) as img:
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+        if img.width > width or img.height > height:
+            img = img.resize((min(width, img.width), min(height, img.height)),
+                             PILImage.Resampling.LANCZOS)
+
+        tmp_path = f"{cached}.{os.getpid()}.tmp"
+        if SCREENSHOT_FORMAT == 'jpeg':
+            img.convert('RGB').save(tmp_path, 'JPEG', quality=SCREENSHOT_JPEG_QUALITY,
+                                    optimize=True, progressive=True)
+        elif SCREENSHOT_FORMAT == 'quantize':
+            img.convert('RGB').quantize(colors=256).save(tmp_path, 'PNG', optimize=True)
+        else:
+            img.save(tmp_path, 'PNG', optimize=True)
+    os.replace(tmp_path, cached)
+    return cached
+
+def _font_index():
+    """Lower-case file name -> path of the first match in FONT_DIRS"""
+    index = {}
+    for directory in FONT_DIRS:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith('.ttf'):
+                    index.setdefault(name.lower(), os.path.join(root, name))
+    return index
+
+def _register_fonts():
+    index = _font_index()
+    for candidate in FONT_CANDIDATES:
+        paths = dict(zip(FONT_VARIANTS, (index.get(name.lower()) for name in candidate)))
+        if not paths['regular'] or not paths['bold']:
+            continue
+        paths['italic'] = paths['italic'] or paths['regular']
+        paths['bold_italic'] = paths['bold_italic'] or paths['bold']
+
+        names = {}
+        for variant in FONT_VARIANTS:
+            names[variant] = f"{FONT_FAMILY}-{variant}"
+            pdfmetrics.registerFont(TTFont(names[variant], paths[variant]))
+            _font_files[variant] = paths[variant]
+        pdfmetrics.registerFontFamily(
+            FONT_FAMILY, normal=names['regular'], bold=names['bold'],
+            italic=names['italic'], boldItalic=names['bold_italic'])
+        # <b>/<i> inside a paragraph set in any face of the family
+        for variant, (bold, italic) in zip(FONT_VARIANTS, ((0, 0), (1, 0), (0, 1), (1, 1))):
+            for face in names.values():
+                addMapping(face, bold, italic, names[variant])
+        return names
+
+    print("Warning: no TTF font found, using built-in Helvetica")
+    return {variant: font for font, variant in BUILTIN_FONTS.items()}
+
+def register_fonts():
+    """Register the manual font family once per process; returns variant -> font name"""
+    global _fonts
+    with _cache_lock:
+        if _fonts is None:
+            _fonts = _register_fonts()
+        return dict(_fonts)
+
+def font_fingerprint():
+    """Font files in use, as a string usable in cache keys"""
+    register_fonts()
+    return ";".join(f"{variant}={path}:{os.path.getsize(path)}"
+                    for variant, path in sorted(_font_files.items()))
+
+def apply_fonts(styles):
+    """Switch every style of a stylesheet from built-in Helvetica to the registered family"""
+    fonts = register_fonts()
+    for style in styles.byName.values():
+        variant = BUILTIN_FONTS.get(getattr(style, 'fontName', None))
+        if variant:
+            style.fontName = fonts[variant]
+    return styles
+
+def prime_font_subsets(canvas, doc=None):
+    """
+    Assign FONT_CHARSET to the font subsets of the canvas' document before
+    anything is drawn (usable as onFirstPage hook). Every primed document
+    gets byte-identical subsets for the common characters.
+    """
+    fonts = register_fonts()
+    for variant in PRIMED_VARIANTS:
+        font = pdfmetrics.getFont(fonts[variant])
+        if isinstance(font, TTFont):
+            font.splitString(FONT_CHARSET, canvas._doc)
@@ -0,0 +1,173 @@
+"""
+Opt-in timing spans for the TournamentMaster PDF generators
+Spans record wall time and the change in allocated memory blocks (plus the
+traced peak when tracemalloc is on; for a span containing other spans the
+peak only covers the part after the last nested one). Disabled spans cost
+one flag check.
+Worker processes inherit PDF_TRACE_DIR from the environment and write their
+spans there; the main process collects them for the Chrome trace
+(chrome://tracing, ui.perfetto.dev) and the summary table.
+"""
+
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+TRACE_ENV = 'PDF_TRACE_DIR'
+TRACE_MEMORY_ENV = 'PDF_TRACE_MEMORY'
+
+_events = []
+_lock = threading.Lock()
+_trace_dir = os.environ.get(TRACE_ENV)
+
+if _trace_dir and os.environ.get(TRACE_MEMORY_ENV):
+    tracemalloc.start()
+
+
+def enabled():
+    return _trace_dir is not None
+
+def enable(memory=False):
+    """Start tracing in this process and in the worker processes started after this call"""
+    global _trace_dir
+    if _trace_dir is None:
+        _trace_dir = tempfile.mkdtemp(prefix='pdf-trace-')
+        os.environ[TRACE_ENV] = _trace_dir
+    if memory:
+        os.environ[TRACE_MEMORY_ENV] = '1'
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+@contextmanager
+def span(name, cat='build', **args):
+    """Time the enclosed block as one complete ("X") trace event"""
+    if _trace_dir is None:
+        yield
+        return
+    memory = tracemalloc.is_tracing()
+    if memory:
+        tracemalloc.reset_peak()
+    blocks = sys.getallocatedblocks()
+    start = _now_us()
+    try:
+        yield
+    finally:
+        end = _now_us()
+        args['alloc_blocks'] = sys.getallocatedblocks() - blocks
+        if memory:
+            args['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': start, 'dur': end - start,
+                 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args}
+        with _lock:
+            _events.append(event)
+
+def traced(name=None, cat='build'):
+    """Decorator form of span()"""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace_dir is None:
+                return func(*args, **kwargs)
+            with span(label, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class Phases:
+    """
+    Consecutive spans for code split by comments rather than functions:
+    start() closes the previous phase and opens the next one
+    """
+
+    def __init__(self, cat='section'):
+        self.cat = cat
+        self.current = None
+
+    def start(self, name):
+        self.end()
+        if _trace_dir is not None:
+            self.current = span(name, self.cat)
+            self.current.__enter__()
+
+    def end(self):
+        if self.current is not None:
+            self.current.__exit__(None, None, None)
+            self.current = None
+
+def flush():
+    """Append this process' spans to the trace directory (called by workers after each job)"""
+    if _trace_dir is None:
+        return
+    with _lock:
+        # Forked workers start with a copy of the parent's pending spans
+        events = [event for event in _events if event['pid'] == os.getpid()]
+        _events.clear()
+    if events:
+        with open(os.path.join(_trace_dir, f"{os.getpid()}.jsonl"), 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+
+def collect():
+    """All spans recorded so far by this process and its workers, in time order"""
+    flush()
+    events = []
+    for filename in sorted(os.listdir(_trace_dir)):
+        with open(os.path.join(_trace_dir, filename), encoding='utf-8') as f:
+            events.extend(json.loads(line) for line in f)
+    return sorted(events, key=lambda event: event['ts'])
+
+def export(path, events):
+    """Write a Chrome trace (JSON object format) with process names"""
+    main_pid = os.getpid()
+    metadata = [
+        {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+         'args': {'name': 'main' if pid == main_pid else f"worker {pid}"}}
+        for pid in sorted({event['pid'] for event in events})
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+
+def summary(events):
+    """Print count, total/mean/max time and allocations per span name"""
+    totals = {}
+    for event in events:
+        entry = totals.setdefault(event['name'], {'count': 0, 'total': 0, 'max': 0, 'blocks': 0,
+                                                   'peak': None})
+        entry['count'] += 1
+        entry['total'] += event['dur']
+        entry['max'] = max(entry['max'], event['dur'])
+        entry['blocks'] += event['args'].get('alloc_blocks', 0)
+        if 'peak_kb' in event['args']:
+            entry['peak'] = max(entry['peak'] or 0, event['args']['peak_kb'])
+
+    print(f"\n{'span':<32}{'count':>6}{'total ms':>10}{'mean ms':>9}{'max ms':>9}"
+          f"{'alloc blk':>11}{'peak KB':>9}")
+    for name, entry in sorted(totals.items(), key=lambda item: -item[1]['total']):
+        peak = f"{entry['peak']:.0f}" if entry['peak'] is not None else '-'
+        print(f"{name[:31]:<32}{entry['count']:>6}{entry['total'] / 1000:>10.1f}"
+              f"{entry['total'] / entry['count'] / 1000:>9.1f}{entry['max'] / 1000:>9.1f}"
+              f"{entry['blocks']:>11}{peak:>9}")
+
+def finish(path):
+    """Collect, export to `path`, print the summary and remove the trace directory"""
+    global _trace_dir
+    events = collect()
+    export(path, events)
+    summary(events)
+    print(f"\nTrace written: {path} ({len(events)} spans)")
+    shutil.rmtree(_trace_dir, ignore_errors=True)
+    os.environ.pop(TRACE_ENV, None)
+    os.environ.pop(TRACE_MEMORY_ENV, None)
+    _trace_dir = None
@@ -2,11 +2,52 @@
 """
 Script per scaricare i regolamenti FIPSAS più recenti.
 I PDF vengono salvati in frontend/public/documents/regulations/fipsas/
+
+Uso:
+    python download_regulations.py [--workers N] [--rate R] [--base-url URL]
+                                   [--refresh] [--force]
+                                   [--pool-size N] [--retries N] [--no-store]
+                                   [--catalogue [FILE]] [--index [DB]]
+
+I download avvengono in parallelo (pool di thread limitato da --workers) e
+ogni host è protetto da un rate limiter a token bucket (--rate richieste/s).
+Con --base-url si può puntare lo script a un server HTTP locale di prova.
+
+Per ogni file scaricato vengono salvati ETag, Last-Modified, hash SHA-256 e
+data di download in CACHE_FILE. Con --refresh i file già presenti vengono
+rivalidati con If-None-Match/If-Modified-Since: se FIPSAS non li ha
+ripubblicati il server risponde 304 e non si scarica nulla.
+
+Tutte le richieste passano da una requests.Session con connessioni keep-alive
+(--pool-size). Timeout, errori di connessione e risposte 5xx vengono ritentati
+con backoff esponenziale e jitter (--retries); un download interrotto resta
+in un file .part e viene ripreso con una richiesta Range.
+
+Al termine i PDF vengono registrati nell'archivio content-addressed di
+regulation_store.py (oggetti per hash + manifest.json con lo storico).
+
+Con --catalogue all'elenco REGULATIONS si aggiungono i documenti scoperti da
+crawl_regulations.py. Con --index, dopo il download, i PDF nuovi o modificati
+vengono aggiunti all'indice full-text di index_regulations.py.
 """
 
+import argparse
+import hashlib
+import json
 import os
-import requests
+import random
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError
+
+from regulation_store import BlobStore
 
 # Directory di output
 OUTPUT_DIR = "frontend/public/documents/regulations/fipsas"
@@ -14,6 +55,36 @@ OUTPUT_DIR = "frontend/public/documents/regulations/fipsas"
 # URL base FIPSAS
 BASE_URL = "https://www.fipsas.it"
 
+# Download paralleli e rate limiting per host
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 2.0   # richieste al secondo per host
+DEFAULT_BURST = 2    # richieste consecutive ammesse senza attesa
+
+# Dimensione dei blocchi scritti su disco durante il download
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF'
+
+# Metadati di rivalidazione (ETag, Last-Modified, hash), nella directory di output
+CACHE_FILE = ".regulations-cache.json"
+
+# Esiti di download_pdf()
+NEW = "nuovo"
+UPDATED = "aggiornato"
+UNCHANGED = "invariato"
+PRESENT = "presente"
+FAILED = "fallito"
+
+# Sessione HTTP condivisa e tentativi in caso di errori transitori
+DEFAULT_POOL_SIZE = DEFAULT_WORKERS
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 0.5   # secondi, raddoppia a ogni tentativo
+BACKOFF_MAX = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
 # Regolamenti verificati da scaricare - URL estratti dal sito FIPSAS
 REGULATIONS = {
     # ========== MARE ==========
@@ -153,83 +224,437 @@ REGULATIONS = {
     },
 }
 
-def download_pdf(discipline, info):
-    """Scarica un singolo PDF."""
-    url = BASE_URL + info["url"]
-    filepath = os.path.join(OUTPUT_DIR, info["filename"])
+class TokenBucket:
+    """Rate limiter a token bucket, condivisibile tra thread."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Attende finché non è disponibile un token e lo consuma."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Un TokenBucket per ogni host contattato."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+class MetadataStore:
+    """
+    Metadati HTTP per file (etag, last_modified, sha256, fetched_at),
+    salvati come JSON accanto ai PDF.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: cache non leggibile ({path}): {e}")
+
+    def get(self, filename):
+        with self.lock:
+            return dict(self.entries.get(filename, {}))
+
+    def update(self, filename, **fields):
+        with self.lock:
+            self.entries.setdefault(filename, {}).update(fields)
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.entries, indent=2, sort_keys=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def conditional_headers(meta):
+    """Header If-None-Match / If-Modified-Since a partire dai metadati salvati."""
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """Sessione keep-alive con un pool di `pool_size` connessioni per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Backoff esponenziale con full jitter: uniforme in [0, base * 2^attempt]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def partial_path(filepath):
+    """File .part nascosto usato durante il download di `filepath`."""
+    directory, name = os.path.split(filepath)
+    return os.path.join(directory, f".{name}.part")
+
+def stream_to_file(response, filepath, is_pdf=False, resume=False):
+    """
+    Scrive il corpo della risposta a blocchi di CHUNK_SIZE nel file .part,
+    poi lo rinomina atomicamente su `filepath`.
+    Il magic number %PDF viene controllato sul primo blocco, quindi la memoria
+    usata non dipende dalla dimensione del documento.
+    Con `resume` (risposta 206) i byte vengono aggiunti al .part esistente.
+    Se la connessione cade l'eccezione si propaga e il .part resta su disco.
+    Restituisce la tupla (byte scritti, sha256), oppure None se il contenuto
+    non è un PDF.
+    """
+    part_path = partial_path(filepath)
+    digest = hashlib.sha256()
+    written = 0
+    head = b''
+
+    def sniff(chunk):
+        # Verifica che sia un PDF (header HTTP o magic number)
+        nonlocal head, is_pdf
+        if is_pdf or len(head) >= len(PDF_MAGIC):
+            return True
+        head += chunk[:len(PDF_MAGIC) - len(head)]
+        if len(head) < len(PDF_MAGIC):
+            return True
+        is_pdf = head == PDF_MAGIC
+        return is_pdf
+
+    mode = 'wb'
+    if resume and os.path.exists(part_path):
+        mode = 'ab'
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                sniff(chunk)
+                digest.update(chunk)
+                written += len(chunk)
+
+    with open(part_path, mode) as f:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            if not sniff(chunk):
+                break
+            f.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if not is_pdf:
+        os.remove(part_path)
+        return None
+    os.replace(part_path, filepath)
+    return written, digest.hexdigest()
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def range_start(response):
+    """Primo byte di una risposta 206 (header Content-Range), o None."""
+    value = response.headers.get('content-range', '')
+    try:
+        return int(value.split()[1].split('-')[0])
+    except (IndexError, ValueError):
+        return None
+
+def download_pdf(discipline, info, base_url=BASE_URL, output_dir=OUTPUT_DIR,
+                 limiter=None, cache=None, refresh=False, session=None,
+                 retries=DEFAULT_RETRIES):
+    """
+    Scarica un singolo PDF e restituisce l'esito (NEW, UPDATED, UNCHANGED,
+    PRESENT o FAILED). Con `refresh` un file già presente viene rivalidato
+    con una richiesta condizionale invece di essere saltato.
+    Gli errori transitori vengono ritentati fino a `retries` volte,
+    riprendendo il download dal punto di interruzione.
+    """
+    url = base_url + info["url"]
+    filename = info["filename"]
+    filepath = os.path.join(output_dir, filename)
+    part_path = partial_path(filepath)
+    exists = os.path.exists(filepath)
 
     # Salta se già scaricato
-    if os.path.exists(filepath):
+    if exists and not refresh:
         size_kb = os.path.getsize(filepath) / 1024
         if size_kb > 10:  # Più di 10KB = probabilmente valido
             print(f"  {discipline}: SKIP (già presente, {size_kb:.1f} KB)")
-            return True
+            return PRESENT
 
-    print(f"  Scaricando {discipline}...", end=" ", flush=True)
+    if session is None:
+        session = create_session()
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+    meta = cache.get(filename) if cache is not None else {}
+    headers = {}
+    previous = None
+    if exists:
+        headers.update(conditional_headers(meta))
+        previous = meta.get("sha256") or file_sha256(filepath)
+
+    # Validatore (ETag o Last-Modified) della risposta a cui appartiene il .part
+    validator = meta.get("partial_validator")
+    last_error = None
+
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff_delay(attempt - 1))
+        if limiter is not None:
+            limiter.acquire(url)
+
+        request_headers = dict(headers)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and validator:
+            request_headers["Range"] = f"bytes={offset}-"
+            request_headers["If-Range"] = validator
+
+        try:
+            with session.get(url, timeout=30, allow_redirects=True,
+                             headers=request_headers, stream=True) as response:
+                if response.status_code == 304:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    if cache is not None:
+                        cache.update(filename, fetched_at=utc_now(), partial_validator=None)
+                    print(f"  {discipline}: NON MODIFICATO (304)")
+                    return UNCHANGED
+
+                if response.status_code in RETRY_STATUS:
+                    last_error = response.status_code
+                    continue
+
+                if response.status_code not in (200, 206):
+                    print(f"  {discipline}: ERRORE ({response.status_code})")
+                    return FAILED
+
+                resume = response.status_code == 206
+                if resume and range_start(response) != offset:
+                    # Range non coerente con il .part: si ricomincia da zero
+                    os.remove(part_path)
+                    validator = None
+                    last_error = "Content-Range non valido"
+                    continue
+
+                validator = response.headers.get('etag') or response.headers.get('last-modified')
+                if cache is not None:
+                    cache.update(filename, partial_validator=validator)
+
+                content_type = response.headers.get('content-type', '')
+                result = stream_to_file(response, filepath, 'pdf' in content_type.lower(), resume)
+                if result is None:
+                    print(f"  {discipline}: SKIP (non PDF: {content_type[:50]})")
+                    return FAILED
+
+                size, sha256 = result
+                if cache is not None:
+                    cache.update(
+                        filename,
+                        url=url,
+                        etag=response.headers.get('etag'),
+                        last_modified=response.headers.get('last-modified'),
+                        sha256=sha256,
+                        size=size,
+                        fetched_at=utc_now(),
+                        partial_validator=None,
+                    )
+
+                if not exists:
+                    print(f"  {discipline}: OK ({size / 1024:.1f} KB)")
+                    return NEW
+                if previous == sha256:
+                    print(f"  {discipline}: NON MODIFICATO (stesso contenuto)")
+                    return UNCHANGED
+                print(f"  {discipline}: AGGIORNATO ({size / 1024:.1f} KB)")
+                return UPDATED
+
+        except (requests.Timeout, requests.ConnectionError, ChunkedEncodingError) as e:
+            last_error = e
+            continue
+        except Exception as e:
+            print(f"  {discipline}: ERRORE ({str(e)[:50]})")
+            return FAILED
+
+    print(f"  {discipline}: ERRORE dopo {retries + 1} tentativi ({str(last_error)[:50]})")
+    return FAILED
+
+def download_all(regulations, workers=DEFAULT_WORKERS, base_url=BASE_URL,
+                 output_dir=OUTPUT_DIR, limiter=None, cache=None, refresh=False,
+                 session=None, retries=DEFAULT_RETRIES, store=None):
+    """
+    Scarica tutti i regolamenti con al massimo `workers` download in corso
+    e, se indicato, li registra nell'archivio `store`.
+    Restituisce un Counter con il numero di documenti per esito.
+    """
+    if limiter is None:
+        limiter = HostRateLimiter()
+    if session is None:
+        session = create_session(max(1, workers))
+
+    totals = Counter()
+    pending = []
+    for discipline, info in regulations.items():
+        filepath = os.path.join(output_dir, info["filename"])
+        if not refresh and os.path.exists(filepath) and os.path.getsize(filepath) > 10240:
+            totals[PRESENT] += 1
+            print(f"  {discipline}: SKIP (già presente)")
+            continue
+        pending.append((discipline, info))
+
+    def worker(item):
+        discipline, info = item
+        return download_pdf(discipline, info, base_url, output_dir, limiter, cache, refresh,
+                            session, retries)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        totals.update(pool.map(worker, pending))
+
+    if store is not None:
+        for discipline, info in regulations.items():
+            filepath = os.path.join(output_dir, info["filename"])
+            if os.path.exists(filepath):
+                meta = cache.get(info["filename"]) if cache is not None else {}
+                store.add(discipline, filepath, meta.get("sha256"))
+        store.save()
+
+    if cache is not None:
+        cache.save()
+    return totals
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download Regolamenti FIPSAS")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="download contemporanei (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="richieste al secondo per host, 0 = illimitato (default: %(default)s)")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST,
+                        help="richieste consecutive senza attesa (default: %(default)s)")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="URL base del sito (default: %(default)s)")
+    parser.add_argument("--output", default=OUTPUT_DIR,
+                        help="directory di output (default: %(default)s)")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="connessioni keep-alive per host (default: pari a --workers)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="tentativi aggiuntivi su timeout/5xx (default: %(default)s)")
+    parser.add_argument("--store", default=None,
+                        help="radice dell'archivio per hash (default: directory padre di --output)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="non aggiornare l'archivio content-addressed")
+    parser.add_argument("--catalogue", nargs="?", const="regulations_catalogue.json", default=None,
+                        help="aggiunge i documenti del catalogo di crawl_regulations.py")
+    parser.add_argument("--index", nargs="?", const="regulations_index.db", default=None,
+                        help="aggiorna l'indice full-text dopo il download")
+    parser.add_argument("--refresh", action="store_true",
+                        help="rivalida i file già presenti con richieste condizionali")
+    parser.add_argument("--force", action="store_true",
+                        help="riscarica tutto ignorando ETag/Last-Modified salvati")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    regulations = REGULATIONS
+    if args.catalogue:
+        from crawl_regulations import load_catalogue
+        regulations = load_catalogue(args.catalogue)
 
-    try:
-        response = requests.get(url, timeout=30, allow_redirects=True, headers=headers)
-
-        if response.status_code == 200:
-            # Verifica che sia un PDF
-            content_type = response.headers.get('content-type', '')
-            if 'pdf' in content_type.lower() or response.content[:4] == b'%PDF':
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                size_kb = len(response.content) / 1024
-                print(f"OK ({size_kb:.1f} KB)")
-                return True
-            else:
-                print(f"SKIP (non PDF: {content_type[:50]})")
-                return False
-        else:
-            print(f"ERRORE ({response.status_code})")
-            return False
-
-    except Exception as e:
-        print(f"ERRORE ({str(e)[:50]})")
-        return False
-
-def main():
     print("="*60)
     print("Download Regolamenti FIPSAS")
     print("="*60)
-    print(f"Output: {OUTPUT_DIR}")
-    print(f"Documenti da scaricare: {len(REGULATIONS)}")
+    print(f"Output: {args.output}")
+    print(f"Documenti da scaricare: {len(regulations)}")
+    print(f"Download paralleli: {args.workers}, limite: {args.rate:g} req/s per host")
     print()
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(args.output, exist_ok=True)
 
-    success = 0
-    failed = 0
-    skipped = 0
+    cache = MetadataStore(os.path.join(args.output, CACHE_FILE))
+    if args.force:
+        cache.entries = {}
 
-    for discipline, info in REGULATIONS.items():
-        filepath = os.path.join(OUTPUT_DIR, info["filename"])
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 10240:
-            skipped += 1
-            print(f"  {discipline}: SKIP (già presente)")
-            continue
-
-        if download_pdf(discipline, info):
-            success += 1
-        else:
-            failed += 1
-        time.sleep(0.5)  # Rate limiting
+    started = time.monotonic()
+    limiter = HostRateLimiter(args.rate, args.burst)
+    session = create_session(args.pool_size or max(1, args.workers))
+    store = None
+    if not args.no_store:
+        store = BlobStore(args.store or os.path.dirname(os.path.normpath(args.output)))
+    try:
+        totals = download_all(
+            regulations, args.workers, args.base_url.rstrip("/"), args.output, limiter,
+            cache, refresh=args.refresh or args.force, session=session, retries=args.retries,
+            store=store
+        )
+    finally:
+        session.close()
+    elapsed = time.monotonic() - started
 
     print()
     print("="*60)
-    print(f"Completato: {success} nuovi, {skipped} già presenti, {failed} falliti")
+    print(f"Completato: {totals[NEW]} nuovi, {totals[UPDATED]} aggiornati, "
+          f"{totals[UNCHANGED]} invariati, {totals[PRESENT]} già presenti, "
+          f"{totals[FAILED]} falliti ({elapsed:.1f}s)")
+    if args.index:
+        from index_regulations import connect, update_index
+        conn = connect(args.index)
+        try:
+            indexed, unchanged = update_index(conn, regulations, args.output, cache)
+        finally:
+            conn.close()
+        print(f"Indice: {indexed} documenti reindicizzati, {unchanged} invariati")
+    if store is not None:
+        stats = store.stats()
+        print(f"Archivio: {stats['objects']} oggetti per {stats['versions']} versioni, "
+              f"{stats['saved_bytes'] / 1024:.1f} KB risparmiati")
     print("="*60)
 
     # Lista file scaricati
     print("\nFile presenti:")
-    for f in sorted(os.listdir(OUTPUT_DIR)):
-        size = os.path.getsize(os.path.join(OUTPUT_DIR, f)) / 1024
+    for f in sorted(os.listdir(args.output)):
+        if f.startswith("."):
+            continue
+        size = os.path.getsize(os.path.join(args.output, f)) / 1024
         print(f"  - {f} ({size:.1f} KB)")
 
 if __name__ == "__main__":
@@ -42,6 +42,17 @@ module.exports = {
       autorestart: true,
       max_restarts: 5,
       windowsHide: true
+    },
+    {
+      // Aggregati analytics (ANALYTICS_CUBE_DIR): un aggiornamento incrementale ogni 10 minuti
+      name: 'tm-analytics-cube',
+      cwd: 'D:/Dev/TournamentMaster/backend',
+      script: 'scripts/analytics_cube.py',
+      interpreter: 'python',
+      cron_restart: '*/10 * * * *',
+      autorestart: false,
+      watch: false,
+      windowsHide: true
     }
   ]
 };
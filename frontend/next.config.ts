@@ -16,6 +16,19 @@ const nextConfig: NextConfig = {
     // Optimize package imports
     optimizePackageImports: ["@turf/turf"],
   },
+
+  // Content-addressed regulation PDFs (see regulation_store.py): the URL
+  // contains the SHA-256 of the file, so it can be cached forever
+  async headers() {
+    return [
+      {
+        source: "/documents/regulations/objects/:path*",
+        headers: [
+          { key: "Cache-Control", value: "public, max-age=31536000, immutable" },
+        ],
+      },
+    ];
+  },
 };
 
 const pwaConfig = withPWA({
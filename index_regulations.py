@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Indice full-text dei regolamenti FIPSAS scaricati.
+
+Estrae il testo dei PDF pagina per pagina e lo salva in un indice SQLite FTS5.
+L'aggiornamento è incrementale: un PDF viene reindicizzato solo se il suo
+hash SHA-256 è cambiato dall'ultima volta.
+
+Uso:
+    python index_regulations.py build [--source DIR] [--catalogue FILE] [--db FILE]
+    python index_regulations.py search "misura minima" [--limit N] [--db FILE]
+
+build indicizza REGULATIONS più i documenti del catalogo di
+crawl_regulations.py (se il file esiste), come download_regulations.py
+--catalogue. La ricerca restituisce disciplina, anno e pagina di ogni risultato.
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from pypdf import PdfReader
+
+from download_regulations import CACHE_FILE, OUTPUT_DIR, REGULATIONS, MetadataStore
+from regulation_store import file_sha256, split_key
+
+# Database dell'indice
+INDEX_DB = "regulations_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    filename   TEXT PRIMARY KEY,
+    key        TEXT NOT NULL,
+    discipline TEXT NOT NULL,
+    year       INTEGER,
+    sha256     TEXT NOT NULL,
+    pages      INTEGER NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+    text,
+    filename UNINDEXED,
+    page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def connect(db_path=INDEX_DB):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def extract_pages(filepath):
+    """Testo di ogni pagina del PDF (stringa vuota per le pagine scansionate)."""
+    reader = PdfReader(filepath)
+    for page in reader.pages:
+        try:
+            yield page.extract_text() or ""
+        except Exception as e:
+            print(f"Warning: testo non estraibile da {os.path.basename(filepath)}: {e}")
+            yield ""
+
+def index_document(conn, key, filepath, sha256=None):
+    """
+    Indicizza un PDF se il suo hash è cambiato.
+    Restituisce il numero di pagine indicizzate, 0 se era già aggiornato.
+    """
+    filename = os.path.basename(filepath)
+    if sha256 is None:
+        sha256 = file_sha256(filepath)
+
+    row = conn.execute("SELECT sha256 FROM documents WHERE filename = ?", (filename,)).fetchone()
+    if row is not None and row["sha256"] == sha256:
+        return 0
+
+    pages = [(text, filename, number) for number, text in enumerate(extract_pages(filepath), 1)]
+    discipline, year = split_key(key)
+    with conn:
+        conn.execute("DELETE FROM page_text WHERE filename = ?", (filename,))
+        conn.executemany("INSERT INTO page_text (text, filename, page) VALUES (?, ?, ?)", pages)
+        conn.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (filename, key, discipline, year, sha256, len(pages),
+             datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        )
+    return len(pages)
+
+def update_index(conn, regulations=REGULATIONS, source_dir=OUTPUT_DIR, cache=None):
+    """
+    Aggiorna l'indice con i PDF di `regulations` presenti in `source_dir`,
+    usando gli hash della cache di download quando disponibili.
+    Restituisce (documenti reindicizzati, documenti invariati).
+    """
+    if cache is None:
+        cache = MetadataStore(os.path.join(source_dir, CACHE_FILE))
+
+    indexed = unchanged = 0
+    for key, info in regulations.items():
+        filepath = os.path.join(source_dir, info["filename"])
+        if not os.path.exists(filepath):
+            continue
+        try:
+            pages = index_document(conn, key, filepath, cache.get(info["filename"]).get("sha256"))
+        except Exception as e:
+            print(f"  {key}: ERRORE ({str(e)[:50]})")
+            continue
+        if pages:
+            indexed += 1
+            print(f"  {key}: {pages} pagine indicizzate")
+        else:
+            unchanged += 1
+    return indexed, unchanged
+
+def search(conn, query, limit=20):
+    """
+    Ricerca full-text (sintassi FTS5). Restituisce una lista di dict con
+    key, discipline, year, filename, page e snippet, in ordine di rilevanza.
+    """
+    rows = conn.execute(
+        """
+        SELECT d.key, d.discipline, d.year, p.filename, p.page,
+               snippet(page_text, 0, '[', ']', '...', 12) AS snippet
+        FROM page_text p JOIN documents d ON d.filename = p.filename
+        WHERE page_text MATCH ?
+        ORDER BY bm25(page_text)
+        LIMIT ?
+        """,
+        (query, limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Indice full-text regolamenti FIPSAS")
+    parser.add_argument("--db", default=INDEX_DB,
+                        help="database SQLite dell'indice (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="aggiorna l'indice con i PDF scaricati")
+    build.add_argument("--source", default=OUTPUT_DIR,
+                       help="directory dei PDF (default: %(default)s)")
+    build.add_argument("--catalogue", default="regulations_catalogue.json",
+                       help="catalogo di crawl_regulations.py (default: %(default)s)")
+
+    find = commands.add_parser("search", help="cerca nel testo dei regolamenti")
+    find.add_argument("query", help="testo da cercare (sintassi FTS5)")
+    find.add_argument("--limit", type=int, default=20,
+                      help="numero massimo di risultati (default: %(default)s)")
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+
+    if args.command == "build":
+        from crawl_regulations import load_catalogue
+        started = time.monotonic()
+        indexed, unchanged = update_index(conn, load_catalogue(args.catalogue), args.source)
+        print(f"\nIndice aggiornato: {indexed} reindicizzati, {unchanged} invariati "
+              f"({time.monotonic() - started:.1f}s)")
+        return
+
+    started = time.monotonic()
+    try:
+        results = search(conn, args.query, args.limit)
+    except sqlite3.OperationalError as e:
+        print(f"Query non valida: {e}")
+        return
+    elapsed_ms = (time.monotonic() - started) * 1000
+
+    for r in results:
+        year = r["year"] or "-"
+        print(f"  {r['discipline']} {year} - {r['filename']} p. {r['page']}")
+        print(f"      {r['snippet']}")
+    print(f"\n{len(results)} risultati ({elapsed_ms:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
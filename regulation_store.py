@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Archivio content-addressed dei regolamenti FIPSAS.
+
+Ogni PDF viene salvato una sola volta in objects/<aa>/<sha256>.pdf e il file
+manifest.json associa chiave del regolamento, disciplina e anno agli hash,
+conservando lo storico delle versioni. Gli URL degli oggetti non cambiano mai
+e possono essere serviti dal frontend con cache immutabile.
+
+Uso:
+    python regulation_store.py [--source DIR] [--store DIR]
+
+Senza argomenti importa nell'archivio i PDF già presenti in
+frontend/public/documents/regulations/fipsas/ e stampa le statistiche.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime, timezone
+
+# Radice dell'archivio (servita dal frontend come /documents/regulations/)
+STORE_DIR = "frontend/public/documents/regulations"
+OBJECTS_DIR = "objects"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+CHUNK_SIZE = 64 * 1024
+
+# "big-game-2025" -> ("big-game", 2025); il suffisso "-id<n>" dato da
+# crawl_regulations.py ai documenti omonimi non fa parte della disciplina
+KEY_YEAR_RE = re.compile(r"^(?P<discipline>.+?)(?:-(?P<year>\d{4}))?(?:-id\d+)?$")
+
+
+def split_key(key):
+    """Separa disciplina e anno dalla chiave di REGULATIONS (anno None se assente)."""
+    match = KEY_YEAR_RE.match(key)
+    year = match.group("year")
+    return match.group("discipline"), int(year) if year else None
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class BlobStore:
+    """
+    Oggetti PDF indirizzati per hash SHA-256 più un manifest JSON:
+
+        {
+          "version": 1,
+          "objects": {"<sha256>": {"path": "objects/ab/<sha256>.pdf", "size": 1234}},
+          "regulations": {
+            "big-game-2025": {
+              "discipline": "big-game", "year": 2025,
+              "filename": "circolare_normativa_2025_big_game.pdf",
+              "current": "<sha256>",
+              "history": [{"sha256": "<sha256>", "added_at": "..."}]
+            }
+          }
+        }
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.manifest = {"version": MANIFEST_VERSION, "objects": {}, "regulations": {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def object_path(self, sha256):
+        """Percorso relativo alla radice dell'archivio dell'oggetto `sha256`."""
+        return "/".join([OBJECTS_DIR, sha256[:2], f"{sha256}.pdf"])
+
+    def add_object(self, filepath, sha256=None):
+        """
+        Salva `filepath` come oggetto e ne restituisce l'hash. Se l'oggetto
+        esiste già non viene riscritto; altrimenti si usa un hard link
+        quando possibile, una copia in caso contrario.
+        """
+        if sha256 is None:
+            sha256 = file_sha256(filepath)
+        relpath = self.object_path(sha256)
+        target = os.path.join(self.root, *relpath.split("/"))
+
+        with self.lock:
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = target + ".tmp"
+                try:
+                    os.link(filepath, tmp_path)
+                except OSError:
+                    shutil.copyfile(filepath, tmp_path)
+                os.replace(tmp_path, target)
+            self.manifest["objects"][sha256] = {
+                "path": relpath,
+                "size": os.path.getsize(target),
+            }
+        return sha256
+
+    def add(self, key, filepath, sha256=None):
+        """
+        Registra `filepath` come versione corrente del regolamento `key`.
+        Restituisce True se la versione è nuova per quel regolamento.
+        """
+        sha256 = self.add_object(filepath, sha256)
+        discipline, year = split_key(key)
+
+        with self.lock:
+            entry = self.manifest["regulations"].setdefault(key, {
+                "discipline": discipline,
+                "year": year,
+                "history": [],
+            })
+            entry["filename"] = os.path.basename(filepath)
+            if entry.get("current") == sha256:
+                return False
+            entry["current"] = sha256
+            entry["history"].append({"sha256": sha256, "added_at": utc_now()})
+            return True
+
+    def url_for(self, key):
+        """URL immutabile (relativo a STORE_DIR) della versione corrente di `key`."""
+        entry = self.manifest["regulations"].get(key)
+        if not entry or not entry.get("current"):
+            return None
+        return self.manifest["objects"][entry["current"]]["path"]
+
+    def stats(self):
+        """Numero di regolamenti, versioni, oggetti e byte risparmiati dalla deduplicazione."""
+        objects = self.manifest["objects"]
+        regulations = self.manifest["regulations"].values()
+        referenced = [h["sha256"] for entry in regulations for h in entry["history"]]
+        logical = sum(objects[h]["size"] for h in referenced if h in objects)
+        stored = sum(obj["size"] for obj in objects.values())
+        return {
+            "regulations": len(self.manifest["regulations"]),
+            "versions": len(referenced),
+            "objects": len(objects),
+            "stored_bytes": stored,
+            "saved_bytes": max(0, logical - stored),
+        }
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.manifest, indent=2, sort_keys=True)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def ingest_directory(store, source_dir, regulations):
+    """Importa nell'archivio i PDF di `regulations` presenti in `source_dir`."""
+    added = 0
+    for key, info in regulations.items():
+        filepath = os.path.join(source_dir, info["filename"])
+        if not os.path.exists(filepath):
+            continue
+        if store.add(key, filepath):
+            added += 1
+            print(f"  {key}: {store.url_for(key)}")
+    return added
+
+def main():
+    from download_regulations import OUTPUT_DIR, REGULATIONS
+
+    parser = argparse.ArgumentParser(description="Archivio content-addressed regolamenti FIPSAS")
+    parser.add_argument("--source", default=OUTPUT_DIR,
+                        help="directory dei PDF da importare (default: %(default)s)")
+    parser.add_argument("--store", default=STORE_DIR,
+                        help="radice dell'archivio (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("Archivio Regolamenti FIPSAS")
+    print("="*60)
+
+    store = BlobStore(args.store)
+    added = ingest_directory(store, args.source, REGULATIONS)
+    store.save()
+
+    stats = store.stats()
+    print()
+    print(f"Nuove versioni: {added}")
+    print(f"Regolamenti: {stats['regulations']}, versioni: {stats['versions']}, "
+          f"oggetti: {stats['objects']}")
+    print(f"Spazio occupato: {stats['stored_bytes'] / 1024:.1f} KB, "
+          f"risparmiato: {stats['saved_bytes'] / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
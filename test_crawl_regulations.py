@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Verifica del catalogo di crawl_regulations.py: un documento ripubblicato con
+lo stesso slug e un nuovo id deve avere chiave e file propri.
+
+Uso:
+    python test_crawl_regulations.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from crawl_regulations import Catalogue, load_catalogue
+from download_regulations import REGULATIONS
+from regulation_store import split_key
+
+BIG_GAME = REGULATIONS["big-game-2025"]
+REPUBLISHED_URL = BIG_GAME["url"].replace("/5789-", "/5900-")
+
+
+class SameSlugNewIdTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "catalogue.json")
+        known_urls = {info["url"]: (key, info["filename"]) for key, info in REGULATIONS.items()}
+        catalogue = Catalogue(self.path)
+        catalogue.merge("/big-game", {
+            "5789": {"url": BIG_GAME["url"], "slug": "circolare-normativa-2025-big-game", "title": "2025"},
+            "5900": {"url": REPUBLISHED_URL, "slug": "circolare-normativa-2025-big-game", "title": "2025"},
+        }, known_urls)
+        catalogue.save()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_republished_document_has_its_own_key_and_file(self):
+        regulations = load_catalogue(self.path)
+        keys = [key for key, info in regulations.items() if info["url"] == REPUBLISHED_URL]
+        self.assertEqual(len(keys), 1)
+        self.assertNotEqual(keys[0], "big-game-2025")
+        self.assertEqual(regulations["big-game-2025"], BIG_GAME)
+
+        filenames = [info["filename"] for info in regulations.values()]
+        self.assertEqual(len(filenames), len(set(filenames)))
+
+    def test_suffix_is_not_read_as_year(self):
+        key = next(key for key, info in load_catalogue(self.path).items() if info["url"] == REPUBLISHED_URL)
+        self.assertEqual(split_key(key), ("big-game", 2025))
+
+    def test_old_catalogue_without_unique_file(self):
+        # Catalogo salvato prima della correzione: stesso file di REGULATIONS
+        catalogue = Catalogue(self.path)
+        catalogue.data["documents"]["5900"].update(key="big-game-2025", filename=BIG_GAME["filename"])
+        catalogue.save()
+        filenames = [info["filename"] for info in load_catalogue(self.path).values()]
+        self.assertEqual(len(filenames), len(set(filenames)))
+
+
+if __name__ == "__main__":
+    unittest.main()